@@ -1,9 +1,13 @@
 import numpy as np
 from agent_base import Agent
+import shared_path # Puts ../shared on sys.path
+from rng import draws
 
 class Evader(Agent):
-    def __init__(self, x, y, max_speed, max_force, flee_radius=150.0):
-        super().__init__(x, y, max_speed, max_force, color='red', size=9)
+    __slots__ = ('flee_radius',)
+
+    def __init__(self, x, y, max_speed, max_force, flee_radius=150.0, population=None):
+        super().__init__(x, y, max_speed, max_force, color='red', size=9, population=population)
         self.flee_radius = flee_radius
 
     def update_behavior(self, pursuers):
@@ -22,14 +26,16 @@ class Evader(Agent):
             flee_force_total = self.flee(closest_pursuer_pos, self.flee_radius)
 
         if np.linalg.norm(flee_force_total) < 0.01: 
-            random_force = (np.random.rand(2) - 0.5) * self.max_force * 0.1 
+            random_force = (draws('Evader').take(2) - 0.5) * self.max_force * 0.1 
             self.apply_force(random_force)
 
         self.apply_force(flee_force_total)
 
 class Pursuer(Agent):
-    def __init__(self, x, y, max_speed, max_force):
-        super().__init__(x, y, max_speed, max_force, color='blue', size=9)
+    __slots__ = ()
+
+    def __init__(self, x, y, max_speed, max_force, population=None):
+        super().__init__(x, y, max_speed, max_force, color='blue', size=9, population=population)
 
     def update_behavior(self, evader):
         pursuit_force = self.seek(evader.position)
@@ -1,36 +1,137 @@
+import math
 import numpy as np
-import random
-import matplotlib.pyplot as plt
 
 from utils import limit_vector, normalize_vector 
+import shared_path # Puts ../shared on sys.path
+from rng import draws
+from plotting import pyplot
+import population as population_store
+
+
+def _stored(name):
+    '''Attribute backed by the agent's row of a population field; setting it copies into the row.'''
+    def get(self):
+        return self._pop.fields[name][self._i]
+
+    def set(self, value):
+        self._pop.fields[name][self._i] = value
+    return property(get, set)
+
+
+def _stored_scalar(name):
+    def get(self):
+        return self._pop.fields[name].item(self._i)
+
+    def set(self, value):
+        self._pop.fields[name][self._i] = value
+    return property(get, set)
+
 
 class Agent:
-    def __init__(self, x, y, max_speed, max_force, color='blue', size=5):
-        self.position = np.array([float(x), float(y)])
-        self.velocity = (np.random.rand(2) - 0.5) * 2 
-        self.velocity = normalize_vector(self.velocity) * random.uniform(0, max_speed)
-        if np.linalg.norm(self.velocity) == 0:
-            self.velocity = np.array([1.0, 0.0]) * random.uniform(0.1, max_speed)
-            
-        self.acceleration = np.zeros(2)
+    # Kinematic state lives in a population.Population; subclasses add their own __slots__
+    __slots__ = ('_pop', '_i', 'color')
+
+    position = _stored('position')
+    velocity = _stored('velocity')
+    acceleration = _stored('acceleration')
+    prev_position = _stored('prev_position') # For render-time interpolation
+    max_speed = _stored_scalar('max_speed')
+    max_force = _stored_scalar('max_force')
+    size = _stored_scalar('size')
+
+    def __init__(self, x, y, max_speed, max_force, color='blue', size=5, population=None):
+        self._pop = population if population is not None else population_store.current()
+        self._i = self._pop.allocate()
+        self.position = (float(x), float(y))
+        rng = draws(type(self).__name__)
+        velocity = (rng.take(2) - 0.5) * 2 
+        velocity = normalize_vector(velocity) * rng.uniform(0, max_speed)
+        if np.linalg.norm(velocity) == 0:
+            velocity = np.array([1.0, 0.0]) * rng.uniform(0.1, max_speed)
+        self.velocity = velocity
+        self.prev_position = self.position
         self.max_speed = float(max_speed)
         self.max_force = float(max_force)
         self.color = color
         self.size = size 
-        self.history = [] 
+
+    def __copy__(self):
+        # A copy gets its own row: sharing one would let either copy's __del__ free the other's state
+        clone = type(self).__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name != '_i' and hasattr(self, name):
+                    setattr(clone, name, getattr(self, name))
+        clone._i = self._pop.copy_row(self._i)
+        return clone
+
+    def __del__(self):
+        pop = getattr(self, '_pop', None)
+        if pop is not None:
+            pop.release(self._i)
+
+    @property
+    def history(self):
+        '''The last positions, oldest first, as a (length, 2) array.'''
+        return self._pop.get_history(self._i)
+
+    @history.setter
+    def history(self, positions):
+        self._pop.set_history(self._i, positions)
+
+    def _state_names(self):
+        names = ['position', 'velocity', 'acceleration', 'prev_position', 'max_speed', 'max_force', 'color', 'size']
+        for cls in reversed(type(self).__mro__):
+            names.extend(name for name in cls.__dict__.get('__slots__', ()) if not name.startswith('_')
+                         and name not in names)
+        return names
+
+    def get_state(self):
+        '''Numeric/str attributes and arrays of this agent (subclass fields included), for checkpoint.py.'''
+        state = {}
+        for name in self._state_names():
+            value = getattr(self, name, None)
+            if isinstance(value, np.ndarray):
+                state[name] = value.copy()
+            elif isinstance(value, (bool, int, float, str, np.number)):
+                state[name] = value
+        state['history'] = self.history
+        return state
+
+    def set_state(self, state):
+        for name, value in state.items():
+            if name == 'history':
+                self.history = value
+            elif isinstance(value, np.ndarray):
+                setattr(self, name, value.copy())
+            else:
+                setattr(self, name, value)
 
     def apply_force(self, force):
-        self.acceleration += force
+        self._pop.acceleration[self._i] += force
 
-    def update(self):
-        self.velocity += self.acceleration
-        self.velocity = limit_vector(self.velocity, self.max_speed)
-        self.position += self.velocity
-        self.acceleration *= 0  
-        
-        self.history.append(self.position.copy())
-        if len(self.history) > 50: 
-            self.history.pop(0)
+    def update(self, dt=1.0):
+        '''Integrates one physics step of length dt (dt=1 is one legacy animation frame).'''
+        # Scalar arithmetic on the population row, so a step allocates no arrays
+        pop, i = self._pop, self._i
+        position, velocity, acceleration = pop.position, pop.velocity, pop.acceleration
+        px, py = position.item(i, 0), position.item(i, 1)
+        pop.prev_position[i] = position[i]
+        vx = velocity.item(i, 0) + acceleration.item(i, 0) * dt
+        vy = velocity.item(i, 1) + acceleration.item(i, 1) * dt
+        mag = math.sqrt(vx * vx + vy * vy)
+        max_speed = pop.max_speed.item(i)
+        if mag > max_speed:
+            vx, vy = vx / mag * max_speed, vy / mag * max_speed
+        px += vx * dt
+        py += vy * dt
+        velocity[i, 0] = vx
+        velocity[i, 1] = vy
+        position[i, 0] = px
+        position[i, 1] = py
+        acceleration[i] = 0.0
+
+        pop.push_history(i, px, py)
 
     def seek(self, target_pos):
         desired_velocity = normalize_vector(target_pos - self.position) * self.max_speed
@@ -49,23 +150,35 @@ class Agent:
 
     def edges(self, width, height):
         '''Wraps agent position around the screen edges.'''
+        wrapped = False
         if self.position[0] > width:
             self.position[0] = 0
-            self.history.clear() 
+            wrapped = True
         elif self.position[0] < 0:
             self.position[0] = width
-            self.history.clear()
+            wrapped = True
         if self.position[1] > height:
             self.position[1] = 0
-            self.history.clear()
+            wrapped = True
         elif self.position[1] < 0:
             self.position[1] = height
-            self.history.clear()
+            wrapped = True
+        if wrapped:
+            self._pop.clear_history(self._i)
+            self.prev_position = self.position # Don't interpolate across the wrap
+
+    def render_position(self, alpha=1.0):
+        '''Position interpolated between the last two physics steps.'''
+        if alpha >= 1.0:
+            return self.position
+        return self.prev_position + (self.position - self.prev_position) * alpha
 
-    def display(self, ax):
+    def display(self, ax, alpha=1.0):
         '''Draws the agent as a triangle pointing in the direction of velocity.'''
+        plt = pyplot()
+        render_pos = self.render_position(alpha)
         if np.linalg.norm(self.velocity) < 0.01:
-            shape = plt.Circle(self.position, self.size / 2, color=self.color)
+            shape = plt.Circle(render_pos, self.size / 2, color=self.color)
         else:
             angle = np.arctan2(self.velocity[1], self.velocity[0])
             points = np.array([
@@ -77,10 +190,10 @@ class Agent:
                 [np.cos(angle), -np.sin(angle)],
                 [np.sin(angle),  np.cos(angle)]
             ])
-            transformed_points = points @ rotation_matrix.T + self.position
+            transformed_points = points @ rotation_matrix.T + render_pos
             shape = plt.Polygon(transformed_points, color=self.color)
         ax.add_patch(shape)
         
-        if len(self.history) > 1:
-            hist_arr = np.array(self.history)
+        hist_arr = self.history
+        if len(hist_arr) > 1:
             ax.plot(hist_arr[:,0], hist_arr[:,1], color=self.color, alpha=0.3, linewidth=0.5)
@@ -0,0 +1,291 @@
+'''
+Many independent boid flocks (scenarios) stepped together.
+
+Positions and velocities of S scenarios of N boids are stacked into
+(S, N, 2) arrays and every flocking parameter is an (S,) vector, so a
+parameter study over BOIDS_CONFIG runs as one batched step over all
+scenarios instead of S * N Boid.flock calls. The forces are those of
+Boid.flock / partitioned.flock_accelerations.
+
+Neighbours are found as if the scenarios were laid out side by side in one
+large world, one perception radius apart so that no pair spans two of them,
+with the grid search of contact_epidemic.find_contacts; the neighbour sums
+are then scatter-adds over the pairs. The cost of a step therefore grows
+with S * N times the local density, the same as for a single flock of
+S * N boids, instead of with S * N^2.
+
+Per-scenario order metrics (flock_metrics.FlockMetrics) are recorded every
+metrics_every steps from the neighbour pairs of the step. run() can be
+given a flock_metrics.ConvergenceDetector, and then stops stepping the
+scenarios that have reached a steady state.
+'''
+import itertools
+import time
+import numpy as np
+
+from config import GENERAL_CONFIG, BOIDS_CONFIG, BATCH_CONFIG
+from contact_epidemic import find_contacts
+from flock_metrics import FlockMetrics
+import shared_path # Puts ../shared on sys.path
+from rng import generator
+
+FLOCK_PARAMS = ('max_speed', 'max_force', 'perception_radius', 'separation_factor', 'alignment_factor',
+                'cohesion_factor')
+
+
+def _limit(vectors, max_val):
+    '''limit_vector over the last axis; max_val broadcasts against vectors[..., 0].'''
+    mag = np.sqrt(np.sum(vectors * vectors, axis=-1))
+    scale = np.where(mag > max_val, max_val / np.where(mag > 0, mag, 1.0), 1.0)
+    return vectors * scale[..., None]
+
+
+def _normalize(vectors):
+    mag = np.sqrt(np.sum(vectors * vectors, axis=-1))
+    return np.where(mag[..., None] > 0, vectors / np.where(mag > 0, mag, 1.0)[..., None], 0.0)
+
+
+def neighbor_pairs(pos, radius, width, height):
+    """
+    Directed (i, j) pairs of boids of the same scenario closer than that
+    scenario's radius, as flat indices s * N + n into pos.reshape(-1, 2).
+    """
+    num_scenarios, num_agents = pos.shape[:2]
+    reach = float(radius.max())
+    cols = int(np.ceil(np.sqrt(num_scenarios)))
+    rows = -(-num_scenarios // cols)
+    tile_w, tile_h = width + reach, height + reach
+    s = np.arange(num_scenarios)
+    offset = np.stack(((s % cols) * tile_w, (s // cols) * tile_h), axis=1)
+    flat = pos.reshape(-1, 2)
+    pairs = find_contacts((pos + offset[:, None, :]).reshape(-1, 2), reach, cols * tile_w, rows * tile_h,
+                          periodic=False)
+    i = np.concatenate((pairs[:, 0], pairs[:, 1]))
+    j = np.concatenate((pairs[:, 1], pairs[:, 0]))
+    diff = flat[i] - flat[j]
+    dist2 = np.einsum('ij,ij->i', diff, diff)
+    r = radius[i // num_agents]
+    keep = (dist2 > 0) & (dist2 < r * r) # Per-scenario radius; distance 0 is skipped as in Boid._get_neighbors
+    return i[keep], j[keep], diff[keep], dist2[keep]
+
+
+def batched_accelerations(pos, vel, params, width, height, return_pairs=False):
+    """
+    Boid.flock for (S, N, 2) positions and velocities with (S,) parameter
+    vectors. Returns the accelerations and the neighbour count of every boid,
+    and with return_pairs the neighbour pairs (i, j, dist2) as well.
+    """
+    shape = pos.shape
+    total = shape[0] * shape[1]
+    i, j, diff, dist2 = neighbor_pairs(pos, params['perception_radius'], width, height)
+    flat_pos, flat_vel = pos.reshape(-1, 2), vel.reshape(-1, 2)
+
+    def scatter(values):
+        return np.stack([np.bincount(i, weights=values[:, k], minlength=total) for k in range(2)], axis=1)
+
+    count = np.bincount(i, minlength=total).astype(float)
+    n = np.maximum(count, 1.0)[:, None]
+    per_agent = {name: np.repeat(values, shape[1]) for name, values in params.items()}
+    max_speed = per_agent['max_speed'][:, None]
+    max_force = per_agent['max_force']
+    # normalize(p_i - p_j) / d_ij as in Boid.separate
+    sep = _limit(_normalize(scatter(diff / dist2[:, None]) / n) * max_speed - flat_vel, max_force)
+    ali = _limit(_normalize(scatter(flat_vel[j]) / n) * max_speed - flat_vel, max_force)
+    coh = _limit(_normalize(scatter(flat_pos[j]) / n - flat_pos) * max_speed - flat_vel, max_force)
+    acc = (sep * per_agent['separation_factor'][:, None] + ali * per_agent['alignment_factor'][:, None] +
+           coh * per_agent['cohesion_factor'][:, None])
+    acc[count == 0] = 0.0
+    if return_pairs:
+        return acc.reshape(shape), count.reshape(shape[:2]), (i, j, dist2)
+    return acc.reshape(shape), count.reshape(shape[:2])
+
+
+def parameter_grid(**values):
+    """
+    Every combination of the given parameter values, as {name: (S,) array};
+    e.g. parameter_grid(separation_factor=[1, 1.5], cohesion_factor=[0.5, 1, 2])
+    gives 6 scenarios.
+    """
+    names = list(values)
+    combos = list(itertools.product(*(values[name] for name in names)))
+    return {name: np.array([combo[k] for combo in combos], dtype=float) for k, name in enumerate(names)}
+
+
+def random_scenarios(num_scenarios, num_agents, width, height, max_speed, seed=None):
+    """Uniform positions and random headings/speeds as in Agent.__init__, as (S, N, 2) arrays."""
+    rng = generator('BatchedFlocks') if seed is None else np.random.default_rng(seed)
+    shape = (num_scenarios, num_agents)
+    pos = rng.random(shape + (2,)) * [width, height]
+    max_speed = np.broadcast_to(np.asarray(max_speed, dtype=float), (num_scenarios,))[:, None, None]
+    vel = _normalize(rng.random(shape + (2,)) - 0.5) * rng.random(shape + (1,)) * max_speed
+    return pos, vel
+
+
+class BatchedFlocks:
+    def __init__(self, positions, velocities, params=None, width=None, height=None, dt=1.0, config=None):
+        self.pos = np.array(positions, dtype=float)
+        self.vel = np.array(velocities, dtype=float)
+        if self.pos.ndim != 3 or self.pos.shape != self.vel.shape:
+            raise ValueError("positions and velocities must both be (scenarios, agents, 2) arrays")
+        self.num_scenarios, self.num_agents = self.pos.shape[:2]
+        params = params or {}
+        unknown = set(params) - set(FLOCK_PARAMS)
+        if unknown:
+            raise KeyError(f"Unknown flocking parameters: {', '.join(sorted(unknown))}")
+        # Anything not swept keeps its BOIDS_CONFIG value in every scenario
+        self.params = {name: np.broadcast_to(np.asarray(params.get(name, BOIDS_CONFIG[name]), dtype=float),
+                                             (self.num_scenarios,)).copy()
+                       for name in FLOCK_PARAMS}
+        self.width = float(width or GENERAL_CONFIG['width'])
+        self.height = float(height or GENERAL_CONFIG['height'])
+        self.dt = float(dt)
+        self.config = dict(BATCH_CONFIG, **(config or {}))
+        self.step_count = 0
+        self.recorder = FlockMetrics(self.num_scenarios, self.num_agents, self.width, self.height,
+                                     nn_range=self.params['perception_radius'].max())
+        # Scenarios still being stepped (all of them unless run() stopped converged ones)
+        self.active = np.arange(self.num_scenarios)
+        self.steps_run = np.zeros(self.num_scenarios, dtype=np.int64)
+        self._count = np.zeros((self.num_scenarios, self.num_agents))
+        self.pairs = None # (i, j, dist2) of the last step, flat indices into the active scenarios
+        self.prev_pos = self.pos.copy() # Positions the last step started from (active scenarios), which self.pairs refer to
+        self._values = None # Metrics recorded by the last step, if it recorded any
+
+    def step(self):
+        if not len(self.active):
+            return
+        subset = len(self.active) < self.num_scenarios
+        pos, vel = (self.pos[self.active], self.vel[self.active]) if subset else (self.pos, self.vel)
+        params = {name: values[self.active] for name, values in self.params.items()} if subset else self.params
+        acc, count, self.pairs = batched_accelerations(pos, vel, params, self.width, self.height, return_pairs=True)
+        self.prev_pos = pos
+        # Agent.update then Agent.edges
+        vel = _limit(vel + acc * self.dt, params['max_speed'][:, None])
+        pos = pos + vel * self.dt
+        x, y = pos[..., 0], pos[..., 1]
+        x[x > self.width] = 0
+        x[x < 0] = self.width
+        y[y > self.height] = 0
+        y[y < 0] = self.height
+        if subset:
+            self.pos[self.active], self.vel[self.active], self._count[self.active] = pos, vel, count
+        else:
+            self.pos, self.vel, self._count = pos, vel, count
+        self.steps_run[self.active] += 1
+        self.step_count += 1
+        self._values = None
+        if self.step_count % self.config['metrics_every'] == 0:
+            self.record_metrics()
+
+    def run(self, num_steps, detector=None):
+        """
+        Up to num_steps steps. With a ConvergenceDetector every recorded step
+        is passed to it, scenarios stop once it declares them converged and the
+        run ends when none are left.
+        """
+        for _ in range(num_steps):
+            self.step()
+            if detector is not None and self._values is not None:
+                detector.update(self.step_count, self._values)
+                self.active = self.active[~detector.converged[self.active]]
+                if not len(self.active):
+                    break
+        return self.pos, self.vel
+
+    def record_metrics(self):
+        '''Records the metrics of the active scenarios (FlockMetrics.record) from the last step's neighbour pairs.'''
+        subset = len(self.active) < self.num_scenarios
+        self._values = self.recorder.record(
+            self.step_count, self.pos[self.active] if subset else self.pos,
+            self.vel[self.active] if subset else self.vel, self.pairs,
+            count=self._count[self.active] if subset else self._count, scenarios=self.active if subset else None)
+
+    def metric_arrays(self):
+        """{metric: (recorded steps, scenarios) array} plus 'nn_histogram' and 'step' (FlockMetrics.arrays)."""
+        return self.recorder.arrays()
+
+    def scenario(self, index):
+        """Parameters, positions and velocities of one scenario."""
+        return ({name: float(values[index]) for name, values in self.params.items()},
+                self.pos[index].copy(), self.vel[index].copy())
+
+
+def benchmark(cfg=None):
+    """Batched scenarios vs. one flock of the same total size, a loop over scenarios and Boid objects."""
+    from boid import Boid
+    from partitioned import step_flock, _flock_params
+
+    cfg = cfg or BATCH_CONFIG
+    num_scenarios, num_agents, num_steps = cfg['benchmark_scenarios'], cfg['benchmark_agents'], cfg['benchmark_steps']
+    width, height = GENERAL_CONFIG['width'], GENERAL_CONFIG['height']
+    seed = GENERAL_CONFIG.get('random_seed', 0)
+    params = _flock_params(BOIDS_CONFIG)
+    grid = parameter_grid(**cfg['sweep'])
+    # Repeat the grid until there are num_scenarios scenarios
+    grid = {name: np.resize(values, num_scenarios) for name, values in grid.items()}
+    pos0, vel0 = random_scenarios(num_scenarios, num_agents, width, height, params['max_speed'], seed=seed)
+    total = num_scenarios * num_agents
+
+    # Same flocks stepped one at a time agree with the batched run
+    check = BatchedFlocks(pos0[:3], vel0[:3], {name: values[:3] for name, values in grid.items()})
+    check.run(10)
+    agree = True
+    for s in range(3):
+        p, v = pos0[s], vel0[s]
+        scenario_params = dict(params, **{name: float(values[s]) for name, values in grid.items()})
+        for _ in range(10):
+            p, v = step_flock(p, v, scenario_params, width, height)
+        agree &= np.allclose(p, check.pos[s]) and np.allclose(v, check.vel[s])
+
+    flocks = BatchedFlocks(pos0, vel0, grid)
+    start = time.perf_counter()
+    flocks.run(num_steps)
+    batched = time.perf_counter() - start
+    print(f"Batched: {num_scenarios} scenarios x {num_agents} boids, {num_steps} steps: "
+          f"{total * num_steps / batched:,.0f} agent-steps/s (matches per-scenario steps: {agree})")
+
+    # One flock with all the boids, in a world scaled to keep the same density
+    scale = np.sqrt(num_scenarios)
+    big_w, big_h = width * scale, height * scale
+    pos, vel = random_scenarios(1, total, big_w, big_h, params['max_speed'], seed=seed)
+    single_flock = BatchedFlocks(pos, vel, width=big_w, height=big_h)
+    start = time.perf_counter()
+    single_flock.run(num_steps)
+    single = time.perf_counter() - start
+    print(f"One flock of {total} boids: {total * num_steps / single:,.0f} agent-steps/s "
+          f"(batched takes {batched / single:.2f}x its time)")
+
+    loop_steps = max(1, num_steps // 10)
+    start = time.perf_counter()
+    for s in range(num_scenarios):
+        p, v = pos0[s], vel0[s]
+        scenario_params = dict(params, **{name: float(values[s]) for name, values in grid.items()})
+        for _ in range(loop_steps):
+            p, v = step_flock(p, v, scenario_params, width, height)
+    looped = time.perf_counter() - start
+    print(f"Loop over scenarios (partitioned.step_flock): {total * loop_steps / looped:,.0f} agent-steps/s "
+          f"(batched is {looped / loop_steps / (batched / num_steps):.1f}x as fast)")
+
+    boids = [Boid(x, y, params['max_speed'], params['max_force'], params['perception_radius'],
+                  params['separation_factor'], params['alignment_factor'], params['cohesion_factor'])
+             for x, y in pos0[0]]
+    object_steps = 2
+    start = time.perf_counter()
+    for _ in range(object_steps):
+        for boid in boids:
+            boid.flock(boids)
+        for boid in boids:
+            boid.update()
+            boid.edges(width, height)
+    objects = time.perf_counter() - start
+    object_rate, batched_rate = num_agents * object_steps / objects, total * num_steps / batched
+    print(f"Boid objects: {object_rate:,.0f} agent-steps/s (batched is {batched_rate / object_rate:.0f}x as fast)")
+
+    final = flocks.metric_arrays()
+    best = int(np.argmax(final['polarization'][-1]))
+    print(f"Most aligned scenario after {num_steps} steps: "
+          + ', '.join(f"{name}={values[best]:.2f}" for name, values in grid.items())
+          + f" (polarisation {final['polarization'][-1][best]:.2f})")
+
+if __name__ == '__main__':
+    benchmark()
@@ -2,10 +2,12 @@ import numpy as np
 from agent_base import Agent, normalize_vector, limit_vector
 
 class Boid(Agent):
+    __slots__ = ('perception_radius', 'separation_factor', 'alignment_factor', 'cohesion_factor')
+
     def __init__(self, x, y, max_speed, max_force, 
                  perception_radius=50.0, 
-                 sep_factor=1.5, ali_factor=1.0, coh_factor=1.0):
-        super().__init__(x, y, max_speed, max_force, color='cyan', size=8)
+                 sep_factor=1.5, ali_factor=1.0, coh_factor=1.0, population=None):
+        super().__init__(x, y, max_speed, max_force, color='cyan', size=8, population=population)
         self.perception_radius = perception_radius
         self.separation_factor = sep_factor
         self.alignment_factor = ali_factor
@@ -13,21 +15,24 @@ class Boid(Agent):
 
     def _get_neighbors(self, boids):
         neighbors = []
+        position, radius = self.position, self.perception_radius # Agent attributes are population lookups
         for other in boids:
             if other is self:
                 continue
-            dist = np.linalg.norm(self.position - other.position)
-            if 0 < dist < self.perception_radius:
+            dist = np.linalg.norm(position - other.position)
+            if 0 < dist < radius:
                 neighbors.append(other)
         return neighbors
 
     def separate(self, neighbors):
         steering = np.zeros(2)
         count = 0
+        position = self.position
         for other in neighbors:
-            dist = np.linalg.norm(self.position - other.position)
+            offset = position - other.position
+            dist = np.linalg.norm(offset)
             if dist > 0: # Avoid division by zero
-                diff = normalize_vector(self.position - other.position)
+                diff = normalize_vector(offset)
                 diff /= dist  # Weight by distance (closer boids have stronger repulsion)
                 steering += diff
                 count += 1
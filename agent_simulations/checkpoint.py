@@ -0,0 +1,120 @@
+'''
+Checkpoint and resume for agent simulations (any mix of Agent subclasses).
+
+Checkpoints capture every agent's state (Agent.get_state), the RNG state
+(`random`, `np.random` and the rng.py streams) and the step counter, so a
+resumed run follows the same trajectory as an uninterrupted one. Per-agent
+fields are stacked into one array per field. The file format and the
+background CheckpointWriter are shared with the network models
+(checkpoint_io.py); the step loop only pays for copying the state.
+'''
+import os
+import numpy as np
+
+import shared_path # Puts ../shared on sys.path
+import rng
+from checkpoint_io import CheckpointWriter, capture_global_rng_state, restore_global_rng_state, read_file, write_file
+
+
+def capture_rng_state():
+    """The global RNGs and the rng.py streams as (scalars, arrays)."""
+    scalars, arrays = capture_global_rng_state()
+    stream_scalars, stream_arrays = rng.service().get_state()
+    scalars['rng_streams'] = stream_scalars
+    arrays.update({'rng.' + k: v for k, v in stream_arrays.items()})
+    return scalars, arrays
+
+
+def restore_rng_state(scalars, arrays):
+    restore_global_rng_state(scalars, arrays)
+    rng.service().set_state(scalars['rng_streams'], {k[4:]: v for k, v in arrays.items() if k.startswith('rng.')})
+
+
+def pack_agents(agents):
+    """Stacks the per-agent state dicts into one array per field."""
+    records = [agent.get_state() for agent in agents]
+    scalars = {'agent_classes': [type(agent).__name__ for agent in agents]}
+    arrays = {}
+    keys = list(dict.fromkeys(key for record in records for key in record))
+    for key in keys:
+        values = [record.get(key) for record in records]
+        if key == 'history':
+            arrays['agents.history_lengths'] = np.array([len(v) for v in values], dtype=np.int64)
+            arrays['agents.history'] = np.concatenate(values) if values else np.zeros((0, 2))
+        elif all(isinstance(v, np.ndarray) for v in values) and len({v.shape for v in values}) == 1:
+            arrays['agents.' + key] = np.stack(values)
+        elif all(isinstance(v, (bool, int, float, np.number)) for v in values):
+            arrays['agents.' + key] = np.array(values)
+        else: # Strings, missing fields and anything irregular go into the JSON header
+            scalars['agents.' + key] = [v.tolist() if isinstance(v, np.ndarray) else v for v in values]
+    return scalars, arrays
+
+
+def unpack_agents(agents, scalars, arrays):
+    classes = scalars['agent_classes']
+    if [type(agent).__name__ for agent in agents] != classes:
+        raise ValueError(f"Checkpoint holds {len(classes)} agents of other types than the ones given")
+    ends = np.cumsum(arrays['agents.history_lengths'])
+    histories = np.split(arrays['agents.history'], ends[:-1]) if len(ends) else []
+    for i, agent in enumerate(agents):
+        state = {'history': histories[i]}
+        for name, arr in arrays.items():
+            if name.startswith('agents.') and name not in ('agents.history', 'agents.history_lengths'):
+                value = arr[i]
+                state[name[7:]] = value.item() if value.ndim == 0 else value
+        for name, values in scalars.items():
+            if name.startswith('agents.') and values[i] is not None:
+                state[name[7:]] = np.array(values[i]) if isinstance(values[i], list) else values[i]
+        agent.set_state(state)
+
+
+def snapshot(agents, step=None, extra=None):
+    '''Copies everything a checkpoint needs; cheap enough to do inside the step loop.'''
+    scalars, arrays = capture_rng_state()
+    agent_scalars, agent_arrays = pack_agents(agents)
+    scalars.update(agent_scalars)
+    scalars.update({'step': step, 'extra': extra})
+    arrays.update(agent_arrays)
+    return scalars, arrays
+
+
+def save_checkpoint(path, agents, step=None, extra=None):
+    """Writes a checkpoint synchronously. extra may hold any JSON-serialisable driver state."""
+    scalars, arrays = snapshot(agents, step, extra)
+    write_file(path, scalars, arrays)
+
+
+def load_checkpoint(path, agents):
+    """
+    Restores the agents (already constructed, same types and order as when
+    saved) and the RNG state; returns (step, extra).
+    """
+    scalars, arrays = read_file(path)
+    restore_rng_state(scalars, arrays)
+    unpack_agents(agents, scalars, arrays)
+    return scalars['step'], scalars['extra']
+
+
+def run_with_checkpoints(agents, step_fn, num_steps, path, every=None, resume=True, dt=1.0, get_extra=None,
+                         set_extra=None):
+    """
+    Calls step_fn(dt) num_steps times (e.g. a demo's physics step) with
+    periodic checkpoints. If resume is set and path exists, continues from
+    the saved step. Driver state beyond the agents (counters, schedules) is
+    saved as get_extra() and handed back to set_extra(extra) on resume.
+    """
+    every = every or 100
+    start = 0
+    if resume and os.path.exists(path):
+        start, extra = load_checkpoint(path, agents)
+        if set_extra is not None:
+            set_extra(extra)
+    writer = CheckpointWriter(snapshot)
+    try:
+        for step in range(start + 1, num_steps + 1):
+            step_fn(dt)
+            if step % every == 0 or step == num_steps:
+                writer.save(path, agents, step, get_extra() if get_extra is not None else None)
+    finally:
+        writer.close()
+    return agents
@@ -0,0 +1,78 @@
+'''
+Fixed-timestep simulation clock.
+
+Physics always advances in identical steps of dt / substeps, whatever the
+frame rate. Each rendered frame runs as many physics steps as it is owed and
+reports an interpolation factor for drawing between the last two physics
+states. Headless runs call the same step function with the same dt, so a
+rendered run and a headless run that reach the same step count are in the
+same state.
+'''
+import time
+
+
+class SimulationClock:
+    def __init__(self, dt=1.0, substeps=1, realtime=False, sim_speed=60.0, max_substeps_per_frame=None):
+        """
+        dt: simulation time covered by one rendered frame (1.0 matches the old per-frame update).
+        substeps: physics steps per frame; the physics step is dt / substeps.
+        realtime: if True, frames are paced by wall-clock time (sim_speed sim-time units per
+            second) so slow frames are dropped and physics catches up on the next one.
+        max_substeps_per_frame: cap on catch-up work per frame, to avoid a spiral of death.
+        """
+        self.dt = float(dt)
+        self.substeps = max(1, int(substeps))
+        self.step_dt = self.dt / self.substeps
+        self.realtime = realtime
+        self.sim_speed = float(sim_speed)
+        self.max_substeps_per_frame = max_substeps_per_frame or 4 * self.substeps
+
+        self.step_count = 0
+        self.sim_time = 0.0
+        self.accumulator = 0.0
+        self.alpha = 1.0
+        self._last_wall_time = None
+
+    def _frame_sim_time(self):
+        if not self.realtime:
+            return self.dt
+        now = time.perf_counter()
+        if self._last_wall_time is None:
+            self._last_wall_time = now
+            return self.dt
+        elapsed = now - self._last_wall_time
+        self._last_wall_time = now
+        return elapsed * self.sim_speed
+
+    def tick(self, step_fn):
+        """
+        Advances the simulation by one rendered frame, calling step_fn(step_dt)
+        for every physics step owed. Returns the interpolation factor alpha in
+        [0, 1] between the previous and current physics state.
+        """
+        self.accumulator += self._frame_sim_time()
+        steps = 0
+        # Small epsilon so that dt / substeps accumulates to exactly `substeps` steps per frame
+        while self.accumulator >= self.step_dt - 1e-9 and steps < self.max_substeps_per_frame:
+            step_fn(self.step_dt)
+            self.accumulator -= self.step_dt
+            self.step_count += 1
+            self.sim_time = self.step_count * self.step_dt
+            steps += 1
+        if steps == self.max_substeps_per_frame:
+            self.accumulator = min(self.accumulator, self.step_dt) # Drop the backlog we cannot catch up on
+        if self.realtime:
+            self.alpha = min(max(self.accumulator / self.step_dt, 0.0), 1.0)
+        else:
+            self.alpha = 1.0 # Whole frames only: draw the latest physics state
+        return self.alpha
+
+    def run(self, step_fn, num_frames):
+        """Headless: advances num_frames frames worth of physics, no rendering."""
+        for _ in range(num_frames):
+            for _ in range(self.substeps):
+                step_fn(self.step_dt)
+                self.step_count += 1
+            self.sim_time = self.step_count * self.step_dt
+        self.alpha = 1.0
+        return self.step_count
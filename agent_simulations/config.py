@@ -1,8 +1,16 @@
 GENERAL_CONFIG = {
     'width': 800,
     'height': 600,
+    'random_seed': 42,          # Seeds the agents' random streams (rng.py)
     'animation_frames': 200, 
     'animation_interval': 1, 
+    'dt': 1.0,                  # Simulation time per rendered frame (1.0 = legacy per-frame update)
+    'physics_substeps': 1,      # Physics steps per frame; raise it to stop fast agents tunnelling through obstacles
+    'realtime': False,          # Pace physics by wall-clock time and drop render frames under load
+    'sim_speed': 30.0,          # Simulation time units per second when realtime is on
+    'max_substeps_per_frame': 16,
+    'checkpoint_path': None,    # Headless runs checkpoint here (and resume from it) when set
+    'checkpoint_every': 100,    # Physics steps between checkpoints
 }
 
 BOIDS_CONFIG = {
@@ -29,8 +37,19 @@ PEDESTRIAN_CONFIG = {
         'num_static_obstacles': 5,
         'min_radius': 10,
         'max_radius': 18,
-        'color': 'gray'
-    }
+        'color': 'gray',
+        'scene_file': None,     # Optional JSON file with circles/walls/polygons (see obstacles.load_scene)
+        'wall_color': 'dimgray',
+    },
+    'navigation': {
+        'enabled': True,
+        'cell_size': 10.0,      # Grid resolution of the distance-to-goal fields
+        'clearance': 6.0,       # Extra margin around obstacles when rasterising
+        'cache_size': 32,       # Number of per-goal fields kept in the LRU cache
+    },
+    'destinations': None,       # Optional list of shared [x, y] exits; random goals if None
+    'dwell_steps': 0,           # Steps an arrived pedestrian waits before heading to a new goal; None stays for good.
+                                # Pedestrians at rest are not stepped (or drawn individually) until then
 }
 
 PURSUIT_EVASION_CONFIG = {
@@ -46,3 +65,60 @@ PURSUIT_EVASION_CONFIG = {
     },
     'background_color': (0.1, 0.1, 0.2), 
 }
+
+PARTITION_CONFIG = {
+    'tiles': (2, 2),            # Tiles along x and y; one worker process per tile
+    'buffer_headroom': 1.5,     # Halo/outbox records per tile, as a multiple of the largest halo seen
+    'benchmark_agents': 4000,
+    'benchmark_tiles': [(1, 1), (2, 1), (2, 2), (4, 2)],
+    'benchmark_steps': 20,
+}
+
+CONTACT_EPIDEMIC_CONFIG = {
+    'mobility': 'boids',        # 'boids' or 'pedestrians' (RandomWaypointCrowd) for the demo
+    'num_agents': 150,
+    'contact_radius': 15.0,     # Agents closer than this are in contact for the step
+    'infection_prob': 0.2,      # Per contact per step, as in SIRModel
+    'recovery_prob': 0.01,
+    'num_initial_infected': 3,
+    'speed': 1.3,               # RandomWaypointCrowd walking speed
+    'arrival_threshold': 8.0,
+    'max_simulation_steps': 600,
+    'colors': {'S': 'deepskyblue', 'I': 'red', 'R': 'limegreen'},
+    'benchmark_agents': 50000,  # The benchmark scales the world to keep the demo's density
+    'benchmark_steps': 50,
+}
+
+LOD_CONFIG = {
+    'mode': 'auto',             # 'auto' (by agent count), 'full', 'points' or 'density'
+    'full_max_agents': 300,     # Up to this many agents draw themselves (trails, FOV)
+    'points_max_agents': 5000,  # Up to this many: one scatter; above: a density image
+    'density_bins': (160, 120), # Histogram resolution (x, y) of the density image
+    'detail_sample': 30,        # Agents still drawn in full detail above full_max_agents
+    'point_size': 4,
+    'cmap': 'inferno',          # Density colour map when agents carry no category
+}
+
+BATCH_CONFIG = {
+    'metrics_every': 1,         # Steps between recorded per-scenario metrics
+    'nn_bins': 20,              # Nearest-neighbour distance histogram bins over [0, perception_radius)
+    'convergence': {            # flock_metrics.ConvergenceDetector
+        'tolerances': {         # Steady once, over the window, the std of each and the drift between
+            'polarization': 0.01,   # the window's halves are both at most this
+            'angular_momentum': 0.02,
+        },
+        'window': 200,          # Recorded metric values the test looks at; shorter stops sooner but less accurately
+        'min_steps': 200,       # No scenario stops before this step
+        'benchmark_scenarios': 100,
+        'benchmark_max_steps': 2000,
+    },
+    'sweep': {                  # Parameter grid of the benchmark (repeated up to benchmark_scenarios)
+        'separation_factor': [0.8, 1.2, 1.6, 2.0],
+        'alignment_factor': [0.5, 1.0, 1.5],
+        'cohesion_factor': [0.6, 1.2, 1.8],
+        'perception_radius': [40.0, 70.0],
+    },
+    'benchmark_scenarios': 500,
+    'benchmark_agents': 100,
+    'benchmark_steps': 50,
+}
@@ -0,0 +1,228 @@
+'''
+Epidemics on agent contact networks: every step, agents within
+contact_radius of each other are in contact, and an SIR process spreads
+over those contacts.
+
+Contacts are found with a uniform grid of cells at least contact_radius
+wide. Agents are bucketed by cell (one sort), and each cell is only
+compared against itself and four of its eight neighbours (the other four
+see it from their side), so every pair within the radius is produced
+exactly once and the cost grows with the number of agents times the local
+density rather than with the number of pairs.
+
+ContactSIRModel follows SIRModel's rules and bookkeeping: an infected
+agent first tries to recover and, if it stays infected, gets one infection
+trial (infection_prob) per susceptible contact; all changes apply at the
+end of the step. Counts are kept in s_counts / i_counts / r_counts /
+timesteps like SIRModel, plus contact_counts for the contacts per step.
+'''
+import time
+import numpy as np
+
+from config import GENERAL_CONFIG, CONTACT_EPIDEMIC_CONFIG
+
+# Half of the 3x3 neighbourhood (plus the cell itself); the mirrored offsets are covered from the other cell
+HALF_NEIGHBORHOOD = ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+
+def agent_positions(agents):
+    '''Stacks the positions of Agent objects into an (N, 2) array.'''
+    return np.array([agent.position for agent in agents], dtype=float).reshape(-1, 2)
+
+
+def expand_ranges(starts, lengths):
+    '''Concatenation of range(s, s + n) for each (s, n), vectorised.'''
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+def find_contacts(positions, radius, width, height, periodic=True):
+    """
+    All pairs of agents closer than radius, as an (E, 2) array of agent
+    indices. With periodic set, distances wrap around the world edges like
+    Agent.edges does.
+    """
+    positions = np.asarray(positions, dtype=float)
+    n = len(positions)
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    cols = max(1, int(width // radius))
+    rows = max(1, int(height // radius))
+    cell_w, cell_h = width / cols, height / rows
+
+    cx = np.clip((positions[:, 0] // cell_w).astype(np.int64), 0, cols - 1)
+    cy = np.clip((positions[:, 1] // cell_h).astype(np.int64), 0, rows - 1)
+    order = np.argsort(cy * cols + cx, kind='stable')
+    pos, cx, cy = positions[order], cx[order], cy[order]
+    counts = np.bincount(cy * cols + cx, minlength=cols * rows)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(n)
+
+    pairs = []
+    for dx, dy in HALF_NEIGHBORHOOD:
+        ncx, ncy = cx + dx, cy + dy
+        if periodic:
+            ncx, ncy = ncx % cols, ncy % rows
+            valid = np.ones(n, dtype=bool)
+        else:
+            valid = (ncx >= 0) & (ncx < cols) & (ncy < rows)
+        key = ncy[valid] * cols + ncx[valid]
+        src = rank[valid]
+        if dx == 0 and dy == 0: # Same cell: only later agents, so each pair appears once
+            lo = src + 1
+            length = starts[key] + counts[key] - lo
+        else:
+            lo = starts[key]
+            length = counts[key]
+        i = np.repeat(src, length)
+        j = expand_ranges(lo, length)
+        d = pos[i] - pos[j]
+        if periodic:
+            d[:, 0] -= width * np.round(d[:, 0] / width)
+            d[:, 1] -= height * np.round(d[:, 1] / height)
+        close = (np.einsum('ij,ij->i', d, d) < radius * radius) & (i != j)
+        pairs.append(np.stack((i[close], j[close]), axis=1))
+
+    contacts = order[np.concatenate(pairs)]
+    if periodic and (cols < 3 or rows < 3):
+        # Neighbour offsets alias each other on grids this small; keep each pair once
+        contacts = np.unique(np.sort(contacts, axis=1), axis=0)
+    return contacts
+
+
+class ContactSIRModel:
+    def __init__(self, num_agents, infection_prob, recovery_prob, susceptible_state='S', infected_state='I',
+                 recovered_state='R', seed=None):
+        self.num_nodes = num_agents
+        self.infection_prob = infection_prob
+        self.recovery_prob = recovery_prob
+
+        self.SUSCEPTIBLE = susceptible_state
+        self.INFECTED = infected_state
+        self.RECOVERED = recovered_state
+        self.labels = [susceptible_state, infected_state, recovered_state]
+
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros(num_agents, dtype=np.uint8) # 0 = S, 1 = I, 2 = R
+
+        self.s_counts = [num_agents]
+        self.i_counts = [0]
+        self.r_counts = [0]
+        self.contact_counts = [0]
+        self.timesteps = [0]
+
+    def set_initial_infected_nodes(self, initial_infected_nodes):
+        """Sets the initial set of infected agents (by index)."""
+        for node in initial_infected_nodes:
+            if 0 <= node < self.num_nodes and self.states[node] == 0:
+                self.states[node] = 1
+            else:
+                print(f"Warning: Agent {node} does not exist or is not susceptible, cannot infect initially.")
+        counts = np.bincount(self.states, minlength=3)
+        self.s_counts[-1], self.i_counts[-1], self.r_counts[-1] = (int(c) for c in counts)
+
+    def step(self, current_time_step, contacts):
+        """One SIR step over the (E, 2) contact pairs; returns (newly infected, newly recovered)."""
+        states = self.states
+        infected = states == 1
+        recovering = infected & (self.rng.random(self.num_nodes) < self.recovery_prob)
+        transmitting = infected & ~recovering
+        susceptible = states == 0
+
+        a, b = contacts[:, 0], contacts[:, 1]
+        forward = transmitting[a] & susceptible[b]
+        backward = transmitting[b] & susceptible[a]
+        targets = np.concatenate((b[forward], a[backward]))
+        hit = targets[self.rng.random(len(targets)) < self.infection_prob]
+        newly_infected = np.unique(hit)
+
+        states[newly_infected] = 1
+        states[recovering] = 2
+        num_infected, num_recovered = len(newly_infected), int(np.count_nonzero(recovering))
+
+        self.s_counts.append(self.s_counts[-1] - num_infected)
+        self.i_counts.append(self.i_counts[-1] + num_infected - num_recovered)
+        self.r_counts.append(self.r_counts[-1] + num_recovered)
+        self.contact_counts.append(len(contacts))
+        self.timesteps.append(current_time_step)
+        return num_infected, num_recovered
+
+    def run(self, next_positions, radius, width, height, max_steps=100, periodic=True):
+        """
+        Runs until no agent is infected or max_steps is reached.
+        next_positions() advances the agents by one step and returns their
+        (N, 2) positions.
+        """
+        for t in range(1, max_steps + 1):
+            contacts = find_contacts(next_positions(), radius, width, height, periodic)
+            self.step(t, contacts)
+            if self.i_counts[-1] == 0:
+                break
+        return self.s_counts, self.i_counts, self.r_counts, self.timesteps
+
+    def get_current_states(self):
+        return {i: self.labels[code] for i, code in enumerate(self.states.tolist())}
+
+
+class RandomWaypointCrowd:
+    '''
+    Vectorised pedestrian-like mobility for large populations: each agent
+    walks towards a random destination and picks a new one on arrival.
+    '''
+    def __init__(self, num_agents, width, height, speed, arrival_threshold, seed=None):
+        self.width, self.height = float(width), float(height)
+        self.speed = float(speed)
+        self.arrival_threshold = float(arrival_threshold)
+        self.rng = np.random.default_rng(seed)
+        self.positions = self._random_points(num_agents)
+        self.destinations = self._random_points(num_agents)
+
+    def _random_points(self, n):
+        return self.rng.random((n, 2)) * [self.width, self.height]
+
+    def step(self, dt=1.0):
+        offset = self.destinations - self.positions
+        dist = np.sqrt(np.einsum('ij,ij->i', offset, offset))
+        arrived = dist < self.arrival_threshold
+        if arrived.any():
+            self.destinations[arrived] = self._random_points(int(arrived.sum()))
+        travel = np.minimum(dist, self.speed * dt)
+        self.positions += offset * (travel / np.where(dist > 0, dist, 1.0))[:, None]
+        return self.positions
+
+
+def benchmark(num_agents=None, num_steps=None):
+    """Checks the grid contacts against brute force, then times an epidemic through a large crowd."""
+    cfg = CONTACT_EPIDEMIC_CONFIG
+    num_agents = num_agents or cfg['benchmark_agents']
+    num_steps = num_steps or cfg['benchmark_steps']
+    seed = GENERAL_CONFIG.get('random_seed', 0)
+    radius = cfg['contact_radius']
+
+    # Brute-force check on a small crowd, including wrap-around pairs
+    width, height = GENERAL_CONFIG['width'], GENERAL_CONFIG['height']
+    pos = np.random.default_rng(seed).random((1500, 2)) * [width, height]
+    d = np.abs(pos[:, None, :] - pos[None, :, :])
+    d = np.minimum(d, [width, height] - d)
+    i, j = np.nonzero(np.triu(np.sum(d * d, axis=2) < radius * radius, k=1))
+    expected = set(zip(i.tolist(), j.tolist()))
+    found = set(map(tuple, np.sort(find_contacts(pos, radius, width, height), axis=1).tolist()))
+    print(f"Grid contacts match brute force: {found == expected} ({len(expected)} pairs)")
+
+    # Keep the density of the configured world as the population grows
+    scale = np.sqrt(num_agents / cfg['num_agents'])
+    width, height = width * scale, height * scale
+    crowd = RandomWaypointCrowd(num_agents, width, height, cfg['speed'], cfg['arrival_threshold'], seed=seed)
+    model = ContactSIRModel(num_agents, cfg['infection_prob'], cfg['recovery_prob'], seed=seed)
+    model.set_initial_infected_nodes(range(cfg['num_initial_infected']))
+    start = time.perf_counter()
+    model.run(crowd.step, radius, width, height, max_steps=num_steps, periodic=False)
+    elapsed = time.perf_counter() - start
+    steps = len(model.timesteps) - 1
+    print(f"{num_agents} agents, {steps} steps: {elapsed / steps * 1000:.1f} ms/step, "
+          f"{np.mean(model.contact_counts[1:]):,.0f} contacts/step, "
+          f"final S/I/R {model.s_counts[-1]}/{model.i_counts[-1]}/{model.r_counts[-1]}")
+
+if __name__ == '__main__':
+    benchmark()
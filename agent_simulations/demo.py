@@ -1,25 +1,52 @@
 '''
 Demo for the Pedestrian model.
 '''
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import random
 import numpy as np
 
 from utils import setup_plot
 from boid import Boid
 from pedestrian import Pedestrian
 from actors import Evader, Pursuer
+from obstacles import ObstacleBVH, load_scene
+from navigation import NavigationGrid
+from clock import SimulationClock
+from checkpoint import run_with_checkpoints
+from render_lod import LevelOfDetail
+import shared_path # Puts ../shared on sys.path
+from active_set import ActiveSet
+from rng import draws, generator
+from plotting import pyplot, matplotlib_module
+from contact_epidemic import ContactSIRModel, RandomWaypointCrowd, agent_positions, find_contacts
 from config import *
 
 WIDTH = GENERAL_CONFIG['width']
 HEIGHT = GENERAL_CONFIG['height']
 
-def run_boids_demo():
-    fig, ax = setup_plot(WIDTH, HEIGHT, "6.1 Boids Model Demo")
-    
+def make_clock():
+    return SimulationClock(dt=GENERAL_CONFIG['dt'],
+                           substeps=GENERAL_CONFIG['physics_substeps'],
+                           realtime=GENERAL_CONFIG['realtime'],
+                           sim_speed=GENERAL_CONFIG['sim_speed'],
+                           max_substeps_per_frame=GENERAL_CONFIG['max_substeps_per_frame'])
+
+def run_headless(clock, step, agents, num_frames, get_extra=None, set_extra=None):
+    '''
+    Advances without rendering, checkpointing if GENERAL_CONFIG['checkpoint_path'] is set
+    (with the demo's own state from get_extra / set_extra, see run_with_checkpoints).
+    '''
+    path = GENERAL_CONFIG.get('checkpoint_path')
+    if path:
+        run_with_checkpoints(agents, step, num_frames * clock.substeps, path,
+                             every=GENERAL_CONFIG['checkpoint_every'], dt=clock.step_dt,
+                             get_extra=get_extra, set_extra=set_extra)
+    else:
+        clock.run(step, num_frames)
+
+def run_boids_demo(headless=False):
     num_boids = BOIDS_CONFIG['num_agents']
-    boids = [Boid(random.uniform(0, WIDTH), random.uniform(0, HEIGHT), 
+    # Set-up draws come from named streams (rng.py), so GENERAL_CONFIG['random_seed'] fixes the whole run
+    scene = generator('demo.boids')
+    boids = [Boid(scene.uniform(0, WIDTH), scene.uniform(0, HEIGHT), 
                   max_speed=BOIDS_CONFIG['max_speed'], 
                   max_force=BOIDS_CONFIG['max_force'], 
                   perception_radius=BOIDS_CONFIG['perception_radius'],
@@ -27,20 +54,32 @@ def run_boids_demo():
                   ali_factor=BOIDS_CONFIG['alignment_factor'], 
                   coh_factor=BOIDS_CONFIG['cohesion_factor']) 
              for _ in range(num_boids)]
+    clock = make_clock()
+
+    def step(dt):
+        for boid in boids:
+            boid.flock(boids)
+            boid.update(dt)
+            boid.edges(WIDTH, HEIGHT)
+
+    if headless:
+        run_headless(clock, step, boids, GENERAL_CONFIG['animation_frames'])
+        return boids
+
+    plt, animation = pyplot(), matplotlib_module('animation')
+    fig, ax = setup_plot(WIDTH, HEIGHT, "6.1 Boids Model Demo")
+    lod = LevelOfDetail(WIDTH, HEIGHT)
 
     def update_boids(frame):
+        alpha = clock.tick(step)
         ax.clear()
         ax.set_xlim(0, WIDTH)
         ax.set_ylim(0, HEIGHT)
         ax.set_facecolor(BOIDS_CONFIG['background_color'])
         
-        for boid in boids:
-            boid.flock(boids)
-            boid.update()
-            boid.edges(WIDTH, HEIGHT)
-            boid.display(ax)
-        # Return a list of artists to be redrawn for blitting
-        return ax.patches + ax.lines 
+        lod.draw_agents(ax, boids, alpha)
+        # Return a list of artists to be redrawn for blitting (images/collections in the aggregated LOD modes)
+        return ax.images + ax.collections + ax.patches + ax.lines
 
     # Use blit=True for smoother animation if possible, requires update function to return artists
     ani = animation.FuncAnimation(fig, update_boids, 
@@ -49,23 +88,54 @@ def run_boids_demo():
                                 blit=True)
     plt.show()
 
-def run_pedestrian_demo():
-    fig, ax = setup_plot(WIDTH, HEIGHT, "6.2 Pedestrian Model with Obstacles and FOV Demo") # Updated title
-    
+def run_pedestrian_demo(headless=False):
     cfg = PEDESTRIAN_CONFIG
     num_pedestrians = cfg['num_agents']
     
     pedestrians = []
+    # The scene is rebuilt from a fresh stream, so a resumed run gets the same obstacles; destinations drawn
+    # while running come from a service stream, which checkpoints save and restore
+    scene = generator('demo.pedestrians')
+    destination_rng = draws('demo.destinations')
 
     def create_random_destination(current_pos, min_dist=WIDTH/4): # Ensure destination is reasonably far
         """Creates a random destination sufficiently far from current_pos."""
+        if cfg.get('destinations'): # Shared exits: one cached navigation field per exit
+            candidates = [np.array(d, dtype=float) for d in cfg['destinations']]
+            far = [d for d in candidates if np.linalg.norm(d - current_pos) > min_dist] or candidates
+            return far[int(destination_rng.random() * len(far))]
         while True:
-            dest = np.random.rand(2) * [WIDTH, HEIGHT]
+            dest = destination_rng.take(2) * [WIDTH, HEIGHT]
             if np.linalg.norm(dest - current_pos) > min_dist:
                 return dest
 
+    # Create static obstacles based on config
+    static_obstacles_cfg = cfg['obstacle_settings']
+    static_obstacles = []
+    for _ in range(static_obstacles_cfg['num_static_obstacles']):
+        # Ensure obstacles are not too close to edges initially
+        obs_pos = scene.random(2) * [WIDTH * 0.8, HEIGHT * 0.8] + [WIDTH * 0.1, HEIGHT * 0.1] 
+        obs_radius = scene.uniform(static_obstacles_cfg['min_radius'], static_obstacles_cfg['max_radius'])
+        static_obstacles.append({'position': obs_pos, 'radius': obs_radius, 'color': static_obstacles_cfg['color']})
+
+    # Walls and polygons from an optional scene file share one BVH with the circles
+    walls, polygons = [], []
+    if static_obstacles_cfg.get('scene_file'):
+        scene_circles, walls, polygons = load_scene(static_obstacles_cfg['scene_file'])
+        static_obstacles.extend(scene_circles)
+    obstacle_bvh = ObstacleBVH(static_obstacles, walls, polygons)
+    wall_segments = obstacle_bvh.segments()
+
+    nav_cfg = cfg.get('navigation', {})
+    navigator = None
+    if nav_cfg.get('enabled'):
+        navigator = NavigationGrid(WIDTH, HEIGHT, obstacle_bvh,
+                                   cell_size=nav_cfg['cell_size'],
+                                   clearance=nav_cfg['clearance'],
+                                   cache_size=nav_cfg['cache_size'])
+
     for _ in range(num_pedestrians):
-        start_pos = np.random.rand(2) * [WIDTH, HEIGHT]
+        start_pos = scene.random(2) * [WIDTH, HEIGHT]
         destination = create_random_destination(start_pos)
         ped = Pedestrian(start_pos[0], start_pos[1],
                          max_speed=cfg['max_speed'], 
@@ -75,22 +145,68 @@ def run_pedestrian_demo():
                          d_max_collision_dist=cfg['d_max_collision_dist'],
                          num_fov_samples=cfg['num_fov_samples'],
                          arrival_threshold=cfg['arrival_threshold'],
-                         size=random.uniform(6,9)) 
+                         size=scene.uniform(6,9),
+                         navigator=navigator) 
         pedestrians.append(ped)
 
-    # Create static obstacles based on config
-    static_obstacles_cfg = cfg['obstacle_settings']
-    static_obstacles = []
-    for _ in range(static_obstacles_cfg['num_static_obstacles']):
-        # Ensure obstacles are not too close to edges initially
-        obs_pos = np.random.rand(2) * [WIDTH * 0.8, HEIGHT * 0.8] + [WIDTH * 0.1, HEIGHT * 0.1] 
-        obs_radius = random.uniform(static_obstacles_cfg['min_radius'], static_obstacles_cfg['max_radius'])
-        static_obstacles.append({'position': obs_pos, 'radius': obs_radius, 'color': static_obstacles_cfg['color']})
+    clock = make_clock()
+    # Pedestrians at rest at their destination sleep until their dwell time is up
+    active = ActiveSet(pedestrians, pedestrians)
+    dwell = cfg.get('dwell_steps', 0)
+    departures = {} # pedestrian -> step at which it leaves for a new destination
+    step_count = 0
+
+    def step(dt):
+        nonlocal step_count
+        step_count += 1
+        for p in [p for p, due in departures.items() if due <= step_count]:
+            del departures[p]
+            p.set_destination(create_random_destination(p.position))
+            active.wake(p)
+        all_ped_objects = list(pedestrians) 
+
+        for p in active.members():
+            i = active.rank[p]
+            other_peds_for_current = all_ped_objects[:i] + all_ped_objects[i+1:]
+            
+            p.update_behavior(obstacle_bvh, other_peds_for_current, WIDTH, HEIGHT)
+            p.update(dt)
+            p.edges(WIDTH, HEIGHT) 
+
+            if p.is_arrived:
+                if dwell == 0:
+                    p.set_destination(create_random_destination(p.position))
+                    continue
+                if dwell is not None and p not in departures:
+                    departures[p] = step_count + dwell
+                if p.is_settled():
+                    active.sleep(p)
+
+    def get_extra():
+        '''The dwell schedule and the resting pedestrians, by index, for checkpoints.'''
+        return {'step_count': step_count,
+                'departures': [[active.rank[p], due] for p, due in departures.items()],
+                'active': [i for i, p in enumerate(pedestrians) if p in active]}
+
+    def set_extra(extra):
+        nonlocal step_count
+        step_count = extra['step_count']
+        departures.clear()
+        departures.update((pedestrians[i], due) for i, due in extra['departures'])
+        active.reset(pedestrians[i] for i in extra['active'])
+
+    if headless:
+        run_headless(clock, step, pedestrians, GENERAL_CONFIG['animation_frames'] + 50, get_extra, set_extra)
+        return pedestrians
 
+    plt, animation = pyplot(), matplotlib_module('animation')
     # Create patches for obstacles for efficient drawing if they don't change
     obstacle_patches = [plt.Circle(obs['position'], obs['radius'], color=obs['color'], alpha=0.7) for obs in static_obstacles]
-    
+    fig, ax = setup_plot(WIDTH, HEIGHT, "6.2 Pedestrian Model with Obstacles and FOV Demo") # Updated title
+    lod = LevelOfDetail(WIDTH, HEIGHT)
+
     def update_pedestrians(frame):
+        alpha = clock.tick(step)
         ax.clear()
         ax.set_xlim(0, WIDTH)
         ax.set_ylim(0, HEIGHT)
@@ -102,21 +218,13 @@ def run_pedestrian_demo():
             # Instead, if patches are static, they should ideally be drawn once or handled carefully with blitting.
             # For simplicity without complex blitting management of static artists:
             ax.add_artist(plt.Circle(patch.center, patch.radius, color=patch.get_facecolor(), alpha=patch.get_alpha()))
+        for (x1, y1), (x2, y2) in wall_segments:
+            ax.plot([x1, x2], [y1, y2], color=static_obstacles_cfg.get('wall_color', 'dimgray'), linewidth=2)
 
-
-        all_ped_objects = list(pedestrians) 
-
-        for i, p in enumerate(pedestrians):
-            other_peds_for_current = all_ped_objects[:i] + all_ped_objects[i+1:]
-            
-            p.update_behavior(static_obstacles, other_peds_for_current, WIDTH, HEIGHT)
-            p.update()
-            p.edges(WIDTH, HEIGHT) 
-            p.display(ax)
-
-            if p.is_arrived:
-                p.destination = create_random_destination(p.position)
-                p.is_arrived = False
+        lod.draw_agents(ax, [p for p in pedestrians if p in active], alpha)
+        resting = [p for p in pedestrians if p not in active]
+        if resting:
+            lod.draw_positions(ax, [p.position for p in resting], point_colors=[p.color for p in resting])
         
         # Return all artists that need to be redrawn for blitting
         # This includes agent bodies, history trails, and potentially FOV lines/destination lines if drawn by display()
@@ -125,6 +233,7 @@ def run_pedestrian_demo():
             drawn_artists.append(p_artist)
         for l_artist in ax.lines: # History trails, destination lines are lines
             drawn_artists.append(l_artist)
+        drawn_artists.extend(ax.images + ax.collections) # Density image / point sprites in the LOD modes
         # Obstacles are already handled by re-adding them as artists above for non-blit or simple blit.
         # If true blitting with static elements is desired, a more complex setup is needed.
         return drawn_artists
@@ -136,38 +245,50 @@ def run_pedestrian_demo():
                                 blit=True) # blit=True requires the update function to return a list of artists
     plt.show()
 
-def run_pursuit_evasion_demo():
-    fig, ax = setup_plot(WIDTH, HEIGHT, "6.3 Multi-Robot Pursuit-Evasion Demo")
-    
+def run_pursuit_evasion_demo(headless=False):
     evader_config = PURSUIT_EVASION_CONFIG['evader']
-    evader = Evader(random.uniform(0, WIDTH), random.uniform(0, HEIGHT), 
+    scene = generator('demo.pursuit_evasion')
+    evader = Evader(scene.uniform(0, WIDTH), scene.uniform(0, HEIGHT), 
                     max_speed=evader_config['max_speed'], 
                     max_force=evader_config['max_force'],
                     flee_radius=evader_config['flee_radius'])
     
     pursuer_config = PURSUIT_EVASION_CONFIG['pursuer']
     num_pursuers = pursuer_config['num_agents']
-    pursuers = [Pursuer(random.uniform(0, WIDTH), random.uniform(0, HEIGHT),
+    pursuers = [Pursuer(scene.uniform(0, WIDTH), scene.uniform(0, HEIGHT),
                         max_speed=pursuer_config['max_speed'], 
                         max_force=pursuer_config['max_force'])
                 for _ in range(num_pursuers)]
+    clock = make_clock()
+
+    def step(dt):
+        evader.update_behavior(pursuers) 
+        evader.update(dt)
+        evader.edges(WIDTH, HEIGHT)
+
+        for p in pursuers:
+            p.update_behavior(evader) 
+            p.update(dt)
+            p.edges(WIDTH, HEIGHT)
+
+    if headless:
+        run_headless(clock, step, [evader] + pursuers, GENERAL_CONFIG['animation_frames'])
+        return evader, pursuers
+
+    plt, animation = pyplot(), matplotlib_module('animation')
+    fig, ax = setup_plot(WIDTH, HEIGHT, "6.3 Multi-Robot Pursuit-Evasion Demo")
 
     def update_pursuit_evasion(frame):
+        alpha = clock.tick(step)
         ax.clear()
         ax.set_xlim(0, WIDTH)
         ax.set_ylim(0, HEIGHT)
         ax.set_facecolor(PURSUIT_EVASION_CONFIG['background_color'])
 
-        evader.update_behavior(pursuers) 
-        evader.update()
-        evader.edges(WIDTH, HEIGHT)
-        evader.display(ax)
+        evader.display(ax, alpha)
 
         for p in pursuers:
-            p.update_behavior(evader) 
-            p.update()
-            p.edges(WIDTH, HEIGHT)
-            p.display(ax)
+            p.display(ax, alpha)
             if np.linalg.norm(p.position - evader.position) < p.size + evader.size + 10: 
                  ax.plot([p.position[0], evader.position[0]], 
                          [p.position[1], evader.position[1]], 
@@ -181,5 +302,84 @@ def run_pursuit_evasion_demo():
                                 blit=True)
     plt.show()
 
+def run_contact_epidemic_demo(headless=False):
+    '''SIR spreading through moving boids (or a pedestrian crowd) by proximity contacts.'''
+    cfg = CONTACT_EPIDEMIC_CONFIG
+    num_agents = cfg['num_agents']
+    radius = cfg['contact_radius']
+    model = ContactSIRModel(num_agents, cfg['infection_prob'], cfg['recovery_prob'],
+                            seed=GENERAL_CONFIG.get('random_seed'))
+    scene = generator('demo.contact_epidemic')
+    model.set_initial_infected_nodes(scene.choice(num_agents, cfg['num_initial_infected'], replace=False).tolist())
+
+    if cfg['mobility'] == 'boids':
+        boids = [Boid(scene.uniform(0, WIDTH), scene.uniform(0, HEIGHT),
+                      max_speed=BOIDS_CONFIG['max_speed'],
+                      max_force=BOIDS_CONFIG['max_force'],
+                      perception_radius=BOIDS_CONFIG['perception_radius'],
+                      sep_factor=BOIDS_CONFIG['separation_factor'],
+                      ali_factor=BOIDS_CONFIG['alignment_factor'],
+                      coh_factor=BOIDS_CONFIG['cohesion_factor'])
+                 for _ in range(num_agents)]
+
+        def move(dt):
+            for boid in boids:
+                boid.flock(boids)
+                boid.update(dt)
+                boid.edges(WIDTH, HEIGHT)
+            return agent_positions(boids)
+        periodic = True
+    else:
+        crowd = RandomWaypointCrowd(num_agents, WIDTH, HEIGHT, cfg['speed'], cfg['arrival_threshold'],
+                                    seed=generator('demo.crowd'))
+        move = crowd.step
+        periodic = False
+
+    clock = make_clock()
+    positions = [np.zeros((num_agents, 2))]
+
+    def step(dt):
+        if model.timesteps[-1] >= cfg['max_simulation_steps']:
+            return
+        positions[0] = move(dt)
+        model.step(model.timesteps[-1] + 1, find_contacts(positions[0], radius, WIDTH, HEIGHT, periodic))
+
+    if headless:
+        clock.run(step, cfg['max_simulation_steps'])
+        return model
+
+    plt, animation = pyplot(), matplotlib_module('animation')
+    fig, (ax, ax_counts) = plt.subplots(1, 2, figsize=(12, 5), gridspec_kw={'width_ratios': [3, 2]})
+    colors = [cfg['colors']['S'], cfg['colors']['I'], cfg['colors']['R']]
+    lod = LevelOfDetail(WIDTH, HEIGHT)
+
+    def update_epidemic(frame):
+        clock.tick(step)
+        ax.clear()
+        ax.set_xlim(0, WIDTH)
+        ax.set_ylim(0, HEIGHT)
+        ax.set_aspect('equal')
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_facecolor(BOIDS_CONFIG['background_color'])
+        lod.draw_positions(ax, positions[0], categories=model.states, colors=colors)
+        ax.set_title(f"Contact epidemic - Step: {model.timesteps[-1]} ({model.contact_counts[-1]} contacts)")
+
+        ax_counts.clear()
+        ax_counts.plot(model.timesteps, model.s_counts, label='Susceptible', color=cfg['colors']['S'])
+        ax_counts.plot(model.timesteps, model.i_counts, label='Infected', color=cfg['colors']['I'])
+        ax_counts.plot(model.timesteps, model.r_counts, label='Recovered', color=cfg['colors']['R'])
+        ax_counts.set_xlabel("Time Steps")
+        ax_counts.set_ylabel("Number of Agents")
+        ax_counts.legend()
+        ax_counts.grid(True)
+        return ax.collections + ax.images + ax_counts.lines
+
+    ani = animation.FuncAnimation(fig, update_epidemic,
+                                frames=cfg['max_simulation_steps'],
+                                interval=GENERAL_CONFIG['animation_interval'],
+                                blit=False)
+    plt.show()
+
 if __name__ == '__main__':
     run_pedestrian_demo()
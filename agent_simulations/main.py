@@ -1,14 +1,15 @@
-from demo import run_boids_demo, run_pedestrian_demo, run_pursuit_evasion_demo
+from demo import run_boids_demo, run_pedestrian_demo, run_pursuit_evasion_demo, run_contact_epidemic_demo
 
 def main():
     print("Select the simulation to run:")
     print("1: Boids Flocking Model")
     print("2: Pedestrian Wander Model")
     print("3: Pursuit-Evasion Model")
+    print("4: Contact Epidemic (SIR over agent contacts)")
     
     while True:
         try:
-            choice = input("Enter your choice (1, 2, or 3): ")
+            choice = input("Enter your choice (1, 2, 3, or 4): ")
             if choice == '1':
                 print("Starting Boids Flocking Model Demo...")
                 run_boids_demo()
@@ -21,8 +22,12 @@ def main():
                 print("Starting Pursuit-Evasion Model Demo...")
                 run_pursuit_evasion_demo()
                 break
+            elif choice == '4':
+                print("Starting Contact Epidemic Demo...")
+                run_contact_epidemic_demo()
+                break
             else:
-                print("Invalid choice. Please enter 1, 2, or 3.")
+                print("Invalid choice. Please enter 1, 2, 3, or 4.")
         except ValueError:
             print("Invalid input. Please enter a number.")
         except KeyboardInterrupt:
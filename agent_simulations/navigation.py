@@ -0,0 +1,156 @@
+'''
+Global path planning for the pedestrian model.
+
+The world is rasterised into a grid of free/blocked cells once. For each goal
+cell a distance-to-goal field is computed with Dijkstra's algorithm and turned
+into a flow field (one unit direction per cell). Fields are kept in an LRU
+cache keyed by goal cell, so any number of pedestrians heading for the same
+exit share a single field computation.
+'''
+import heapq
+import math
+from collections import OrderedDict
+import numpy as np
+
+from obstacles import ObstacleBVH, polygon_edges
+
+# 8-connected neighbourhood: (di, dj, step cost)
+NEIGHBOR_OFFSETS = [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0),
+                    (-1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)), (1, -1, math.sqrt(2)), (1, 1, math.sqrt(2))]
+
+
+def _segment_distance(px, py, a, b):
+    '''Distance from every grid point (px, py) to segment a-b.'''
+    ex, ey = b[0] - a[0], b[1] - a[1]
+    length_sq = ex * ex + ey * ey
+    if length_sq == 0:
+        return np.hypot(px - a[0], py - a[1])
+    s = np.clip(((px - a[0]) * ex + (py - a[1]) * ey) / length_sq, 0.0, 1.0)
+    return np.hypot(px - (a[0] + s * ex), py - (a[1] + s * ey))
+
+
+class NavigationField:
+    '''Distance-to-goal grid plus its derived flow field for one goal cell.'''
+    def __init__(self, distance, flow, goal_cell):
+        self.distance = distance  # (rows, cols), inf where the goal is unreachable
+        self.flow = flow          # (rows, cols, 2) unit direction towards the goal
+        self.goal_cell = goal_cell
+
+
+class NavigationGrid:
+    def __init__(self, width, height, static_obstacles=(), cell_size=10.0, clearance=5.0, cache_size=32):
+        self.width = float(width)
+        self.height = float(height)
+        self.cell_size = float(cell_size)
+        self.clearance = float(clearance)
+        self.cols = max(1, int(math.ceil(self.width / self.cell_size)))
+        self.rows = max(1, int(math.ceil(self.height / self.cell_size)))
+        self.blocked = self._rasterize(static_obstacles)
+
+        self.cache_size = int(cache_size)
+        self._fields = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _rasterize(self, static_obstacles):
+        '''Marks cells whose centre lies within clearance of any obstacle.'''
+        xs = (np.arange(self.cols) + 0.5) * self.cell_size
+        ys = (np.arange(self.rows) + 0.5) * self.cell_size
+        px, py = np.meshgrid(xs, ys)  # (rows, cols)
+        blocked = np.zeros((self.rows, self.cols), dtype=bool)
+
+        if isinstance(static_obstacles, ObstacleBVH):
+            circles = static_obstacles.circles
+            segments = list(static_obstacles.walls)
+            for poly in static_obstacles.polygons:
+                segments.extend(polygon_edges(poly))
+        else:
+            circles, segments = static_obstacles, []
+
+        for obs in circles:
+            cx, cy = obs['position']
+            blocked |= np.hypot(px - cx, py - cy) <= obs['radius'] + self.clearance
+        for seg in segments:
+            blocked |= _segment_distance(px, py, seg[0], seg[1]) <= self.clearance
+        return blocked
+
+    def cell_of(self, position):
+        col = min(max(int(position[0] // self.cell_size), 0), self.cols - 1)
+        row = min(max(int(position[1] // self.cell_size), 0), self.rows - 1)
+        return row, col
+
+    def field_for(self, goal):
+        """Returns the (cached) navigation field towards the cell containing goal."""
+        goal_cell = self.cell_of(goal)
+        field = self._fields.get(goal_cell)
+        if field is not None:
+            self._fields.move_to_end(goal_cell)
+            self.cache_hits += 1
+            return field
+
+        self.cache_misses += 1
+        distance = self._dijkstra(goal_cell)
+        field = NavigationField(distance, self._flow_from_distance(distance), goal_cell)
+        self._fields[goal_cell] = field
+        if len(self._fields) > self.cache_size:
+            self._fields.popitem(last=False)
+        return field
+
+    def _dijkstra(self, goal_cell):
+        rows, cols = self.rows, self.cols
+        blocked = self.blocked
+        distance = np.full((rows, cols), np.inf)
+        distance[goal_cell] = 0.0
+        heap = [(0.0, goal_cell[0], goal_cell[1])]
+        while heap:
+            d, i, j = heapq.heappop(heap)
+            if d > distance[i, j]:
+                continue
+            for di, dj, cost in NEIGHBOR_OFFSETS:
+                ni, nj = i + di, j + dj
+                if ni < 0 or ni >= rows or nj < 0 or nj >= cols or blocked[ni, nj]:
+                    continue
+                if di != 0 and dj != 0 and (blocked[i, nj] or blocked[ni, j]):
+                    continue  # No cutting corners past obstacles
+                nd = d + cost
+                if nd < distance[ni, nj]:
+                    distance[ni, nj] = nd
+                    heapq.heappush(heap, (nd, ni, nj))
+        return distance
+
+    def _flow_from_distance(self, distance):
+        '''Points every cell at its steepest-descent neighbour (vectorised over the grid).'''
+        rows, cols = distance.shape
+        padded = np.pad(distance, 1, constant_values=np.inf)
+        padded_blocked = np.pad(self.blocked, 1, constant_values=True)
+        candidates = np.empty((len(NEIGHBOR_OFFSETS), rows, cols))
+        for k, (di, dj, cost) in enumerate(NEIGHBOR_OFFSETS):
+            candidates[k] = padded[1 + di:1 + di + rows, 1 + dj:1 + dj + cols] + cost
+            if di != 0 and dj != 0:
+                corner_blocked = (padded_blocked[1:1 + rows, 1 + dj:1 + dj + cols] |
+                                  padded_blocked[1 + di:1 + di + rows, 1:1 + cols])
+                candidates[k][corner_blocked] = np.inf
+        best = np.argmin(candidates, axis=0)
+        best_distance = np.take_along_axis(candidates, best[None], axis=0)[0]
+
+        offsets = np.array([[dj, di] for di, dj, _ in NEIGHBOR_OFFSETS], dtype=float)  # (x, y) order
+        offsets /= np.linalg.norm(offsets, axis=1)[:, None]
+        flow = offsets[best]
+        # Blocked cells (distance inf) still point at their best free neighbour,
+        # so agents pushed into an obstacle's clearance zone find their way out.
+        valid = np.isfinite(best_distance) & (best_distance <= distance + 1e-9) & (distance > 0)
+        flow[~valid] = 0.0
+        return flow
+
+    def direction(self, position, goal):
+        """
+        Unit direction to follow from position towards goal. Returns a zero
+        vector when the goal is in the same cell or unreachable, in which case
+        callers fall back to steering straight at the goal.
+        """
+        field = self.field_for(goal)
+        return field.flow[self.cell_of(position)]
+
+    def cache_info(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(self._fields), 'max_size': self.cache_size}
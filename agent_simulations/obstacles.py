@@ -0,0 +1,205 @@
+'''
+Static obstacles for the pedestrian model: circles, walls (line segments) and
+polygons, indexed in a bounding-volume hierarchy (BVH) so that FOV ray casts
+only visit the handful of primitives near the ray.
+'''
+import json
+import math
+import numpy as np
+
+CIRCLE = 0
+SEGMENT = 1
+
+BVH_LEAF_SIZE = 4
+
+
+def load_scene(path):
+    """
+    Loads obstacles from a JSON scene file of the form
+        {"circles":  [{"position": [x, y], "radius": r}, ...],
+         "walls":    [[[x1, y1], [x2, y2]], ...],
+         "polygons": [[[x, y], [x, y], ...], ...]}
+    Every key is optional. Returns (circles, walls, polygons) where circles are
+    the same {'position', 'radius'} dicts the pedestrian model already uses.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        scene = json.load(f)
+
+    circles = []
+    for c in scene.get('circles', []):
+        circles.append({'position': np.array(c['position'], dtype=float),
+                        'radius': float(c['radius']),
+                        'color': c.get('color', 'gray')})
+    walls = [np.array(w, dtype=float) for w in scene.get('walls', [])]
+    polygons = [np.array(p, dtype=float) for p in scene.get('polygons', [])]
+    return circles, walls, polygons
+
+
+def polygon_edges(polygon):
+    """Splits a closed polygon (list of vertices) into its edge segments."""
+    polygon = np.asarray(polygon, dtype=float)
+    return [np.array([polygon[i], polygon[(i + 1) % len(polygon)]]) for i in range(len(polygon))]
+
+
+def _ray_circle(ox, oy, dx, dy, cx, cy, r):
+    '''Distance along the ray to the first hit of a circle, or inf.'''
+    vx, vy = cx - ox, cy - oy
+    t_center = vx * dx + vy * dy
+    if t_center < 0:  # Centre behind the ray origin: any hit would be at t < 0
+        return math.inf
+    dist_sq_center_to_ray = vx * vx + vy * vy - t_center * t_center
+    t_half_chord_sq = r * r - dist_sq_center_to_ray
+    if t_half_chord_sq < 0:
+        return math.inf
+    t = t_center - math.sqrt(t_half_chord_sq)
+    return t if t >= 0 else math.inf
+
+
+def _ray_segment(ox, oy, dx, dy, ax, ay, bx, by):
+    '''Distance along the ray to its crossing with segment a-b, or inf.'''
+    ex, ey = bx - ax, by - ay
+    denom = dx * ey - dy * ex
+    if abs(denom) < 1e-12:  # Parallel; the capsule end caps cover grazing hits
+        return math.inf
+    wx, wy = ax - ox, ay - oy
+    t = (wx * ey - wy * ex) / denom
+    s = (wx * dy - wy * dx) / denom
+    if t >= 0 and 0.0 <= s <= 1.0:
+        return t
+    return math.inf
+
+
+def _ray_capsule(ox, oy, dx, dy, ax, ay, bx, by, r):
+    '''Ray against a wall segment thickened by r (the agent's radius).'''
+    if r <= 0:
+        return _ray_segment(ox, oy, dx, dy, ax, ay, bx, by)
+    ex, ey = bx - ax, by - ay
+    length = math.hypot(ex, ey)
+    best = min(_ray_circle(ox, oy, dx, dy, ax, ay, r), _ray_circle(ox, oy, dx, dy, bx, by, r))
+    if length > 0:
+        nx, ny = -ey / length * r, ex / length * r
+        best = min(best,
+                   _ray_segment(ox, oy, dx, dy, ax + nx, ay + ny, bx + nx, by + ny),
+                   _ray_segment(ox, oy, dx, dy, ax - nx, ay - ny, bx - nx, by - ny))
+    return best
+
+
+class ObstacleBVH:
+    '''
+    Axis-aligned bounding-box hierarchy over circle and segment primitives.
+    Nodes are stored in flat lists; leaves reference a contiguous range of
+    the reordered primitive list.
+    '''
+    def __init__(self, circles=(), walls=(), polygons=()):
+        self.circles = list(circles)
+        self.walls = [np.asarray(w, dtype=float) for w in walls]
+        self.polygons = [np.asarray(p, dtype=float) for p in polygons]
+
+        prims = []
+        for obs in self.circles:
+            cx, cy = float(obs['position'][0]), float(obs['position'][1])
+            prims.append((CIRCLE, cx, cy, float(obs['radius'])))
+        segments = list(self.walls)
+        for poly in self.polygons:
+            segments.extend(polygon_edges(poly))
+        for seg in segments:
+            prims.append((SEGMENT, float(seg[0][0]), float(seg[0][1]), float(seg[1][0]), float(seg[1][1])))
+
+        self.node_lo = []
+        self.node_hi = []
+        self.node_children = []  # (left, right) for inner nodes, None for leaves
+        self.node_range = []     # (start, end) into self.prims for leaves
+        self.prims = []
+        if prims:
+            bounds = np.array([self._prim_bounds(p) for p in prims])
+            self._build(prims, bounds, np.arange(len(prims)))
+
+    def __len__(self):
+        return len(self.prims)
+
+    @staticmethod
+    def _prim_bounds(prim):
+        if prim[0] == CIRCLE:
+            _, cx, cy, r = prim
+            return (cx - r, cy - r, cx + r, cy + r)
+        _, ax, ay, bx, by = prim
+        return (min(ax, bx), min(ay, by), max(ax, bx), max(ay, by))
+
+    def _build(self, prims, bounds, idx):
+        '''Recursively builds the subtree over prims[idx]; returns its node index.'''
+        node = len(self.node_lo)
+        lo = bounds[idx, :2].min(axis=0)
+        hi = bounds[idx, 2:].max(axis=0)
+        self.node_lo.append((float(lo[0]), float(lo[1])))
+        self.node_hi.append((float(hi[0]), float(hi[1])))
+        self.node_children.append(None)
+        self.node_range.append(None)
+
+        if len(idx) <= BVH_LEAF_SIZE:
+            start = len(self.prims)
+            self.prims.extend(prims[i] for i in idx)
+            self.node_range[node] = (start, len(self.prims))
+            return node
+
+        # Median split of box centres along the longest axis
+        centers = (bounds[idx, :2] + bounds[idx, 2:]) * 0.5
+        axis = int(np.argmax(hi - lo))
+        order = idx[np.argsort(centers[:, axis], kind='stable')]
+        mid = len(order) // 2
+        left = self._build(prims, bounds, order[:mid])
+        right = self._build(prims, bounds, order[mid:])
+        self.node_children[node] = (left, right)
+        return node
+
+    @staticmethod
+    def _ray_box(ox, oy, inv_dx, inv_dy, lo, hi, pad, t_max):
+        '''Slab test; returns the entry distance or inf if the box is missed.'''
+        t0, t1 = 0.0, t_max
+        for o, inv, l, h in ((ox, inv_dx, lo[0] - pad, hi[0] + pad), (oy, inv_dy, lo[1] - pad, hi[1] + pad)):
+            if inv is None:  # Ray parallel to this slab
+                if o < l or o > h:
+                    return math.inf
+                continue
+            ta, tb = (l - o) * inv, (h - o) * inv
+            if ta > tb:
+                ta, tb = tb, ta
+            t0, t1 = max(t0, ta), min(t1, tb)
+            if t0 > t1:
+                return math.inf
+        return t0
+
+    def ray_cast(self, origin, direction, max_dist, pad=0.0):
+        """
+        Distance along a unit direction to the first obstacle, capped at max_dist.
+        pad inflates every obstacle by the caster's radius.
+        """
+        if not self.prims:
+            return max_dist
+        ox, oy = float(origin[0]), float(origin[1])
+        dx, dy = float(direction[0]), float(direction[1])
+        inv_dx = 1.0 / dx if abs(dx) > 1e-12 else None
+        inv_dy = 1.0 / dy if abs(dy) > 1e-12 else None
+
+        best = max_dist
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self._ray_box(ox, oy, inv_dx, inv_dy, self.node_lo[node], self.node_hi[node], pad, best) == math.inf:
+                continue
+            children = self.node_children[node]
+            if children is not None:
+                stack.extend(children)
+                continue
+            start, end = self.node_range[node]
+            for prim in self.prims[start:end]:
+                if prim[0] == CIRCLE:
+                    t = _ray_circle(ox, oy, dx, dy, prim[1], prim[2], prim[3] + pad)
+                else:
+                    t = _ray_capsule(ox, oy, dx, dy, prim[1], prim[2], prim[3], prim[4], pad)
+                if t < best:
+                    best = t
+        return best
+
+    def segments(self):
+        """All wall and polygon edges, e.g. for drawing."""
+        return [((p[1], p[2]), (p[3], p[4])) for p in self.prims if p[0] == SEGMENT]
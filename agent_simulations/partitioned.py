@@ -0,0 +1,415 @@
+'''
+Domain-decomposed boids: the width x height world is split into tiles with
+one worker process per tile.
+
+Each step every worker
+  1. publishes its agents within perception_radius of the tile border into
+     its shared-memory halo buffer,
+  2. reads the halo buffers of the surrounding tiles, computes flocking
+     forces for its own agents and integrates them (wrapping at the world
+     edges like Agent.edges),
+  3. posts agents that left the tile into its shared-memory outbox, and
+  4. adopts the agents that neighbouring tiles posted for it.
+
+This is a synchronous update: every force is computed from the state at the
+start of the step (flock_accelerations, which step_flock also uses for a
+single process). Boid.flock in the demo is sequential instead, each boid
+seeing the boids updated before it in the same step, so trajectories differ
+from the demo's. Neighbours are found with a cell list and always summed in
+global-id order, so a partitioned run reproduces the single-process run bit
+for bit.
+
+Halo and outbox buffers hold as many records per tile as the largest halo
+seen so far, plus headroom (PARTITION_CONFIG['buffer_headroom']), rather
+than the whole population. A step whose halo does not fit is abandoned
+before it changes any state; the buffers are regrown and the step rerun.
+Agents move less than perception_radius per step, so the agents leaving a
+tile are among the ones in its halo and the outbox never outgrows it.
+'''
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+from config import GENERAL_CONFIG, BOIDS_CONFIG, PARTITION_CONFIG
+from contact_epidemic import expand_ranges
+
+# Columns of the halo and outbox records
+GID, X, Y, VX, VY, DEST = range(6)
+HALO_FIELDS = 5
+OUTBOX_FIELDS = 6
+
+
+def _limit_rows(vectors, max_val):
+    mag = np.sqrt(np.sum(vectors * vectors, axis=1))
+    scale = np.where(mag > max_val, max_val / np.where(mag > 0, mag, 1.0), 1.0)
+    return vectors * scale[:, None]
+
+
+def _normalize_rows(vectors):
+    mag = np.sqrt(np.sum(vectors * vectors, axis=1))
+    return np.where(mag[:, None] > 0, vectors / np.where(mag > 0, mag, 1.0)[:, None], 0.0)
+
+
+def _neighbor_pairs(own_pos, cand_pos, radius):
+    """
+    (rows, cols, diff, dist) for every own agent and candidate with
+    0 < dist < radius, ordered by own agent and then by candidate. Only
+    candidates in the 3x3 cells (radius wide) around an agent are compared.
+    """
+    lo = np.minimum(own_pos.min(axis=0), cand_pos.min(axis=0))
+    hi = np.maximum(own_pos.max(axis=0), cand_pos.max(axis=0))
+    cols, rows = ((hi - lo) // radius).astype(np.int64) + 1
+    ccx, ccy = ((cand_pos - lo) // radius).astype(np.int64).T
+    cell = ccy * cols + ccx
+    order = np.argsort(cell, kind='stable')
+    counts = np.bincount(cell, minlength=cols * rows)
+    starts = np.cumsum(counts) - counts
+
+    ocx, ocy = ((own_pos - lo) // radius).astype(np.int64).T
+    own = np.arange(len(own_pos))
+    i_parts, j_parts = [], []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            ncx, ncy = ocx + dx, ocy + dy
+            valid = (ncx >= 0) & (ncx < cols) & (ncy >= 0) & (ncy < rows)
+            key = ncy[valid] * cols + ncx[valid]
+            i_parts.append(np.repeat(own[valid], counts[key]))
+            j_parts.append(order[expand_ranges(starts[key], counts[key])])
+    i, j = np.concatenate(i_parts), np.concatenate(j_parts)
+    diff = own_pos[i] - cand_pos[j]
+    dist = np.sqrt(np.sum(diff * diff, axis=1))
+    close = (dist > 0) & (dist < radius)
+    i, j, diff, dist = i[close], j[close], diff[close], dist[close]
+    order = np.argsort(i * len(cand_pos) + j) # Each agent's neighbours in candidate (global-id) order
+    return i[order], j[order], diff[order], dist[order]
+
+
+def flock_accelerations(own_pos, own_vel, cand_gid, cand_pos, cand_vel, params):
+    """
+    Boid.flock for a block of agents at once, all from the same (start of
+    step) state. Candidates must be sorted by global id and may include the
+    agents themselves (distance 0 is skipped, as in Boid._get_neighbors).
+    """
+    n = len(own_pos)
+    acc = np.zeros((n, 2))
+    if n == 0 or len(cand_pos) == 0:
+        return acc
+    rows, cols, diff, dist = _neighbor_pairs(own_pos, cand_pos, params['perception_radius'])
+    counts = np.bincount(rows, minlength=n)
+    has = counts > 0
+    if not np.any(has):
+        return acc
+
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[has]
+    d = dist[:, None]
+    away = diff / d / d # normalize(p_i - p_j) / dist
+    sep_sum = np.add.reduceat(away, starts, axis=0)
+    vel_sum = np.add.reduceat(cand_vel[cols], starts, axis=0)
+    pos_sum = np.add.reduceat(cand_pos[cols], starts, axis=0)
+    count = counts[has][:, None].astype(float)
+
+    max_speed, max_force = params['max_speed'], params['max_force']
+    vel = own_vel[has]
+    sep = _limit_rows(_normalize_rows(sep_sum / count) * max_speed - vel, max_force)
+    ali = _limit_rows(_normalize_rows(vel_sum / count) * max_speed - vel, max_force)
+    coh = _limit_rows(_normalize_rows(pos_sum / count - own_pos[has]) * max_speed - vel, max_force)
+    acc[has] = (sep * params['separation_factor'] + ali * params['alignment_factor'] +
+                coh * params['cohesion_factor'])
+    return acc
+
+
+def integrate(pos, vel, acc, params, width, height, dt=1.0):
+    '''Agent.update followed by Agent.edges, for arrays of agents.'''
+    vel = _limit_rows(vel + acc * dt, params['max_speed'])
+    pos = pos + vel * dt
+    x, y = pos[:, 0], pos[:, 1]
+    x[x > width] = 0
+    x[x < 0] = width
+    y[y > height] = 0
+    y[y < 0] = height
+    return pos, vel
+
+
+def step_flock(pos, vel, params, width, height, dt=1.0):
+    """Single-process reference step for the whole flock."""
+    gid = np.arange(len(pos))
+    acc = flock_accelerations(pos, vel, gid, pos, vel, params)
+    return integrate(pos, vel, acc, params, width, height, dt)
+
+
+def _flock_params(config):
+    return {k: float(config[k]) for k in
+            ('max_speed', 'max_force', 'perception_radius', 'separation_factor', 'alignment_factor', 'cohesion_factor')}
+
+
+class TileGrid:
+    '''Geometry of the tiling; tiles are numbered row-major.'''
+    def __init__(self, width, height, tiles_x, tiles_y, halo):
+        self.width, self.height = float(width), float(height)
+        self.tiles_x, self.tiles_y = int(tiles_x), int(tiles_y)
+        self.tile_w = self.width / self.tiles_x
+        self.tile_h = self.height / self.tiles_y
+        self.halo = float(halo)
+        if self.halo > min(self.tile_w, self.tile_h) and self.num_tiles > 1:
+            raise ValueError("Tiles must be at least perception_radius wide so halos only span adjacent tiles")
+
+    @property
+    def num_tiles(self):
+        return self.tiles_x * self.tiles_y
+
+    def tile_of(self, pos):
+        tx = np.clip((pos[:, 0] // self.tile_w).astype(int), 0, self.tiles_x - 1)
+        ty = np.clip((pos[:, 1] // self.tile_h).astype(int), 0, self.tiles_y - 1)
+        return ty * self.tiles_x + tx
+
+    def halo_counts(self, pos):
+        '''Agents per tile within halo of their tile's border, i.e. the size of each tile's halo.'''
+        tile = self.tile_of(pos)
+        fx = pos[:, 0] - (tile % self.tiles_x) * self.tile_w
+        fy = pos[:, 1] - (tile // self.tiles_x) * self.tile_h
+        near = (fx < self.halo) | (self.tile_w - fx < self.halo) | (fy < self.halo) | (self.tile_h - fy < self.halo)
+        return np.bincount(tile[near], minlength=self.num_tiles)
+
+    def bounds(self, tile):
+        tx, ty = tile % self.tiles_x, tile // self.tiles_x
+        return tx * self.tile_w, ty * self.tile_h, (tx + 1) * self.tile_w, (ty + 1) * self.tile_h
+
+    def neighbors(self, tile):
+        '''Surrounding tiles, wrapping around like Agent.edges; excludes tile itself.'''
+        tx, ty = tile % self.tiles_x, tile // self.tiles_x
+        result = set()
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                result.add(((ty + dy) % self.tiles_y) * self.tiles_x + (tx + dx) % self.tiles_x)
+        result.discard(tile)
+        return sorted(result)
+
+
+class _SharedArray:
+    def __init__(self, shape, dtype, name=None):
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.spec = (shape, np.dtype(dtype).str, self.shm.name)
+
+    @classmethod
+    def attach(cls, spec):
+        shape, dtype, name = spec
+        return cls(shape, dtype, name)
+
+
+def _tile_worker(tile, grid, params, specs, barrier, conn):
+    buffers = {name: _SharedArray.attach(spec) for name, spec in specs.items()}
+    halo, halo_count = buffers['halo'], buffers['halo_count']
+    outbox, outbox_count = buffers['outbox'], buffers['outbox_count']
+    state, owner = buffers['state'], buffers['owner']
+
+    x0, y0, x1, y1 = grid.bounds(tile)
+    neighbors = grid.neighbors(tile)
+    r = grid.halo
+
+    # Adopt the initial agents of this tile
+    gid = np.flatnonzero(owner.array == tile)
+    pos = state.array[gid, 0:2].copy()
+    vel = state.array[gid, 2:4].copy()
+
+    while True:
+        command, arg = conn.recv()
+        if command == 'stop':
+            break
+        if command == 'resize': # New halo and outbox buffers
+            for name in ('halo', 'outbox'):
+                buffers[name].shm.close()
+                buffers[name] = _SharedArray.attach(arg[name])
+            halo, outbox = buffers['halo'], buffers['outbox']
+            continue
+        dt = params.get('dt', 1.0)
+        capacity = halo.array.shape[1]
+        completed = 0
+        for _ in range(arg):
+            # 1. Publish border agents
+            near_border = ((pos[:, 0] - x0 < r) | (x1 - pos[:, 0] < r) |
+                           (pos[:, 1] - y0 < r) | (y1 - pos[:, 1] < r))
+            k = int(np.count_nonzero(near_border))
+            if k <= capacity:
+                halo.array[tile, :k, GID] = gid[near_border]
+                halo.array[tile, :k, X:VX] = pos[near_border]
+                halo.array[tile, :k, VX:VY + 1] = vel[near_border]
+            halo_count.array[tile] = k
+            barrier.wait()
+            if int(halo_count.array.max()) > capacity:
+                # Every tile reads the same counts, so all abandon this step before changing any state
+                break
+
+            # 2. Forces from own agents plus neighbour halos, in global-id order
+            parts = [np.column_stack((gid, pos, vel))]
+            for other in neighbors:
+                parts.append(halo.array[other, :halo_count.array[other]])
+            candidates = np.concatenate(parts)
+            candidates = candidates[np.argsort(candidates[:, GID], kind='stable')]
+            acc = flock_accelerations(pos, vel, candidates[:, GID].astype(np.int64), candidates[:, X:VX],
+                                      candidates[:, VX:VY + 1], params)
+            pos, vel = integrate(pos, vel, acc, params, grid.width, grid.height, dt)
+
+            # 3. Post agents that left the tile; they moved less than r, so they were
+            # in the halo and fit in an outbox of the same capacity
+            dest = grid.tile_of(pos)
+            leaving = near_border & (dest != tile)
+            k = int(np.count_nonzero(leaving))
+            outbox.array[tile, :k, GID] = gid[leaving]
+            outbox.array[tile, :k, X:VX] = pos[leaving]
+            outbox.array[tile, :k, VX:VY + 1] = vel[leaving]
+            outbox.array[tile, :k, DEST] = dest[leaving]
+            outbox_count.array[tile] = k
+            staying = ~leaving
+            gid, pos, vel = gid[staying], pos[staying], vel[staying]
+            barrier.wait()
+
+            # 4. Adopt arrivals
+            for other in neighbors:
+                posted = outbox.array[other, :outbox_count.array[other]]
+                mine = posted[posted[:, DEST] == tile]
+                if len(mine):
+                    gid = np.concatenate((gid, mine[:, GID].astype(np.int64)))
+                    pos = np.concatenate((pos, mine[:, X:VX]))
+                    vel = np.concatenate((vel, mine[:, VX:VY + 1]))
+            completed += 1
+
+        # Publish the full state for gather()
+        state.array[gid, 0:2] = pos
+        state.array[gid, 2:4] = vel
+        owner.array[gid] = tile
+        conn.send((completed, int(halo_count.array.max())))
+
+    for buf in buffers.values():
+        buf.shm.close()
+    conn.close()
+
+
+class PartitionedFlock:
+    def __init__(self, positions, velocities, tiles=None, width=None, height=None, config=None, dt=1.0):
+        config = config or BOIDS_CONFIG
+        tiles = tiles or PARTITION_CONFIG['tiles']
+        self.params = _flock_params(config)
+        self.params['dt'] = float(dt)
+        self.grid = TileGrid(width or GENERAL_CONFIG['width'], height or GENERAL_CONFIG['height'],
+                             tiles[0], tiles[1], self.params['perception_radius'])
+        if self.params['max_speed'] * dt >= self.params['perception_radius']:
+            raise ValueError("Agents must move less than perception_radius per step, so those leaving a tile are "
+                             "in its halo")
+        self.headroom = PARTITION_CONFIG['buffer_headroom']
+        self.num_agents = len(positions)
+        self.step_count = 0
+        n, t = self.num_agents, self.grid.num_tiles
+        positions = np.asarray(positions, dtype=float)
+
+        self._buffers = {
+            'halo_count': _SharedArray((t,), np.int64),
+            'outbox_count': _SharedArray((t,), np.int64),
+            'state': _SharedArray((n, 4), np.float64),
+            'owner': _SharedArray((n,), np.int64),
+        }
+        self._allocate_exchange(int(self.grid.halo_counts(positions).max(initial=0)))
+        self._buffers['state'].array[:, 0:2] = positions
+        self._buffers['state'].array[:, 2:4] = velocities
+        self._buffers['owner'].array[:] = self.grid.tile_of(positions)
+
+        specs = {name: buf.spec for name, buf in self._buffers.items()}
+        barrier = mp.Barrier(t)
+        self._conns = []
+        self._workers = []
+        for tile in range(t):
+            parent, child = mp.Pipe()
+            proc = mp.Process(target=_tile_worker, args=(tile, self.grid, self.params, specs, barrier, child),
+                              daemon=True)
+            proc.start()
+            self._conns.append(parent)
+            self._workers.append(proc)
+
+    def _allocate_exchange(self, halo_size):
+        '''(Re)creates the halo and outbox buffers with room for halo_size plus headroom per tile.'''
+        capacity = max(1, min(self.num_agents, max(halo_size, int(np.ceil(halo_size * self.headroom)))))
+        t = self.grid.num_tiles
+        for name, fields in (('halo', HALO_FIELDS), ('outbox', OUTBOX_FIELDS)):
+            old = self._buffers.get(name)
+            self._buffers[name] = _SharedArray((t, capacity, fields), np.float64)
+            if old is not None:
+                old.shm.close()
+                old.shm.unlink()
+
+    def run(self, num_steps):
+        """Advances every tile num_steps steps in lock-step; returns (positions, velocities)."""
+        remaining = int(num_steps)
+        while remaining > 0:
+            for conn in self._conns:
+                conn.send(('run', remaining))
+            replies = [conn.recv() for conn in self._conns]
+            completed, halo_size = replies[0] # The same on every tile
+            self.step_count += completed
+            remaining -= completed
+            if remaining:
+                # A halo outgrew the buffers: regrow them and rerun the abandoned step
+                self._allocate_exchange(halo_size)
+                specs = {name: self._buffers[name].spec for name in ('halo', 'outbox')}
+                for conn in self._conns:
+                    conn.send(('resize', specs))
+        return self.gather()
+
+    def gather(self):
+        state = self._buffers['state'].array
+        return state[:, 0:2].copy(), state[:, 2:4].copy()
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(('stop', 0))
+        for proc in self._workers:
+            proc.join()
+        for buf in self._buffers.values():
+            buf.shm.close()
+            buf.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def random_flock(num_agents, width, height, max_speed, seed=None):
+    rng = np.random.default_rng(seed)
+    pos = rng.random((num_agents, 2)) * [width, height]
+    vel = _normalize_rows(rng.random((num_agents, 2)) - 0.5) * rng.uniform(0, max_speed, (num_agents, 1))
+    return pos, vel
+
+
+def benchmark(num_agents=None, tile_layouts=None, num_steps=None):
+    """Compares single-process and partitioned throughput and checks they agree."""
+    num_agents = num_agents or PARTITION_CONFIG['benchmark_agents']
+    tile_layouts = tile_layouts or PARTITION_CONFIG['benchmark_tiles']
+    num_steps = num_steps or PARTITION_CONFIG['benchmark_steps']
+    width, height = GENERAL_CONFIG['width'], GENERAL_CONFIG['height']
+    params = _flock_params(BOIDS_CONFIG)
+    pos0, vel0 = random_flock(num_agents, width, height, params['max_speed'], seed=GENERAL_CONFIG.get('random_seed', 0))
+
+    start = time.perf_counter()
+    pos, vel = pos0, vel0
+    for _ in range(num_steps):
+        pos, vel = step_flock(pos, vel, params, width, height)
+    baseline = time.perf_counter() - start
+    print(f"1 process: {num_agents * num_steps / baseline:,.0f} agent-steps/s")
+
+    for tiles in tile_layouts:
+        with PartitionedFlock(pos0, vel0, tiles=tiles) as flock:
+            start = time.perf_counter()
+            p_pos, p_vel = flock.run(num_steps)
+            elapsed = time.perf_counter() - start
+        match = np.array_equal(p_pos, pos) and np.array_equal(p_vel, vel)
+        print(f"{tiles[0]}x{tiles[1]} tiles: {num_agents * num_steps / elapsed:,.0f} agent-steps/s "
+              f"(speedup {baseline / elapsed:.2f}x, identical to 1 process: {match})")
+
+if __name__ == '__main__':
+    benchmark()
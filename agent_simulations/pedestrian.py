@@ -1,12 +1,18 @@
-from matplotlib import pyplot as plt
 import numpy as np
 from agent_base import Agent, limit_vector
+from obstacles import ObstacleBVH
+import shared_path # Puts ../shared on sys.path
+from plotting import matplotlib_module
 
 class Pedestrian(Agent):
+    __slots__ = ('navigator', 'destination', 'fov_radians', 'd_max_collision_dist', 'num_fov_samples',
+                 'arrival_threshold', 'is_arrived')
+
     def __init__(self, x, y, max_speed, max_force, destination,
                  fov_degrees=120, d_max_collision_dist=50, num_fov_samples=20, arrival_threshold=5.0,
-                 color='green', size=7):
-        super().__init__(x, y, max_speed, max_force, color=color, size=size)
+                 color='green', size=7, navigator=None, population=None):
+        super().__init__(x, y, max_speed, max_force, color=color, size=size, population=population)
+        self.navigator = navigator # Optional navigation.NavigationGrid for global path planning
         self.destination = np.array(destination, dtype=float)
         self.fov_radians = np.radians(fov_degrees / 2.0) # This is phi from the description
         self.d_max_collision_dist = float(d_max_collision_dist)
@@ -14,6 +20,23 @@ class Pedestrian(Agent):
         self.arrival_threshold = float(arrival_threshold)
         self.is_arrived = False
 
+    def set_destination(self, destination):
+        self.destination = np.array(destination, dtype=float)
+        self.is_arrived = False
+
+    def is_settled(self):
+        """
+        Arrived, stopped and with a trail that has shrunk to its position:
+        further steps leave it unchanged until it gets a new destination.
+        """
+        if not self.is_arrived or self.velocity.any() or self.acceleration.any():
+            return False
+        position = self.position
+        if (self.prev_position != position).any():
+            return False
+        trail = self._pop.history[self._i]
+        return self._pop.history_len[self._i] == len(trail) and not (trail != position.astype(np.float32)).any()
+
     def _get_direction_to_destination(self):
         if self.is_arrived:
             return np.zeros(2)
@@ -26,34 +49,48 @@ class Pedestrian(Agent):
         if dist_to_dest < 1e-5: # Effectively at destination
             self.is_arrived = True # Also set arrived here
             return np.zeros(2)
+        if self.navigator is not None:
+            # Follow the shared flow field around obstacles; zero means same cell or unreachable
+            flow_direction = self.navigator.direction(self.position, self.destination)
+            if flow_direction[0] != 0 or flow_direction[1] != 0:
+                return flow_direction.copy()
         return direction_to_dest / dist_to_dest
 
     def _distance_to_first_obstacle_in_direction(self, alpha_world_angle, static_obstacles, other_pedestrians):
         """
         Calculates f(alpha) - distance to the first obstacle in the direction alpha (world angle).
         Obstacles include static_obstacles and other_pedestrians.
+        static_obstacles is either an ObstacleBVH (circles, walls and polygons)
+        or a plain list of {'position', 'radius'} circle dicts.
         """
         min_dist_to_collision = self.d_max_collision_dist
+        position, size = self.position, self.size # Agent attributes are population lookups; read them once
         direction_vector = np.array([np.cos(alpha_world_angle), np.sin(alpha_world_angle)])
 
+        if isinstance(static_obstacles, ObstacleBVH):
+            # Obstacles are inflated by the agent's radius, as in the circle test below
+            min_dist_to_collision = static_obstacles.ray_cast(position, direction_vector,
+                                                              min_dist_to_collision, pad=size/2)
+            static_obstacles = ()
+
         # Check static obstacles
         for obs in static_obstacles: # obs is {'position': np.array, 'radius': float}
             # Ray-sphere intersection
-            vec_agent_to_obs_center = obs['position'] - self.position
+            vec_agent_to_obs_center = obs['position'] - position
             # Project vec_agent_to_obs_center onto direction_vector
             t_center = np.dot(vec_agent_to_obs_center, direction_vector)
             
-            if t_center < 0 and np.linalg.norm(vec_agent_to_obs_center) > obs['radius'] + self.size : # Obstacle is behind and not overlapping
+            if t_center < 0 and np.linalg.norm(vec_agent_to_obs_center) > obs['radius'] + size : # Obstacle is behind and not overlapping
                 continue
 
             dist_squared_center_to_ray = np.linalg.norm(vec_agent_to_obs_center)**2 - t_center**2
             
             # If ray misses the obstacle's bounding sphere for collision check
-            if dist_squared_center_to_ray > (obs['radius'] + self.size/2)**2: # Consider agent's size
+            if dist_squared_center_to_ray > (obs['radius'] + size/2)**2: # Consider agent's size
                 continue
             
             # Distance from t_center to intersection point on ray from obstacle center
-            t_half_chord_squared = (obs['radius'] + self.size/2)**2 - dist_squared_center_to_ray
+            t_half_chord_squared = (obs['radius'] + size/2)**2 - dist_squared_center_to_ray
             if t_half_chord_squared < 0: # Should be caught by previous check, but for safety
                 continue
                 
@@ -67,15 +104,15 @@ class Pedestrian(Agent):
             if other_ped is self:
                 continue
             
-            vec_agent_to_other_center = other_ped.position - self.position
+            vec_agent_to_other_center = other_ped.position - position
             t_center_other = np.dot(vec_agent_to_other_center, direction_vector)
 
-            if t_center_other < 0 and np.linalg.norm(vec_agent_to_other_center) > other_ped.size + self.size: # Other is behind and not overlapping
+            if t_center_other < 0 and np.linalg.norm(vec_agent_to_other_center) > other_ped.size + size: # Other is behind and not overlapping
                 continue
 
             dist_sq_center_to_ray_other = np.linalg.norm(vec_agent_to_other_center)**2 - t_center_other**2
             
-            combined_radius_sq = ((self.size + other_ped.size) / 2.0)**2 # Collision when centers are this close
+            combined_radius_sq = ((size + other_ped.size) / 2.0)**2 # Collision when centers are this close
             if dist_sq_center_to_ray_other > combined_radius_sq:
                 continue
 
@@ -168,12 +205,13 @@ class Pedestrian(Agent):
 
     # display method can be inherited from Agent or overridden if specific visuals are needed
     # For example, to draw the FOV or destination:
-    def display(self, ax):
-        super().display(ax) # Draw agent body and history trail
+    def display(self, ax, alpha=1.0):
+        super().display(ax, alpha) # Draw agent body and history trail
+        render_pos = self.render_position(alpha)
         # Optionally draw destination
         if not self.is_arrived:
-             ax.plot([self.position[0], self.destination[0]], 
-                     [self.position[1], self.destination[1]], 
+             ax.plot([render_pos[0], self.destination[0]], 
+                     [render_pos[1], self.destination[1]], 
                      color=self.color, linestyle=':', alpha=0.2, linewidth=0.8)
         
         # Determine current forward angle for FOV visualization
@@ -199,8 +237,8 @@ class Pedestrian(Agent):
         theta2 = current_forward_angle_deg + half_fov_deg
         
         # Create and add the Wedge patch for FOV
-        fov_wedge = plt.matplotlib.patches.Wedge(
-            center=self.position,
+        fov_wedge = matplotlib_module('patches').Wedge(
+            center=render_pos,
             r=fov_radius_visual,
             theta1=theta1,
             theta2=theta2,
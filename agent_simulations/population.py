@@ -0,0 +1,197 @@
+'''
+Contiguous storage for agent state.
+
+A Population holds the kinematic state of many agents in one typed array
+per field (position, velocity, acceleration, prev_position as (n, 2)
+float64; max_speed, max_force, size as float64) plus a ring buffer of the
+last HISTORY_LENGTH positions per agent (float32; the trail is only drawn).
+An Agent is a __slots__ object that knows its population and row, and its
+attributes read and write that row, so per-agent code works as before while
+vectorised code can use the arrays directly (rows where `alive` is set).
+
+Rows of released agents (garbage collected ones) are reused, lowest first;
+copy.copy(agent) gives the copy a row of its own, so no two agents share one.
+When the population runs out of rows its arrays are reallocated at twice
+the size; agents keep working because they hold a row number, not a view,
+but arrays fetched from the population before that point are stale.
+
+Agents built without an explicit population go into the current one, which
+is created on first use; use_population() swaps in another one (e.g. one
+per simulation, so pickling a simulation only carries its own agents).
+'''
+import heapq
+import numpy as np
+
+HISTORY_LENGTH = 50
+FIELDS = {
+    'position': (2,),
+    'velocity': (2,),
+    'acceleration': (2,),
+    'prev_position': (2,),
+    'max_speed': (),
+    'max_force': (),
+    'size': (),
+}
+
+
+class Population:
+    def __init__(self, capacity=256, history_length=HISTORY_LENGTH):
+        self.history_length = history_length
+        self.capacity = 0
+        self.count = 0 # Rows ever handed out; rows >= count are unused
+        self._free = []
+        self.fields = {}
+        self._resize(capacity)
+
+    def _resize(self, capacity):
+        def grown(old, shape, dtype):
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            if old is not None:
+                new[:self.count] = old[:self.count]
+            return new
+
+        for name, shape in FIELDS.items():
+            self.fields[name] = grown(self.fields.get(name), shape, np.float64)
+            setattr(self, name, self.fields[name])
+        self.history = grown(getattr(self, 'history', None), (self.history_length, 2), np.float32)
+        self.history_next = grown(getattr(self, 'history_next', None), (), np.int32)
+        self.history_len = grown(getattr(self, 'history_len', None), (), np.int32)
+        self.alive = grown(getattr(self, 'alive', None), (), bool)
+        self.capacity = capacity
+
+    def allocate(self):
+        """A zeroed row for a new agent."""
+        if self._free:
+            row = heapq.heappop(self._free)
+        else:
+            if self.count == self.capacity:
+                self._resize(max(2 * self.capacity, 16))
+            row = self.count
+            self.count += 1
+        for arr in self.fields.values():
+            arr[row] = 0
+        self.history_next[row] = 0
+        self.history_len[row] = 0
+        self.alive[row] = True
+        return row
+
+    def copy_row(self, row):
+        """A new row holding the fields and trail of row (copy.copy of an agent)."""
+        new = self.allocate()
+        for arr in self.fields.values():
+            arr[new] = arr[row]
+        self.history[new] = self.history[row]
+        self.history_next[new] = self.history_next[row]
+        self.history_len[new] = self.history_len[row]
+        return new
+
+    def release(self, row):
+        if self.alive[row]:
+            self.alive[row] = False
+            heapq.heappush(self._free, row)
+
+    def rows(self):
+        """Indices of the rows in use."""
+        return np.flatnonzero(self.alive[:self.count])
+
+    def push_history(self, row, x, y):
+        j = self.history_next.item(row)
+        self.history[row, j, 0] = x
+        self.history[row, j, 1] = y
+        self.history_next[row] = (j + 1) % self.history_length
+        if self.history_len.item(row) < self.history_length:
+            self.history_len[row] += 1
+
+    def get_history(self, row):
+        """The row's trail, oldest first, as a float64 (length, 2) array."""
+        length = self.history_len.item(row)
+        start = self.history_next.item(row) - length
+        return self.history[row, (start + np.arange(length)) % self.history_length].astype(np.float64)
+
+    def set_history(self, row, positions):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)[-self.history_length:]
+        length = len(positions)
+        self.history[row, :length] = positions
+        self.history_next[row] = length % self.history_length
+        self.history_len[row] = length
+
+    def clear_history(self, row):
+        self.history_len[row] = 0
+
+    def __getstate__(self):
+        # Only the rows handed out so far; the spare capacity is rebuilt on load
+        state = dict(self.__dict__)
+        for name in list(FIELDS) + ['history', 'history_next', 'history_len', 'alive']:
+            state[name] = state[name][:self.count].copy()
+        state['fields'] = None
+        state['capacity'] = self.count
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.fields = {name: getattr(self, name) for name in FIELDS}
+        self._resize(max(self.count, 16))
+
+
+_population = None
+
+
+def current():
+    global _population
+    if _population is None:
+        _population = Population()
+    return _population
+
+
+def use_population(new_population):
+    """Makes new_population the current one; returns the previous one (which may be None)."""
+    global _population
+    previous, _population = _population, new_population
+    return previous
+
+
+def _reference_agent(rng, max_speed):
+    '''The same state held the way Agent did before the population store: a dict of small arrays and a trail list.'''
+    position = rng.random(2) * 800
+    state = {'position': position, 'velocity': rng.random(2) * max_speed, 'acceleration': np.zeros(2),
+             'prev_position': position.copy(), 'max_speed': float(max_speed), 'max_force': 0.1, 'color': 'cyan',
+             'size': 8, 'perception_radius': 70.0, 'separation_factor': 1.2, 'alignment_factor': 1.0,
+             'cohesion_factor': 1.2}
+    state['history'] = [position + k for k in range(HISTORY_LENGTH)]
+    return state
+
+
+def benchmark(num_agents=10000, num_steps=20):
+    """Bytes per agent (with a full trail) against per-agent arrays, and update() time."""
+    import time
+    import tracemalloc
+    from boid import Boid
+
+    rng = np.random.default_rng(0)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    reference = [_reference_agent(rng, 3.0) for _ in range(num_agents)]
+    reference_bytes = (tracemalloc.get_traced_memory()[0] - base) / num_agents
+    del reference
+
+    base = tracemalloc.get_traced_memory()[0]
+    # Sized up front, as a caller that knows its agent count would; a grown population has up to 2x spare rows
+    store = Population(capacity=num_agents)
+    boids = [Boid(x, y, 3.0, 0.1, 70.0, 1.2, 1.0, 1.2, population=store) for x, y in rng.random((num_agents, 2)) * 600]
+    for _ in range(HISTORY_LENGTH):
+        for boid in boids:
+            boid.update()
+    boid_bytes = (tracemalloc.get_traced_memory()[0] - base) / num_agents
+    tracemalloc.stop()
+    print(f"Per agent with a full trail: {reference_bytes:,.0f} bytes as separate arrays, "
+          f"{boid_bytes:,.0f} bytes in the population store ({reference_bytes / boid_bytes:.1f}x less)")
+
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        for boid in boids:
+            boid.update()
+    elapsed = time.perf_counter() - start
+    print(f"Agent.update: {elapsed / (num_steps * num_agents) * 1e6:.2f} us per agent (no array allocations)")
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,88 @@
+'''
+Level-of-detail rendering for large populations.
+
+The drawing mode is picked from the population size so the work per frame
+stays bounded:
+  'full'    - every agent draws itself (Agent.display: body, trail, FOV);
+  'points'  - one scatter artist for all agents, coloured per agent;
+  'density' - a fixed-size 2D histogram of the positions shown as one
+              image; with categories (e.g. S/I/R) each bin blends the
+              category colours by their counts.
+Above 'full', only a sample of agents is drawn in full detail (trail, FOV
+wedge, destination line) on top of the aggregate. Every agent gets a fixed
+random rank (one per population row, which an agent keeps while it lives)
+and the sample is the agents with the lowest ranks among those drawn, so
+the same agents stay highlighted while others join or leave the list.
+'''
+import weakref
+import numpy as np
+
+import shared_path # Puts ../shared on sys.path
+from density import density_image
+from config import LOD_CONFIG
+
+
+class LevelOfDetail:
+    def __init__(self, width, height, config=None, seed=None):
+        self.width, self.height = width, height
+        self.config = dict(LOD_CONFIG, **(config or {}))
+        self.rng = np.random.default_rng(seed)
+        self._ranks = weakref.WeakKeyDictionary() # Population -> random rank per row
+
+    def mode_for(self, count):
+        mode = self.config['mode']
+        if mode != 'auto':
+            return mode
+        if count <= self.config['full_max_agents']:
+            return 'full'
+        if count <= self.config['points_max_agents']:
+            return 'points'
+        return 'density'
+
+    def _rank(self, agent):
+        pop = agent._pop
+        ranks = self._ranks.get(pop)
+        if ranks is None or len(ranks) < pop.capacity:
+            known = ranks if ranks is not None else np.empty(0)
+            ranks = self._ranks[pop] = np.concatenate((known, self.rng.random(pop.capacity - len(known))))
+        return ranks.item(agent._i)
+
+    def detail_indices(self, agents):
+        """Positions in agents of the ones that keep trails and FOV wedges: the lowest-ranked agents."""
+        size = min(len(agents), self.config['detail_sample'])
+        if size == 0:
+            return np.empty(0, dtype=int)
+        ranks = np.fromiter((self._rank(agent) for agent in agents), dtype=float, count=len(agents))
+        return np.sort(np.argpartition(ranks, size - 1)[:size])
+
+    def draw_positions(self, ax, positions, categories=None, colors=None, point_colors=None):
+        """Aggregate layer for an (N, 2) position array; returns the mode used."""
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        mode = self.mode_for(len(positions))
+        if mode == 'density':
+            bins, extent = self.config['density_bins'], (0, self.width, 0, self.height)
+            image = density_image(positions, extent, bins, categories, colors, self.config['cmap'])
+            ax.imshow(image, extent=extent, origin='lower', interpolation='nearest',
+                      aspect='auto', zorder=0)
+        else: # 'points' (and 'full' for callers without agent objects)
+            if categories is not None:
+                point_colors = np.asarray(colors, dtype=object)[np.asarray(categories)]
+            ax.scatter(positions[:, 0], positions[:, 1], s=self.config['point_size'], c=point_colors,
+                       linewidths=0, zorder=1)
+        ax.set_xlim(0, self.width)
+        ax.set_ylim(0, self.height)
+        return mode
+
+    def draw_agents(self, ax, agents, alpha=1.0, categories=None, colors=None):
+        """Draws Agent objects at the level of detail their number allows; returns the mode used."""
+        count = len(agents)
+        if self.mode_for(count) == 'full':
+            for agent in agents:
+                agent.display(ax, alpha)
+            return 'full'
+        positions = np.array([agent.render_position(alpha) for agent in agents], dtype=float).reshape(-1, 2)
+        point_colors = [agent.color for agent in agents] if categories is None else None
+        mode = self.draw_positions(ax, positions, categories, colors, point_colors)
+        for i in self.detail_indices(agents):
+            agents[i].display(ax, alpha)
+        return mode
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules use flat sibling imports; run these tests from agent_simulations
+# (network_models_project has modules of the same names, e.g. config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
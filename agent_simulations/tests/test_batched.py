@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from batched import BatchedFlocks, neighbor_pairs, parameter_grid, random_scenarios
+from boid import Boid
+from config import BOIDS_CONFIG
+from partitioned import _flock_params, step_flock
+
+WIDTH, HEIGHT = 300.0, 200.0
+PARAMS = _flock_params(BOIDS_CONFIG)
+
+
+def test_parameter_grid():
+    grid = parameter_grid(separation_factor=[1, 1.5], cohesion_factor=[0.5, 1, 2])
+    assert len(grid['separation_factor']) == 6
+    combos = set(zip(grid['separation_factor'].tolist(), grid['cohesion_factor'].tolist()))
+    assert combos == {(s, c) for s in (1, 1.5) for c in (0.5, 1, 2)}
+
+
+def test_neighbor_pairs_stay_inside_their_scenario():
+    pos, _ = random_scenarios(5, 80, WIDTH, HEIGHT, 2.0, seed=1)
+    radius = np.array([20.0, 35.0, 50.0, 10.0, 60.0])
+    i, j, _, dist2 = neighbor_pairs(pos, radius, WIDTH, HEIGHT)
+    found = set(zip(i.tolist(), j.tolist()))
+    expected = set()
+    for s in range(5):
+        d = np.linalg.norm(pos[s][:, None] - pos[s][None], axis=2)
+        a, b = np.nonzero((d > 0) & (d < radius[s]))
+        expected |= set(zip((a + s * 80).tolist(), (b + s * 80).tolist()))
+    assert found == expected
+    np.testing.assert_allclose(dist2, np.sum((pos.reshape(-1, 2)[i] - pos.reshape(-1, 2)[j]) ** 2, axis=1))
+
+
+def test_batched_steps_match_per_scenario_steps():
+    grid = parameter_grid(perception_radius=[30.0, 60.0], separation_factor=[1.0, 2.0], max_speed=[2.0, 4.0])
+    pos0, vel0 = random_scenarios(8, 120, WIDTH, HEIGHT, grid['max_speed'], seed=2)
+    flocks = BatchedFlocks(pos0, vel0, grid, WIDTH, HEIGHT)
+    flocks.run(15)
+    for s in range(8):
+        params = dict(PARAMS, **{name: float(values[s]) for name, values in grid.items()})
+        p, v = pos0[s], vel0[s]
+        for _ in range(15):
+            p, v = step_flock(p, v, params, WIDTH, HEIGHT)
+        np.testing.assert_allclose(flocks.pos[s], p, atol=1e-9)
+        np.testing.assert_allclose(flocks.vel[s], v, atol=1e-9)
+        assert flocks.scenario(s)[0] == params
+
+
+def test_batched_step_matches_boid_objects():
+    pos0, vel0 = random_scenarios(1, 60, WIDTH, HEIGHT, PARAMS['max_speed'], seed=3)
+    boids = [Boid(x, y, PARAMS['max_speed'], PARAMS['max_force'], PARAMS['perception_radius'],
+                  PARAMS['separation_factor'], PARAMS['alignment_factor'], PARAMS['cohesion_factor'])
+             for x, y in pos0[0]]
+    for boid, v in zip(boids, vel0[0]):
+        boid.velocity = v.copy()
+    flocks = BatchedFlocks(pos0, vel0, width=WIDTH, height=HEIGHT)
+    for _ in range(3):
+        for boid in boids:
+            boid.flock(boids)
+        for boid in boids:
+            boid.update()
+            boid.edges(WIDTH, HEIGHT)
+        flocks.step()
+    np.testing.assert_allclose(flocks.pos[0], [boid.position for boid in boids], atol=1e-9)
+
+
+def test_rejects_unknown_parameters_and_bad_shapes():
+    pos, vel = random_scenarios(2, 5, WIDTH, HEIGHT, 2.0, seed=4)
+    with pytest.raises(KeyError):
+        BatchedFlocks(pos, vel, {'speed': [1.0, 2.0]})
+    with pytest.raises(ValueError):
+        BatchedFlocks(pos[0], vel[0])
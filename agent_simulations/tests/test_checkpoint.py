@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+
+import shared_path # Puts ../shared on sys.path
+import rng
+from boid import Boid
+from checkpoint import load_checkpoint, pack_agents, run_with_checkpoints, save_checkpoint, unpack_agents
+
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+    rng.seed_all(value)
+
+
+def make_flock(n=12):
+    # Same start every time; the run itself draws from the global RNGs and an rng.py stream
+    gen = np.random.default_rng(0)
+    return [Boid(x, y, 3.0, 0.1, perception_radius=120.0) for x, y in gen.uniform(0, 300, (n, 2))]
+
+
+def driver(boids):
+    stream = rng.draws('test_checkpoint')
+    state = {'kicks': 0}
+
+    def step(dt):
+        for boid in boids:
+            boid.flock(boids)
+        kicked = boids[random.randrange(len(boids))]
+        kicked.apply_force(np.random.normal(0, 0.05, 2) + stream.uniform(-0.05, 0.05, 2))
+        state['kicks'] += 1
+        for boid in boids:
+            boid.update(dt)
+    return step, state
+
+
+def test_pack_unpack_round_trip():
+    boids = make_flock()
+    step, _ = driver(boids)
+    for _ in range(5):
+        step(1.0)
+    scalars, arrays = pack_agents(boids)
+    restored = make_flock()
+    unpack_agents(restored, scalars, arrays)
+    for a, b in zip(boids, restored):
+        np.testing.assert_array_equal(a.position, b.position)
+        np.testing.assert_array_equal(a.velocity, b.velocity)
+        np.testing.assert_array_equal(a.history, b.history)
+        assert a.perception_radius == b.perception_radius
+
+
+def test_saved_file_restores_agents_and_rng(tmp_path):
+    path = str(tmp_path / 'flock.ckpt')
+    boids = make_flock()
+    seed(4)
+    save_checkpoint(path, boids, step=3, extra={'kicks': 3})
+    expected = (random.random(), np.random.random(), rng.draws('test_checkpoint').random())
+    seed(99)
+    restored = make_flock()
+    assert load_checkpoint(path, restored) == (3, {'kicks': 3})
+    assert (random.random(), np.random.random(), rng.draws('test_checkpoint').random()) == expected
+
+
+def run(num_steps, path, seed_value):
+    seed(seed_value)
+    boids = make_flock()
+    step, state = driver(boids)
+    run_with_checkpoints(boids, step, num_steps, path, every=7, get_extra=lambda: dict(state),
+                         set_extra=state.update)
+    return np.array([b.position for b in boids]), state['kicks']
+
+
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path):
+    full = run(40, str(tmp_path / 'full.ckpt'), seed_value=3)
+    path = str(tmp_path / 'resume.ckpt')
+    run(20, path, seed_value=3)
+    resumed = run(40, path, seed_value=12345) # The seed is overwritten by the checkpoint
+    np.testing.assert_array_equal(resumed[0], full[0])
+    assert resumed[1] == full[1] == 40
@@ -0,0 +1,37 @@
+import pytest
+
+import clock
+from clock import SimulationClock
+
+
+def test_each_frame_runs_its_substeps():
+    steps = []
+    sim = SimulationClock(dt=1.0, substeps=3)
+    for _ in range(4):
+        assert sim.tick(steps.append) == 1.0
+    assert len(steps) == 12 and all(dt == pytest.approx(1 / 3) for dt in steps)
+    assert sim.step_count == 12 and sim.sim_time == pytest.approx(4.0)
+
+
+def test_headless_run_matches_rendered_frames():
+    rendered, headless = [], []
+    frames = SimulationClock(dt=0.5, substeps=4)
+    for _ in range(10):
+        frames.tick(rendered.append)
+    assert SimulationClock(dt=0.5, substeps=4).run(headless.append, 10) == frames.step_count
+    assert headless == rendered
+
+
+def test_realtime_frames_catch_up_and_interpolate(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(clock.time, 'perf_counter', lambda: now[0])
+    steps = []
+    sim = SimulationClock(dt=1.0, substeps=2, realtime=True, sim_speed=10.0) # Physics step 0.5, cap 8 per frame
+    sim.tick(steps.append) # The first frame covers one dt
+    assert len(steps) == 2
+    now[0] += 0.125 # 1.25 sim-time units: two steps, half a step left over
+    assert sim.tick(steps.append) == pytest.approx(0.5)
+    assert len(steps) == 4
+    now[0] += 10.0 # A long stall: at most 8 steps, the rest of the backlog is dropped
+    sim.tick(steps.append)
+    assert len(steps) == 12 and sim.accumulator <= sim.step_dt
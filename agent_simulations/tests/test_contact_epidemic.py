@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from contact_epidemic import ContactSIRModel, RandomWaypointCrowd, expand_ranges, find_contacts
+
+
+def brute_force_contacts(positions, radius, width, height, periodic):
+    d = positions[:, None, :] - positions[None, :, :]
+    if periodic:
+        d -= np.array([width, height]) * np.round(d / [width, height])
+    close = (d ** 2).sum(axis=2) < radius * radius
+    i, j = np.nonzero(np.triu(close, k=1))
+    return {(a, b) for a, b in zip(i.tolist(), j.tolist())}
+
+
+def as_set(contacts):
+    pairs = [tuple(sorted(pair)) for pair in contacts.tolist()]
+    assert len(pairs) == len(set(pairs)) # Each pair once
+    return set(pairs)
+
+
+@pytest.mark.parametrize('periodic', [False, True])
+@pytest.mark.parametrize('width,height,radius', [(100, 80, 7.0), (100, 80, 33.0), (50, 50, 40.0), (30, 90, 70.0)])
+def test_find_contacts_matches_brute_force(periodic, width, height, radius):
+    rng = np.random.default_rng(int(radius))
+    positions = rng.random((250, 2)) * [width, height]
+    positions[:5] = [[0, 0], [width - 1e-9, 0], [0, height - 1e-9], [width / 2, height / 2], [width / 2, height / 2]]
+    contacts = find_contacts(positions, radius, width, height, periodic)
+    assert as_set(contacts) == brute_force_contacts(positions, radius, width, height, periodic)
+
+
+def test_find_contacts_with_fewer_than_two_agents():
+    assert find_contacts(np.zeros((1, 2)), 5.0, 10, 10).shape == (0, 2)
+    assert find_contacts(np.zeros((0, 2)), 5.0, 10, 10).shape == (0, 2)
+
+
+def test_expand_ranges():
+    starts, lengths = np.array([3, 10, 0, 7]), np.array([2, 0, 3, 1])
+    expected = np.concatenate([np.arange(s, s + n) for s, n in zip(starts, lengths)])
+    np.testing.assert_array_equal(expand_ranges(starts, lengths), expected)
+
+
+def test_contact_sir_keeps_the_population_and_only_infects_contacts():
+    crowd = RandomWaypointCrowd(300, 200, 200, 2.0, 5.0, seed=1)
+    model = ContactSIRModel(300, 0.3, 0.05, seed=1)
+    model.set_initial_infected_nodes(range(5))
+    was_infected = model.states != 0
+    for t in range(1, 40):
+        contacts = find_contacts(crowd.step(), 8.0, 200, 200)
+        before = model.states.copy()
+        model.step(t, contacts)
+        new = np.flatnonzero((before == 0) & (model.states == 1))
+        infectious = set(np.flatnonzero(before == 1).tolist())
+        partners = {n: set() for n in new.tolist()}
+        for a, b in contacts.tolist():
+            for x, y in ((a, b), (b, a)):
+                if x in partners:
+                    partners[x].add(y)
+        assert all(partners[n] & infectious for n in partners)
+        was_infected |= model.states != 0
+    counts = np.array([model.s_counts, model.i_counts, model.r_counts])
+    assert (counts.sum(axis=0) == 300).all()
+    np.testing.assert_array_equal(np.bincount(model.states, minlength=3), counts[:, -1])
+    assert model.r_counts[-1] + model.i_counts[-1] == was_infected.sum() > 5
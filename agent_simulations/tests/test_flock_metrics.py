@@ -0,0 +1,100 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from batched import BatchedFlocks, random_scenarios
+from flock_metrics import (ConvergenceDetector, FlockMetrics, angular_momentum, cluster_stats, connected_components,
+                           polarization)
+
+
+@pytest.mark.parametrize('num_nodes,num_edges', [(1, 0), (50, 30), (300, 280), (300, 1000)])
+def test_connected_components_match_networkx(num_nodes, num_edges):
+    rng = np.random.default_rng(num_edges)
+    a, b = rng.integers(0, num_nodes, (2, num_edges))
+    root = connected_components(np.concatenate((a, b)), np.concatenate((b, a)), num_nodes)
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_edges_from(zip(a.tolist(), b.tolist()))
+    expected = np.empty(num_nodes, dtype=np.int64)
+    for component in nx.connected_components(graph):
+        expected[list(component)] = min(component)
+    np.testing.assert_array_equal(root, expected)
+
+
+def test_cluster_stats_per_scenario():
+    # Scenario 0: boids 0-1-2 linked, 3 alone; scenario 1: two pairs
+    i = np.array([0, 1, 4, 6])
+    j = np.array([1, 2, 5, 7])
+    clusters, largest = cluster_stats(np.concatenate((i, j)), np.concatenate((j, i)), 2, 4)
+    np.testing.assert_array_equal(clusters, [2, 2])
+    np.testing.assert_array_equal(largest, [0.75, 0.5])
+
+
+def test_order_parameters():
+    vel = np.array([[[1.0, 0.0], [2.0, 0.0]], [[1.0, 0.0], [-3.0, 0.0]]])
+    np.testing.assert_allclose(polarization(vel), [1.0, 0.0])
+    theta = np.linspace(0, 2 * np.pi, 12, endpoint=False)
+    ring = np.stack((np.cos(theta), np.sin(theta)), axis=1)
+    pos = 500 + 50 * ring[None] # A mill: every boid moves along the circle
+    tangent = np.stack((-ring[:, 1], ring[:, 0]), axis=1)[None]
+    assert angular_momentum(pos, tangent, 1000, 1000)[0] == pytest.approx(1.0)
+    assert angular_momentum(pos, ring[None], 1000, 1000)[0] == pytest.approx(0.0, abs=1e-12)
+    # Across the wrap the flock's centre is still that of the ring
+    assert angular_momentum(pos - 500, tangent, 1000, 1000)[0] == pytest.approx(1.0)
+
+
+def test_recorded_metrics_match_a_dense_pass():
+    pos, vel = random_scenarios(3, 60, 300, 200, 4.0, seed=1)
+    flocks = BatchedFlocks(pos, vel, {'perception_radius': [20.0, 40.0, 60.0]}, 300, 200)
+    flocks.run(5)
+    recorded = flocks.metric_arrays()
+    assert recorded['polarization'].shape == (5, 3) and recorded['nn_histogram'].shape[:2] == (5, 3)
+    prev = flocks.prev_pos
+    for s, radius in enumerate((20.0, 40.0, 60.0)):
+        d = np.linalg.norm(prev[s][:, None] - prev[s][None], axis=2)
+        near = (d > 0) & (d < radius)
+        assert recorded['mean_neighbors'][-1, s] == pytest.approx(near.sum(axis=1).mean())
+        has = near.any(axis=1)
+        assert recorded['isolated'][-1, s] == pytest.approx(1 - has.mean())
+        nearest = np.where(near, d, np.inf).min(axis=1)
+        assert recorded['nn_distance'][-1, s] == pytest.approx(nearest[has].mean())
+        graph = nx.from_numpy_array(near.astype(int))
+        assert recorded['clusters'][-1, s] == nx.number_connected_components(graph)
+
+
+def test_subset_records_leave_the_others_nan():
+    metrics = FlockMetrics(3, 4, 100, 100)
+    pos, vel = random_scenarios(1, 4, 100, 100, 2.0, seed=2)
+    values = metrics.record(1, pos, vel, (np.array([], dtype=np.int64),) * 2 + (np.array([]),), scenarios=[1])
+    assert np.isnan(values['polarization'][[0, 2]]).all() and not np.isnan(values['polarization'][1])
+    assert not values['nn_histogram'][[0, 2]].any()
+
+
+def test_detector_needs_a_steady_window():
+    rng = np.random.default_rng(3)
+    detector = ConvergenceDetector(4, tolerances={'polarization': 0.01}, window=20, min_steps=30)
+    for step in range(1, 101):
+        values = np.array([0.5, # Constant
+                           0.5 + 0.0012 * step, # Slow drift: std 0.007 over the window, but its halves differ by 0.012
+                           0.5 + rng.normal(0, 0.05), # Too noisy
+                           np.nan]) # No value
+        detector.update(step, {'polarization': values})
+    assert detector.converged.tolist() == [True, False, False, False]
+    assert detector.converged_step[0] == 30 # min_steps, though the window was full at step 20
+    assert detector.window_means()['polarization'][0] == pytest.approx(0.5)
+
+
+def test_detector_rejects_unknown_metrics_and_short_windows():
+    with pytest.raises(KeyError):
+        ConvergenceDetector(2, tolerances={'order': 0.1})
+    with pytest.raises(ValueError):
+        ConvergenceDetector(2, window=1)
+
+
+def test_run_stops_converged_scenarios():
+    pos, vel = random_scenarios(3, 30, 200, 200, 4.0, seed=4)
+    flocks = BatchedFlocks(pos, vel, width=200, height=200)
+    detector = ConvergenceDetector(3, tolerances={'mean_speed': 10.0}, window=5, min_steps=0) # Always steady
+    flocks.run(50, detector=detector)
+    assert detector.converged.all()
+    assert flocks.steps_run.tolist() == [5, 5, 5]
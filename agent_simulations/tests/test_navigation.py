@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+
+from navigation import NavigationGrid
+from obstacles import ObstacleBVH
+
+
+def follow(grid, start_cell, goal):
+    '''Walks the flow field cell by cell; returns the cells visited.'''
+    field = grid.field_for(goal)
+    cell, path = start_cell, [start_cell]
+    while cell != field.goal_cell and len(path) < grid.rows * grid.cols:
+        dx, dy = np.sign(field.flow[cell]).astype(int) # Flow is the unit offset to the next cell, in (x, y) order
+        cell = (cell[0] + dy, cell[1] + dx)
+        path.append(cell)
+    return path
+
+
+def test_open_grid_distance_is_the_octile_distance():
+    grid = NavigationGrid(100, 60, cell_size=10)
+    distance = grid.field_for((5, 5)).distance
+    rows, cols = np.indices(distance.shape)
+    np.testing.assert_allclose(distance, np.maximum(rows, cols) + (math.sqrt(2) - 1) * np.minimum(rows, cols))
+
+
+def test_flow_leads_around_a_wall_to_the_goal():
+    wall = ObstacleBVH(walls=[[[100, 0], [100, 160]]])
+    grid = NavigationGrid(200, 200, wall, cell_size=10, clearance=5)
+    assert grid.blocked[:, 9:11].any() and not grid.blocked[-2:, :].any()
+    goal = (185, 15)
+    field = grid.field_for(goal)
+    for start in [(0, 0), (5, 2), (12, 8), (19, 0)]:
+        path = follow(grid, start, goal)
+        assert path[-1] == field.goal_cell
+        assert not any(grid.blocked[cell] for cell in path)
+        steps = sum(math.hypot(a[0] - b[0], a[1] - b[1]) for a, b in zip(path, path[1:]))
+        assert math.isclose(steps, field.distance[start]) # Steepest descent follows a shortest path
+
+
+def test_unreachable_cells_have_no_direction():
+    box = ObstacleBVH(polygons=[[[40, 40], [160, 40], [160, 160], [40, 160]]])
+    grid = NavigationGrid(200, 200, box, cell_size=10, clearance=5)
+    field = grid.field_for((100, 100)) # Inside the closed box
+    assert np.isinf(field.distance[0, 0])
+    assert not grid.direction((5, 5), (100, 100)).any()
+
+
+def test_fields_are_cached_per_goal_cell():
+    grid = NavigationGrid(100, 100, cell_size=10, cache_size=2)
+    first = grid.field_for((15, 15))
+    assert grid.field_for((19, 11)) is first # Same cell
+    grid.field_for((55, 55))
+    grid.field_for((85, 85)) # Evicts the least recently used field
+    assert grid.field_for((15, 15)) is not first
+    assert grid.cache_info() == {'hits': 1, 'misses': 4, 'size': 2, 'max_size': 2}
@@ -0,0 +1,60 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from obstacles import CIRCLE, ObstacleBVH, _ray_capsule, _ray_circle, load_scene, polygon_edges
+
+
+def random_scene(seed):
+    rng = np.random.default_rng(seed)
+    circles = [{'position': rng.random(2) * 500, 'radius': float(rng.uniform(5, 30))} for _ in range(25)]
+    walls = [rng.random((2, 2)) * 500 for _ in range(20)]
+    polygons = [rng.random(2) * 450 + rng.random((4, 2)) * 50 for _ in range(5)]
+    return circles, walls, polygons
+
+
+def brute_force(bvh, origin, direction, max_dist, pad):
+    best = max_dist
+    for prim in bvh.prims:
+        if prim[0] == CIRCLE:
+            t = _ray_circle(*origin, *direction, prim[1], prim[2], prim[3] + pad)
+        else:
+            t = _ray_capsule(*origin, *direction, *prim[1:], pad)
+        best = min(best, t)
+    return best
+
+
+def test_simple_hits():
+    bvh = ObstacleBVH(circles=[{'position': np.array([10.0, 0.0]), 'radius': 2.0}], walls=[[[0, 5], [10, 5]]])
+    assert bvh.ray_cast((0, 0), (1, 0), 100) == pytest.approx(8.0)
+    assert bvh.ray_cast((0, 0), (1, 0), 100, pad=1.0) == pytest.approx(7.0)
+    assert bvh.ray_cast((5, 0), (0, 1), 100) == pytest.approx(5.0)
+    assert bvh.ray_cast((5, 0), (0, 1), 100, pad=1.0) == pytest.approx(4.0)
+    assert bvh.ray_cast((0, 0), (-1, 0), 100) == 100 # Nothing behind the origin
+    assert ObstacleBVH().ray_cast((0, 0), (1, 0), 50) == 50
+
+
+@pytest.mark.parametrize('pad', [0.0, 4.0])
+def test_bvh_matches_brute_force(pad):
+    bvh = ObstacleBVH(*random_scene(1))
+    assert len(bvh) == 25 + 20 + 5 * 4
+    rng = np.random.default_rng(2)
+    for _ in range(500):
+        origin = tuple(rng.random(2) * 500)
+        angle = rng.uniform(0, 2 * math.pi)
+        direction = (math.cos(angle), math.sin(angle))
+        if rng.random() < 0.1: # Axis-aligned rays take the parallel-slab path
+            direction = [(1.0, 0.0), (0.0, -1.0)][int(rng.integers(2))]
+        expected = brute_force(bvh, origin, direction, 200.0, pad)
+        assert bvh.ray_cast(origin, direction, 200.0, pad) == pytest.approx(expected)
+
+
+def test_load_scene(tmp_path):
+    path = tmp_path / 'scene.json'
+    path.write_text(json.dumps({'circles': [{'position': [1, 2], 'radius': 3}], 'polygons': [[[0, 0], [1, 0], [0, 1]]]}))
+    circles, walls, polygons = load_scene(str(path))
+    assert circles[0]['radius'] == 3.0 and circles[0]['color'] == 'gray' and walls == []
+    edges = polygon_edges(polygons[0])
+    assert len(edges) == 3 and np.array_equal(edges[-1], [[0, 1], [0, 0]]) # Closed
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from config import BOIDS_CONFIG
+from partitioned import PartitionedFlock, _flock_params, _normalize_rows, flock_accelerations, random_flock, step_flock
+
+PARAMS = _flock_params(BOIDS_CONFIG)
+
+
+def dense_accelerations(own_pos, own_vel, cand_pos, cand_vel, params):
+    '''Boid.flock written out per agent, over every candidate.'''
+    acc = np.zeros_like(own_pos)
+    for k, (p, v) in enumerate(zip(own_pos, own_vel)):
+        d = np.linalg.norm(p - cand_pos, axis=1)
+        near = (d > 0) & (d < params['perception_radius'])
+        if not near.any():
+            continue
+        forces = []
+        for target in (((p - cand_pos[near]) / d[near, None] ** 2).mean(axis=0),
+                       cand_vel[near].mean(axis=0), cand_pos[near].mean(axis=0) - p):
+            steer = _normalize_rows(target[None])[0] * params['max_speed'] - v
+            norm = np.linalg.norm(steer)
+            forces.append(steer * params['max_force'] / norm if norm > params['max_force'] else steer)
+        acc[k] = (forces[0] * params['separation_factor'] + forces[1] * params['alignment_factor'] +
+                  forces[2] * params['cohesion_factor'])
+    return acc
+
+
+@pytest.mark.parametrize('num_agents', [1, 2, 60, 400])
+def test_cell_list_matches_dense(num_agents):
+    pos, vel = random_flock(num_agents, 800, 600, PARAMS['max_speed'], seed=num_agents)
+    pos[:num_agents // 10] = pos[num_agents // 10:2 * (num_agents // 10)] # Coincident agents are not neighbours
+    own = slice(0, max(1, num_agents // 3))
+    acc = flock_accelerations(pos[own], vel[own], np.arange(num_agents), pos, vel, PARAMS)
+    np.testing.assert_allclose(acc, dense_accelerations(pos[own], vel[own], pos, vel, PARAMS), atol=1e-12)
+
+
+def test_partitioned_run_is_bit_identical_and_grows_its_buffers():
+    rng = np.random.default_rng(5)
+    n = 300
+    # Clustered at the tile centres: the first halos are almost empty, later ones are not
+    centres = np.array([[200, 150], [600, 150], [200, 450], [600, 450]])
+    pos = centres[rng.integers(0, 4, n)] + rng.normal(0, 20, (n, 2))
+    vel = _normalize_rows(rng.random((n, 2)) - 0.5) * PARAMS['max_speed']
+    ref_pos, ref_vel = pos, vel
+    for _ in range(40):
+        ref_pos, ref_vel = step_flock(ref_pos, ref_vel, PARAMS, 800, 600)
+    with PartitionedFlock(pos, vel, tiles=(2, 2), width=800, height=600) as flock:
+        initial_capacity = flock._buffers['halo'].array.shape[1]
+        flock.run(15)
+        out_pos, out_vel = flock.run(25)
+        assert flock.step_count == 40
+        assert initial_capacity < flock._buffers['halo'].array.shape[1] < n
+    assert np.array_equal(out_pos, ref_pos) and np.array_equal(out_vel, ref_vel)
+
+
+def test_partitioned_rejects_steps_longer_than_the_halo():
+    config = dict(BOIDS_CONFIG, max_speed=BOIDS_CONFIG['perception_radius'])
+    pos, vel = random_flock(10, 800, 600, 1.0, seed=0)
+    with pytest.raises(ValueError):
+        PartitionedFlock(pos, vel, tiles=(2, 2), width=800, height=600, config=config)
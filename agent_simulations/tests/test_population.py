@@ -0,0 +1,91 @@
+import copy
+import gc
+import pickle
+
+import numpy as np
+
+from agent_base import Agent
+from boid import Boid
+from population import Population
+
+
+def test_attributes_live_in_the_population_rows():
+    store = Population(capacity=4)
+    agents = [Agent(i, 2 * i, 3.0, 0.1, population=store) for i in range(3)]
+    agents[1].position = (5.0, 6.0)
+    agents[2].velocity[0] = 1.5 # In-place writes reach the row too
+    assert np.array_equal(store.position[1], [5.0, 6.0])
+    assert store.velocity[2, 0] == 1.5
+    assert agents[0].max_speed == store.max_speed[0] == 3.0
+    assert store.rows().tolist() == [0, 1, 2]
+
+
+def test_growing_keeps_agents_and_released_rows_are_reused():
+    store = Population(capacity=2)
+    agents = [Agent(i, i, 3.0, 0.1, population=store) for i in range(40)]
+    assert store.capacity >= 40
+    assert [a.position.tolist() for a in agents] == [[float(i), float(i)] for i in range(40)]
+    del agents[5], agents[2] # Frees rows 5 and 2
+    gc.collect()
+    agents += [Agent(0, 0, 1.0, 0.1, population=store) for _ in range(3)]
+    assert [a._i for a in agents[-3:]] == [2, 5, 40]
+
+
+def test_a_copied_agent_gets_its_own_row():
+    store = Population(capacity=4)
+    a = Boid(10, 20, 3.0, 0.1, population=store)
+    a.update()
+    b = copy.copy(a)
+    assert b._i != a._i
+    assert np.array_equal(b.position, a.position) and np.array_equal(b.history, a.history)
+    assert b.perception_radius == a.perception_radius and b.color == a.color
+    b.position = (1.0, 2.0)
+    assert not np.array_equal(a.position, [1.0, 2.0])
+    position = a.position.copy()
+    del b
+    gc.collect()
+    c = Boid(500, 500, 3.0, 0.1, population=store) # Reuses the copy's row, not a's
+    assert c._i != a._i and np.array_equal(a.position, position)
+
+
+def test_history_is_a_bounded_trail_oldest_first():
+    store = Population(history_length=5)
+    agent = Agent(0, 0, 100.0, 0.1, population=store)
+    agent.velocity = (1.0, 0.0)
+    for _ in range(8):
+        agent.update()
+    np.testing.assert_array_equal(agent.history[:, 0], [4, 5, 6, 7, 8])
+    agent.history = [[1, 1], [2, 2]]
+    np.testing.assert_array_equal(agent.history, [[1, 1], [2, 2]])
+    agent.position = (2.0, 2.0)
+    agent.edges(3, 3)
+    assert len(agent.history) == 2
+    agent.position = (10.0, 0.0)
+    agent.edges(3, 3) # Wrapping clears the trail
+    assert len(agent.history) == 0 and agent.position[0] == 0
+
+
+def test_update_matches_the_vector_formula():
+    store = Population()
+    boid = Boid(10, 20, 2.0, 0.1, population=store)
+    boid.velocity = (1.0, 1.0)
+    boid.apply_force(np.array([3.0, -1.0]))
+    boid.update(0.5)
+    velocity = np.array([1.0, 1.0]) + np.array([3.0, -1.0]) * 0.5
+    velocity *= 2.0 / np.linalg.norm(velocity)
+    np.testing.assert_allclose(boid.velocity, velocity)
+    np.testing.assert_allclose(boid.position, [10, 20] + velocity * 0.5)
+    assert not boid.acceleration.any()
+
+
+def test_pickle_keeps_the_rows_in_use():
+    store = Population(capacity=64)
+    boids = [Boid(i, i, 2.0, 0.1, population=store) for i in range(10)]
+    for boid in boids:
+        boid.update()
+    copy_store, copies = pickle.loads(pickle.dumps((store, boids)))
+    assert copies[3]._pop is copy_store and copy_store.count == 10
+    for a, b in zip(boids, copies):
+        np.testing.assert_array_equal(a.position, b.position)
+        np.testing.assert_array_equal(a.history, b.history)
+    Boid(0, 0, 2.0, 0.1, population=copy_store) # The spare capacity is rebuilt on load
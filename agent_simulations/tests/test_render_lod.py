@@ -0,0 +1,60 @@
+import numpy as np
+from matplotlib.figure import Figure
+
+import shared_path # Puts ../shared on sys.path
+from density import density_image
+from agent_base import Agent
+from population import Population
+from render_lod import LevelOfDetail
+
+
+def test_density_counts_set_the_opacity():
+    xy = np.array([[0.5, 0.5]] * 9 + [[3.5, 1.5]] + [[-5.0, 99.0]]) # The last point is clipped into the corner bin
+    image = density_image(xy, (0, 4, 0, 2), (4, 2))
+    assert image.shape == (2, 4, 4)
+    alpha = image[..., 3]
+    assert alpha[0, 0] == 1.0
+    assert alpha[1, 3] == alpha[1, 0] == 0.25 + 0.75 * np.log1p(1) / np.log1p(9)
+    assert np.count_nonzero(alpha) == 3
+
+
+def test_density_blends_category_colours():
+    xy = np.array([[0.5, 0.5]] * 4 + [[1.5, 0.5]])
+    image = density_image(xy, (0, 2, 0, 1), (2, 1), categories=[0, 0, 0, 1, 1], colors=['red', 'blue'])
+    np.testing.assert_allclose(image[0, 0, :3], [0.75, 0.0, 0.25])
+    np.testing.assert_allclose(image[0, 1, :3], [0.0, 0.0, 1.0])
+
+
+def test_mode_follows_the_population_size():
+    lod = LevelOfDetail(100, 100, {'mode': 'auto', 'full_max_agents': 10, 'points_max_agents': 100})
+    assert [lod.mode_for(n) for n in (10, 11, 100, 101)] == ['full', 'points', 'points', 'density']
+    assert LevelOfDetail(100, 100, {'mode': 'points'}).mode_for(1) == 'points'
+
+
+def test_detail_sample_follows_the_agents():
+    store = Population()
+    agents = [Agent(i, i, 1.0, 0.1, population=store) for i in range(1000)]
+    lod = LevelOfDetail(100, 100, {'detail_sample': 5}, seed=1)
+    sample = lod.detail_indices(agents)
+    highlighted = [agents[i] for i in sample]
+    assert len(sample) == 5 and len(set(sample.tolist())) == 5
+    assert np.array_equal(lod.detail_indices(agents), sample)
+    # Dropping agents that are not highlighted (e.g. ones gone to sleep) keeps the same ones highlighted
+    awake = [a for k, a in enumerate(agents) if k % 3 == 0 or any(a is h for h in highlighted)]
+    assert [awake[i] for i in lod.detail_indices(awake)] == highlighted
+    # Dropping a highlighted one promotes another agent and keeps the rest
+    rest = [a for a in awake if a is not highlighted[0]]
+    kept = [rest[i] for i in lod.detail_indices(rest)]
+    assert len(kept) == 5 and all(any(a is h for a in kept) for h in highlighted[1:])
+    assert len(lod.detail_indices(agents[:3])) == 3
+
+
+def test_draw_positions_uses_one_artist():
+    lod = LevelOfDetail(100, 100, {'mode': 'auto', 'full_max_agents': 10, 'points_max_agents': 100})
+    positions = np.random.default_rng(2).random((500, 2)) * 100
+    ax = Figure().add_subplot()
+    assert lod.draw_positions(ax, positions, categories=np.arange(500) % 3, colors=['r', 'g', 'b']) == 'density'
+    assert len(ax.images) == 1 and not ax.collections
+    ax = Figure().add_subplot()
+    assert lod.draw_positions(ax, positions[:50], point_colors='k') == 'points'
+    assert len(ax.collections) == 1 and not ax.images
@@ -1,5 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
+
+import shared_path # Puts ../shared on sys.path
+from plotting import pyplot
 
 def limit_vector(vector, max_val):
     """Limits the magnitude of a vector."""
@@ -17,6 +19,7 @@ def normalize_vector(vector):
 
 def setup_plot(width, height, title):
     """Sets up the matplotlib plot for animation."""
+    plt = pyplot()
     fig, ax = plt.subplots()
     ax.set_xlim(0, width)
     ax.set_ylim(0, height)
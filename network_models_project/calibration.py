@@ -0,0 +1,298 @@
+'''
+Parameter sweeps and calibration of infection_prob / recovery_prob against
+an observed outbreak curve (infected count per step).
+
+Simulations use the SIR table of epidemic_model.compartmental, which
+follows SIRModel's rules. Replicate r of any parameter point is seeded with
+SeedSequence(seed, spawn_key=(r,)), so every point sees the same random
+numbers and differences between points come from the parameters rather
+than from noise. Missing replicates run in a process pool; the results do
+not depend on the number of workers.
+
+Every replicate's S/I/R curve is stored in a content-addressed cache next to
+the graph cache (GENERAL_CONFIG['cache_dir']). The key is a hash of the graph
+(nodes and edges), the initial infected nodes, the parameters, the seed, the
+replicate and the number of steps, so repeated or overlapping sweeps only
+simulate what has not been run before.
+
+Sweeps: grid_points (every combination of per-parameter values) and
+latin_hypercube (stratified random points in the bounds). Calibration:
+abc_smc, sequential Monte Carlo approximate Bayesian computation whose
+tolerance is a quantile of the previous generation's distances. The
+distance is the RMS difference between the observed curve and the mean
+infected curve over the replicates.
+'''
+import csv
+import itertools
+import os
+import time
+import multiprocessing as mp
+import numpy as np
+
+from config import GENERAL_CONFIG, SIR_MODEL_CONFIG, CALIBRATION_CONFIG
+from epidemic_model.compartmental import CompartmentalModel
+from graph_cache import cache_dir, generate_graph, digest, graph_fingerprint, save_npz
+import shared_path # Puts ../shared on sys.path
+from rng import generator
+
+PARAMS = ('infection_prob', 'recovery_prob')
+ENGINE = 'compartmental-SIR-1' # Part of every cache key; change it when the simulation changes
+
+
+def simulate_replicate(graph, params, initial_infected, max_steps, seed, replicate):
+    """S/I/R counts as a (3, max_steps + 1) int array, held at the final values after the outbreak ends."""
+    model = CompartmentalModel.from_table(graph, 'SIR', params,
+                                          seed=np.random.SeedSequence(seed, spawn_key=(replicate,)))
+    model.set_initial('I', initial_infected)
+    model.run(max_steps)
+    counts = np.array([model.history[label] for label in ('S', 'I', 'R')], dtype=np.int64)
+    out = np.empty((3, max_steps + 1), dtype=np.int64)
+    out[:, :counts.shape[1]] = counts
+    out[:, counts.shape[1]:] = counts[:, -1:]
+    return out
+
+
+_worker = {}
+
+
+def _init_worker(graph, initial_infected, max_steps, seed):
+    _worker.update(graph=graph, initial=initial_infected, max_steps=max_steps, seed=seed)
+
+
+def _run_task(task):
+    params, replicate = task
+    return simulate_replicate(_worker['graph'], params, _worker['initial'], _worker['max_steps'], _worker['seed'],
+                              replicate)
+
+
+class ResultCache:
+    """Replicate results on disk (and in memory), keyed by content; counts hits and misses."""
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'sir-{key}.npz') if self.directory else None
+
+    def get(self, key):
+        result = self.memory.get(key)
+        path = self._path(key)
+        if result is None and path and os.path.exists(path):
+            result = self.memory[key] = np.load(path)['counts']
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key, counts):
+        self.memory[key] = counts
+        path = self._path(key)
+        if path:
+            save_npz(path, counts=counts)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def read_curve(path):
+    """Observed infected counts, one row per step, from the 'infected' column of a CSV file."""
+    with open(path, newline='') as f:
+        return np.array([float(row['infected']) for row in csv.DictReader(f)])
+
+
+def grid_points(values):
+    """Every combination of {param: [values]}, as a list of parameter dicts."""
+    names = list(values)
+    return [dict(zip(names, map(float, combo))) for combo in itertools.product(*(values[n] for n in names))]
+
+
+def latin_hypercube(bounds, num_points, seed=None):
+    """num_points parameter dicts, each parameter's range split into num_points strata hit once."""
+    rng = generator('calibration.lhs') if seed is None else np.random.default_rng(seed)
+    names = list(bounds)
+    points = [{} for _ in range(num_points)]
+    for name in names:
+        low, high = bounds[name]
+        strata = (rng.permutation(num_points) + rng.random(num_points)) / num_points
+        for point, u in zip(points, strata):
+            point[name] = float(low + (high - low) * u)
+    return points
+
+
+class SIRCalibrator:
+    def __init__(self, graph, observed, initial_infected, seed=None, replicates=None, num_workers=None,
+                 max_steps=None, cache=None):
+        cfg = CALIBRATION_CONFIG
+        self.graph = graph
+        self.observed = np.asarray(observed, dtype=float)
+        self.initial_infected = list(initial_infected)
+        self.seed = GENERAL_CONFIG['random_seed'] if seed is None else seed
+        self.replicates = replicates or cfg['replicates']
+        self.num_workers = num_workers or cfg['num_workers']
+        self.max_steps = max(max_steps or cfg['max_simulation_steps'], len(self.observed) - 1)
+        self.cache = cache if cache is not None else ResultCache(cache_dir())
+        self._key_base = {'engine': ENGINE, 'graph': graph_fingerprint(graph), 'initial': self.initial_infected,
+                          'seed': self.seed, 'max_steps': self.max_steps}
+        self.simulated = 0
+
+    def _key(self, params, replicate):
+        return digest(dict(self._key_base, params=params, replicate=replicate))
+
+    def curves(self, points):
+        """(points, replicates, 3, max_steps + 1) S/I/R counts, from the cache where possible."""
+        points = [{name: float(point[name]) for name in PARAMS} for point in points]
+        results = np.empty((len(points), self.replicates, 3, self.max_steps + 1), dtype=np.int64)
+        missing, keys = [], []
+        for p, params in enumerate(points):
+            for r in range(self.replicates):
+                key = self._key(params, r)
+                cached = self.cache.get(key)
+                if cached is None:
+                    missing.append((p, r))
+                    keys.append(key)
+                else:
+                    results[p, r] = cached
+        tasks = [(points[p], r) for p, r in missing]
+        if tasks:
+            init = (self.graph, self.initial_infected, self.max_steps, self.seed)
+            if self.num_workers > 1 and len(tasks) > 1:
+                with mp.Pool(min(self.num_workers, len(tasks)), initializer=_init_worker, initargs=init) as pool:
+                    computed = pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (4 * self.num_workers)))
+            else:
+                _init_worker(*init)
+                computed = [_run_task(task) for task in tasks]
+            for (p, r), key, counts in zip(missing, keys, computed):
+                self.cache.put(key, counts)
+                results[p, r] = counts
+            self.simulated += len(tasks)
+        return results
+
+    def distances(self, points):
+        """RMS difference between the observed curve and each point's mean infected curve."""
+        infected = self.curves(points)[:, :, 1, :len(self.observed)].mean(axis=1)
+        return np.sqrt(np.mean((infected - self.observed) ** 2, axis=1))
+
+    def sweep(self, points):
+        """Distances of the given points; returns {'points', 'distances', 'best'}."""
+        d = self.distances(points)
+        return {'points': points, 'distances': d, 'best': points[int(np.argmin(d))]}
+
+    def abc_smc(self, bounds=None, num_particles=None, generations=None, quantile=None, max_batches=None):
+        """
+        ABC-SMC over uniform priors on bounds. Generation 0 is a Latin
+        hypercube; each later one perturbs particles drawn by weight with a
+        Gaussian kernel (twice the weighted covariance) and accepts those
+        within the tolerance. Returns the last population with its weights,
+        distances, the tolerance of every generation and the weighted mean.
+        """
+        cfg = CALIBRATION_CONFIG
+        bounds = bounds or cfg['bounds']
+        n = num_particles or cfg['abc_particles']
+        generations = cfg['abc_generations'] if generations is None else generations
+        quantile = quantile or cfg['abc_quantile']
+        max_batches = max_batches or cfg['abc_max_batches']
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(0xABC,)))
+        low = np.array([bounds[name][0] for name in PARAMS])
+        high = np.array([bounds[name][1] for name in PARAMS])
+
+        def as_points(thetas):
+            return [dict(zip(PARAMS, map(float, theta))) for theta in thetas]
+
+        start = latin_hypercube(bounds, n, seed=rng.integers(2 ** 32))
+        theta = np.array([[point[name] for name in PARAMS] for point in start])
+        dist = self.distances(as_points(theta))
+        weights = np.full(n, 1.0 / n)
+        tolerances = [float(dist.max())]
+
+        for _ in range(generations):
+            eps = float(np.quantile(dist, quantile))
+            mean = weights @ theta
+            cov = 2.0 * ((theta - mean).T * weights) @ (theta - mean) + 1e-12 * np.eye(len(PARAMS))
+            chol = np.linalg.cholesky(cov)
+            inv_cov = np.linalg.inv(cov)
+            accepted, accepted_dist = [], []
+            for _ in range(max_batches):
+                parents = theta[rng.choice(n, size=n, p=weights)]
+                proposals = parents + rng.standard_normal((n, len(PARAMS))) @ chol.T
+                proposals = proposals[np.all((proposals >= low) & (proposals <= high), axis=1)]
+                if len(proposals) == 0:
+                    continue
+                d = self.distances(as_points(proposals))
+                keep = d <= eps
+                accepted.extend(proposals[keep])
+                accepted_dist.extend(d[keep])
+                if len(accepted) >= n:
+                    break
+            if len(accepted) < 2: # Tolerance unreachable within the budget; keep the previous population
+                break
+            new_theta = np.array(accepted[:n])
+            # Importance weights for a uniform prior: 1 / sum_j w_j K(theta | theta_j)
+            delta = new_theta[:, None, :] - theta[None, :, :]
+            kernel = np.exp(-0.5 * np.einsum('ijk,kl,ijl->ij', delta, inv_cov, delta))
+            new_weights = 1.0 / (kernel @ weights)
+            theta, dist = new_theta, np.array(accepted_dist[:n])
+            weights = new_weights / new_weights.sum()
+            n = len(theta)
+            tolerances.append(eps)
+
+        best = int(np.argmin(dist))
+        return {'particles': as_points(theta), 'weights': weights, 'distances': dist, 'tolerances': tolerances,
+                'mean': dict(zip(PARAMS, map(float, weights @ theta))), 'best': as_points(theta[best:best + 1])[0]}
+
+
+def _format(params):
+    return ', '.join(f"{name}={params[name]:.4f}" for name in PARAMS)
+
+
+def calibrate(cfg=None):
+    """
+    Fits the SIR parameters on the SIR demo's graph to an observed curve
+    (CALIBRATION_CONFIG['observed_file'], or one simulated from
+    CALIBRATION_CONFIG['true_params']) with a grid sweep, a Latin hypercube
+    sweep and ABC-SMC; prints the best fits and the cache hit rate.
+    """
+    cfg = cfg or CALIBRATION_CONFIG
+    seed = GENERAL_CONFIG['random_seed']
+    graph = generate_graph('barabasi_albert_graph', n=SIR_MODEL_CONFIG['num_nodes'], m=SIR_MODEL_CONFIG['barabasi_m'],
+                           seed=seed)
+    initial = generator('calibration.initial').choice(list(graph.nodes()), SIR_MODEL_CONFIG['num_initial_infected'],
+                                                      replace=False).tolist()
+    if cfg['observed_file']:
+        observed = read_curve(cfg['observed_file'])
+    else:
+        truth = {name: float(cfg['true_params'][name]) for name in PARAMS}
+        # An independent run (its own seed) stands in for the observed outbreak
+        observed = simulate_replicate(graph, truth, initial, cfg['max_simulation_steps'], seed + 1, 0)[1]
+        print(f"Observed curve simulated with {_format(truth)}")
+
+    calibrator = SIRCalibrator(graph, observed, initial, seed=seed)
+    print(f"Graph: {graph.number_of_nodes()} nodes; {calibrator.replicates} replicates per point, "
+          f"{calibrator.num_workers} workers")
+    grid_values = {name: np.linspace(*cfg['bounds'][name], cfg['grid_points']) for name in PARAMS}
+    for label, run in (('grid', lambda: calibrator.sweep(grid_points(grid_values))),
+                       ('latin hypercube', lambda: calibrator.sweep(latin_hypercube(cfg['bounds'], cfg['lhs_points'],
+                                                                                    seed=seed))),
+                       ('ABC-SMC', calibrator.abc_smc)):
+        hits, misses, simulated = calibrator.cache.hits, calibrator.cache.misses, calibrator.simulated
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        lookups = calibrator.cache.hits - hits + calibrator.cache.misses - misses
+        rate = (calibrator.cache.hits - hits) / lookups if lookups else 0.0
+        line = f"{label}: best {_format(result['best'])}"
+        if 'mean' in result:
+            line += f"; posterior mean {_format(result['mean'])}, tolerances " + \
+                    ' > '.join(f"{eps:.1f}" for eps in result['tolerances'])
+        print(line)
+        print(f"  {calibrator.simulated - simulated} runs simulated in {elapsed:.2f}s, cache hit rate {rate:.0%}")
+    print(f"Overall cache hit rate {calibrator.cache.hit_rate:.0%} ({calibrator.cache.hits} of "
+          f"{calibrator.cache.hits + calibrator.cache.misses} replicate lookups)")
+    return calibrator
+
+if __name__ == '__main__':
+    calibrate()
@@ -0,0 +1,74 @@
+'''
+Checkpoint and resume for SIRModel and LinearThresholdModel runs.
+
+Checkpoints capture the model state (get_state), the global RNGs
+(`random` and `np.random`), the model's own stream (model.rng, see rng.py)
+and the step counter, so a resumed run follows the same trajectory as an
+uninterrupted one. The file format and the background CheckpointWriter are
+shared with the agent simulations (checkpoint_io.py); the step loop only
+pays for copying the state.
+'''
+import os
+
+import shared_path # Puts ../shared on sys.path
+from checkpoint_io import CheckpointWriter, capture_global_rng_state, restore_global_rng_state, read_file, write_file
+
+
+def snapshot(model, step=None):
+    '''Copies everything a checkpoint needs; cheap enough to do inside the step loop.'''
+    scalars, arrays = capture_global_rng_state()
+    if hasattr(getattr(model, 'rng', None), 'get_state'): # A rng.DrawBlock
+        stream_scalars, stream_arrays = model.rng.get_state()
+        scalars['rng_stream'] = stream_scalars
+        arrays.update({'rng.' + k: v for k, v in stream_arrays.items()})
+    model_scalars, model_arrays = model.get_state()
+    scalars.update({'model': type(model).__name__, 'step': step})
+    scalars.update({'model.' + k: v for k, v in model_scalars.items()})
+    arrays.update({'model.' + k: v for k, v in model_arrays.items()})
+    return scalars, arrays
+
+
+def save_checkpoint(path, model, step=None):
+    """Writes a checkpoint synchronously."""
+    scalars, arrays = snapshot(model, step)
+    write_file(path, scalars, arrays)
+
+
+def load_checkpoint(path, model):
+    """Restores model state and the RNG state into model; returns the saved step."""
+    scalars, arrays = read_file(path)
+    if scalars['model'] != type(model).__name__:
+        raise ValueError(f"Checkpoint is for {scalars['model']}, not {type(model).__name__}")
+    restore_global_rng_state(scalars, arrays)
+    if 'rng_stream' in scalars:
+        model.rng.set_state(scalars['rng_stream'], {k[4:]: v for k, v in arrays.items() if k.startswith('rng.')})
+    model.set_state({k[6:]: v for k, v in scalars.items() if k.startswith('model.')},
+                    {k[6:]: v for k, v in arrays.items() if k.startswith('model.')})
+    return scalars['step']
+
+
+def run_with_checkpoints(model, max_steps, path, every=None, resume=True):
+    """
+    SIRModel.run / LinearThresholdModel.run with periodic checkpoints. If
+    resume is set and path exists, continues from the saved step.
+    """
+    every = every or 10
+    start = 1
+    if resume and os.path.exists(path):
+        start = load_checkpoint(path, model) + 1
+    is_sir = hasattr(model, 'i_counts')
+    writer = CheckpointWriter(snapshot)
+    try:
+        for t in range(start, max_steps + 1):
+            if is_sir:
+                model.step(t)
+                done = model.i_counts[-1] == 0 and t > 1
+            else:
+                done = model.step() == 0
+            if t % every == 0 or done or t == max_steps:
+                writer.save(path, model, t)
+            if done:
+                break
+    finally:
+        writer.close()
+    return model
@@ -7,6 +7,7 @@ GENERAL_CONFIG = {
     'height_pixels': 700, # For plot window size (SIR demo needs more height)
     'animation_interval_ms': 200, 
     'random_seed': 42,      # For reproducibility of graph layouts and random choices
+    'cache_dir': '.graph_cache', # Generated graphs and layouts are cached here (relative to this directory); None disables
 }
 
 LT_MODEL_CONFIG = {
@@ -47,3 +48,100 @@ SIR_MODEL_CONFIG = {
     },
     'infection_prob': True # Marker for utils.draw_network to identify this model type (using a key that exists)
 }
+
+PARALLEL_CONFIG = {
+    'num_workers': 4,           # Worker processes (graph partitions) for parallel_propagation
+    'ordering': 'rcm',          # 'rcm' (reverse Cuthill-McKee, smaller partition cuts) or 'natural'
+    'benchmark_nodes': 200000,
+    'benchmark_m': 5,
+    'benchmark_workers': [1, 2, 4],
+    'benchmark_steps': 20,
+}
+
+COMPARTMENTAL_CONFIG = {
+    'model': 'SEIR',            # Any key of epidemic_model.compartmental.TRANSITION_TABLES
+    'num_nodes': 2000,
+    'barabasi_m': 3,
+    'num_initial_infected': 5,
+    'params': {
+        'infection_prob': 0.05,
+        'recovery_prob': 0.1,
+        'latency_prob': 0.3,    # E -> I per step (SEIR/SEIRS)
+        'waning_prob': 0.01,    # R -> S per step (SEIRS)
+    },
+    'max_simulation_steps': 300,
+    'validation_runs': 200,     # Replicates per model when comparing against SIRModel
+}
+
+TEMPORAL_CONFIG = {
+    'events_file': None,        # CSV of time,source,target,op[,weight]; None generates a synthetic contact stream
+    'directed': False,
+    'num_nodes': 2000,
+    'num_steps': 200,
+    'initial_edges': 4000,      # Contacts present at time 0 (synthetic stream)
+    'contacts_per_step': 400,   # New contacts per step (synthetic stream)
+    'mean_contact_duration': 10.0,
+    'infection_prob': 0.05,
+    'recovery_prob': 0.05,
+    'num_initial_infected': 5,
+    'lt_threshold': 0.2,
+    'num_initial_active': 20,
+}
+
+ANALYTIC_CONFIG = {
+    'num_nodes': 1000,
+    'barabasi_m': 3,
+    'infection_prob': 0.05,
+    'recovery_prob': 0.2,
+    'num_initial_infected': 5,
+    'max_simulation_steps': 300,
+    'lt_threshold_range': (0.01, 0.5),  # LinearThresholdModel's default random thresholds
+    'num_initial_active': 3,
+    'lt_max_steps': 50,
+    'ensemble_runs': 200,       # Simulated runs per model in analytic.benchmark
+}
+
+LAYOUT_CONFIG = {
+    'algorithm': 'auto',        # 'spring' (networkx), 'barnes_hut' (layout.py) or 'auto'
+    'auto_threshold': 1000,     # 'auto' switches to barnes_hut from this many nodes on
+    'iterations': 50,
+    'refine_iterations': 10,    # When starting from an existing layout
+    'theta': 0.8,               # Barnes-Hut opening angle; smaller is more accurate and slower
+}
+
+RENDER_CONFIG = {
+    'backend': 'TkAgg',         # matplotlib backend (avoids Qt issues) unless MPLBACKEND is set
+    'lod_node_threshold': 5000, # From this many nodes draw_network shows a state-density image instead of every node
+    'lod_bins': (200, 200),     # Density image resolution (x, y)
+    'lod_max_edges': 5000,      # Random sample of edges drawn under the density image (0 for none)
+}
+
+CALIBRATION_CONFIG = {
+    'observed_file': None,      # CSV with an 'infected' column, one row per step; None simulates one from true_params
+    'true_params': {'infection_prob': 0.15, 'recovery_prob': 0.05}, # Only used for the simulated observation
+    'bounds': {'infection_prob': (0.01, 0.5), 'recovery_prob': (0.01, 0.3)},
+    'replicates': 8,            # Runs per parameter point; the distance uses their mean infected curve
+    'num_workers': 4,           # Processes for the replicates that are not cached yet
+    'max_simulation_steps': 150,
+    'grid_points': 8,           # Values per parameter in the grid sweep
+    'lhs_points': 64,
+    'abc_particles': 64,
+    'abc_generations': 4,
+    'abc_quantile': 0.5,        # Each generation's tolerance is this quantile of the previous distances
+    'abc_max_batches': 10,      # Proposal batches per generation before giving up on filling the population
+}
+
+INTERVENTION_CONFIG = {
+    'num_nodes': 2000,
+    'barabasi_m': 2,
+    'params': {'infection_prob': 0.1, 'recovery_prob': 0.1},
+    'num_initial_infected': 5,
+    'replicates': 50,           # Shared by every strategy (same initial nodes and random numbers)
+    'max_simulation_steps': 300,
+    'strategies': ['random', 'degree', 'betweenness', 'pagerank', 'kcore', 'edge_degree'],
+    'budgets': [0.01, 0.05, 0.1], # Fraction of the nodes vaccinated (of the edges removed for edge_degree)
+    'centrality_params': {
+        'betweenness': {'samples': 200, 'seed': 42}, # Sampled sources; samples None computes it exactly
+        'pagerank': {'alpha': 0.85, 'tol': 1e-10, 'max_iter': 100},
+    },
+}
@@ -1,13 +1,12 @@
-import networkx as nx
-import random
 import time
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from matplotlib.gridspec import GridSpec
 
 from utils import setup_plot, draw_network, plot_sir_counts
+from graph_cache import generate_graph, cached_layout
 from sir_model import SIRModel
 from lt_model import LinearThresholdModel
+import shared_path # Puts ../shared on sys.path
+from rng import generator
+from plotting import pyplot, matplotlib_module
 from config import *
 
 WIDTH_PIXELS = GENERAL_CONFIG['width_pixels']
@@ -15,8 +14,8 @@ HEIGHT_PIXELS = GENERAL_CONFIG['height_pixels']
 
 def run_sir_model_demo():
     # graph = nx.erdos_renyi_graph(n=SIR_MODEL_CONFIG['num_nodes'], p=SIR_MODEL_CONFIG['connection_prob'], seed=GENERAL_CONFIG['random_seed'])
-    graph = nx.barabasi_albert_graph(n=SIR_MODEL_CONFIG['num_nodes'], m=SIR_MODEL_CONFIG['barabasi_m'], seed=GENERAL_CONFIG['random_seed'])
-    pos = nx.spring_layout(graph, seed=GENERAL_CONFIG['random_seed'])
+    graph = generate_graph('barabasi_albert_graph', n=SIR_MODEL_CONFIG['num_nodes'], m=SIR_MODEL_CONFIG['barabasi_m'], seed=GENERAL_CONFIG['random_seed'])
+    pos = cached_layout(graph, LAYOUT_CONFIG['algorithm'], seed=GENERAL_CONFIG['random_seed'])
 
     model = SIRModel(graph, 
                      infection_prob=SIR_MODEL_CONFIG['infection_prob'], 
@@ -27,12 +26,18 @@ def run_sir_model_demo():
 
     num_initial_infected = SIR_MODEL_CONFIG['num_initial_infected']
     if num_initial_infected > 0 and len(graph.nodes()) > 0:
-        initial_infected_nodes = random.sample(list(graph.nodes()), k=min(num_initial_infected, len(graph.nodes())))
+        nodes = list(graph.nodes())
+        # Seed nodes from a named stream (rng.py), so GENERAL_CONFIG['random_seed'] fixes the run
+        chosen = generator('demo.sir').choice(len(nodes), min(num_initial_infected, len(nodes)), replace=False)
+        initial_infected_nodes = [nodes[i] for i in chosen]
         model.set_initial_infected_nodes(initial_infected_nodes)
     else:
         initial_infected_nodes = [] # Should still call set_initial_infected_nodes to init counts
         model.set_initial_infected_nodes([])
 
+    plt, animation = pyplot(RENDER_CONFIG['backend']), matplotlib_module('animation')
+    GridSpec = matplotlib_module('gridspec').GridSpec
+
     fig = plt.figure(figsize=(WIDTH_PIXELS/100, HEIGHT_PIXELS/80)) # Adjusted figure size
     gs = GridSpec(2, 1, height_ratios=[3, 1]) # 2 rows, 1 column. Network gets 3/4, SIR plot 1/4
     ax_network = fig.add_subplot(gs[0])
@@ -78,10 +83,10 @@ def run_sir_model_demo():
     plt.show()
 
 def run_lt_model_demo():
-    graph = nx.barabasi_albert_graph(n=LT_MODEL_CONFIG['num_nodes'], m=LT_MODEL_CONFIG['barabasi_m'], seed=GENERAL_CONFIG['random_seed'])
-    graph = nx.DiGraph(graph) # Ensure it's directed for LT model's predecessor logic
+    graph = generate_graph('barabasi_albert_graph', n=LT_MODEL_CONFIG['num_nodes'], m=LT_MODEL_CONFIG['barabasi_m'], seed=GENERAL_CONFIG['random_seed'])
+    graph = graph.to_directed() # Ensure it's directed for LT model's predecessor logic
 
-    pos = nx.spring_layout(graph, seed=GENERAL_CONFIG['random_seed'])
+    pos = cached_layout(graph, LAYOUT_CONFIG['algorithm'], seed=GENERAL_CONFIG['random_seed'])
 
     thresholds = {node: LT_MODEL_CONFIG['default_threshold'] for node in graph.nodes()}
     # thresholds = {node: random.uniform(0.1, 0.4) for node in graph.nodes()} # Alternative: random thresholds
@@ -90,7 +95,9 @@ def run_lt_model_demo():
 
     num_initial_active = LT_MODEL_CONFIG['num_initial_active']
     if num_initial_active > 0 and len(graph.nodes()) > 0:
-        initial_active_nodes = random.sample(list(graph.nodes()), k=min(num_initial_active, len(graph.nodes())))
+        nodes = list(graph.nodes())
+        chosen = generator('demo.lt').choice(len(nodes), min(num_initial_active, len(nodes)), replace=False)
+        initial_active_nodes = [nodes[i] for i in chosen]
         model.set_initial_active_nodes(initial_active_nodes)
     else:
         initial_active_nodes = []
@@ -109,6 +116,9 @@ def run_lt_model_demo():
     simulation_step = 0
     max_steps = LT_MODEL_CONFIG['max_simulation_steps']
 
+    plt, animation = pyplot(RENDER_CONFIG['backend']), matplotlib_module('animation')
+    import networkx as nx
+
     fig, ax = setup_plot("5.2 Linear Threshold Model Demo", figsize=(WIDTH_PIXELS/100, HEIGHT_PIXELS/100))
     plt.subplots_adjust(left=0.05, right=0.95, top=0.9, bottom=0.05)
 
@@ -0,0 +1,195 @@
+'''
+Generalised compartmental contagion on networks.
+
+A model is a declarative transition table:
+    compartments: ordered labels, e.g. ['S', 'E', 'I', 'R']
+    spontaneous:  (source, target, probability parameter) - node-local, e.g. I -> R
+    induced:      (source, target, inducer, probability parameter) - caused by
+                  neighbours in the inducer compartment, e.g. S -> E by I
+
+Each step is evaluated synchronously from the state at its start, with the
+same rules as SIRModel.step: a node that leaves the inducer compartment this
+step does not transmit, and a susceptible node with k transmitting
+neighbours is converted with probability 1 - (1 - p)^k (independent trials
+per neighbour). Everything runs as array operations over a CSR adjacency;
+per-compartment counts are updated incrementally from the transitions.
+
+Interventions (vaccination, contact removal) are masks over the adjacency
+(see CompartmentalModel.remove), so the graph itself is never copied.
+'''
+import numpy as np
+
+TRANSITION_TABLES = {
+    'SI': {
+        'compartments': ['S', 'I'],
+        'spontaneous': [],
+        'induced': [('S', 'I', 'I', 'infection_prob')],
+    },
+    'SIS': {
+        'compartments': ['S', 'I'],
+        'spontaneous': [('I', 'S', 'recovery_prob')],
+        'induced': [('S', 'I', 'I', 'infection_prob')],
+    },
+    'SIR': {
+        'compartments': ['S', 'I', 'R'],
+        'spontaneous': [('I', 'R', 'recovery_prob')],
+        'induced': [('S', 'I', 'I', 'infection_prob')],
+    },
+    'SEIR': {
+        'compartments': ['S', 'E', 'I', 'R'],
+        'spontaneous': [('E', 'I', 'latency_prob'), ('I', 'R', 'recovery_prob')],
+        'induced': [('S', 'E', 'I', 'infection_prob')],
+    },
+    'SEIRS': {
+        'compartments': ['S', 'E', 'I', 'R'],
+        'spontaneous': [('E', 'I', 'latency_prob'), ('I', 'R', 'recovery_prob'), ('R', 'S', 'waning_prob')],
+        'induced': [('S', 'E', 'I', 'infection_prob')],
+    },
+}
+
+
+def graph_to_csr(graph, nodes):
+    """Neighbour CSR (in-neighbours for directed graphs) with rows in `nodes` order."""
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges()], dtype=np.int64).reshape(-1, 2)
+    if graph.is_directed():
+        src, dst = edges[:, 0], edges[:, 1]
+    else:
+        src = np.concatenate((edges[:, 0], edges[:, 1]))
+        dst = np.concatenate((edges[:, 1], edges[:, 0]))
+    order = np.argsort(dst, kind='stable')
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=len(nodes)), out=indptr[1:])
+    return indptr, src[order]
+
+
+class CompartmentalModel:
+    def __init__(self, graph, compartments, spontaneous, induced, params, seed=None, csr=None):
+        self.graph = graph
+        self.nodes = list(graph.nodes())
+        self.num_nodes = len(self.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.compartments = list(compartments)
+        self.code = {label: c for c, label in enumerate(self.compartments)}
+        self.params = dict(params)
+        self.rng = np.random.default_rng(seed)
+
+        missing = {t[-1] for t in list(spontaneous) + list(induced)} - set(self.params)
+        if missing:
+            raise KeyError(f"Missing transition parameters: {', '.join(sorted(missing))}")
+        self.spontaneous = [(self.code[s], self.code[t], p) for s, t, p in spontaneous]
+        self.induced = [(self.code[s], self.code[t], self.code[i], p) for s, t, i, p in induced]
+
+        # csr: graph_to_csr(graph, graph.nodes()) computed once and shared by many models of one graph
+        self.indptr, self.indices = csr if csr is not None else graph_to_csr(graph, self.nodes)
+        self.rows = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        self._all_slots = (self.rows, self.indices)
+        self.states = np.zeros(self.num_nodes, dtype=np.uint8) # Everyone starts in the first compartment
+
+        self.counts = np.zeros(len(self.compartments), dtype=np.int64)
+        self.counts[0] = self.num_nodes
+        self.history = {label: [int(n)] for label, n in zip(self.compartments, self.counts)}
+        self.timesteps = [0]
+
+    @classmethod
+    def from_table(cls, graph, table, params, seed=None, csr=None):
+        """Builds a model from a TRANSITION_TABLES name or a table dict."""
+        if isinstance(table, str):
+            table = TRANSITION_TABLES[table]
+        return cls(graph, table['compartments'], table['spontaneous'], table['induced'], params, seed, csr)
+
+    def remove(self, node_mask=None, edge_mask=None):
+        """
+        Drops contacts from the simulation: every edge of a node whose
+        node_mask entry is False, and every adjacency slot whose edge_mask
+        entry is False (slots are in self.indptr/self.indices order; mask both
+        directions of an undirected edge). Removed nodes keep their
+        compartment but neither infect nor get infected. Each call replaces
+        the previous masks; remove() restores every contact. The random
+        draws do not depend on the masks, so runs with the same seed and
+        different interventions share their random numbers.
+        """
+        rows, indices = self._all_slots
+        keep = np.ones(len(indices), dtype=bool) if edge_mask is None else np.array(edge_mask, dtype=bool)
+        if node_mask is not None:
+            node_mask = np.asarray(node_mask, dtype=bool)
+            keep &= node_mask[rows] & node_mask[indices]
+        self.rows, self.indices = rows[keep], indices[keep]
+
+    def set_initial(self, compartment, nodes):
+        """Moves the given nodes into compartment (before the first step)."""
+        code = self.code[compartment]
+        idx = np.array([self.index[node] for node in nodes], dtype=np.int64)
+        self.states[idx] = code
+        self.counts = np.bincount(self.states, minlength=len(self.compartments)).astype(np.int64)
+        for label, n in zip(self.compartments, self.counts):
+            self.history[label][-1] = int(n)
+
+    def step(self, current_time_step=None):
+        """Performs one synchronous step; returns {(source, target): count}."""
+        state = self.states
+        new_state = state.copy()
+        leaving = np.zeros(self.num_nodes, dtype=bool)
+
+        # Node-local transitions; competing transitions out of one compartment share a single draw
+        u = self.rng.random(self.num_nodes)
+        cumulative = {}
+        for source, target, param in self.spontaneous:
+            lower = cumulative.get(source, 0.0)
+            upper = lower + self.params[param]
+            cumulative[source] = upper
+            moving = (state == source) & (u >= lower) & (u < upper)
+            new_state[moving] = target
+            leaving |= moving
+
+        # Neighbour-induced transitions from the start-of-step state
+        for source, target, inducer, param in self.induced:
+            candidates = (state == source) & ~leaving
+            if not candidates.any():
+                continue
+            transmitting = (state == inducer) & ~leaving
+            slots = np.flatnonzero(transmitting[self.indices])
+            if len(slots) == 0:
+                continue
+            k = np.bincount(self.rows[slots], minlength=self.num_nodes)
+            p_convert = 1.0 - (1.0 - self.params[param]) ** k
+            moving = candidates & (k > 0) & (self.rng.random(self.num_nodes) < p_convert)
+            new_state[moving] = target
+            leaving |= moving
+
+        changed = np.flatnonzero(leaving)
+        transitions = {}
+        if len(changed):
+            num = len(self.compartments)
+            pair = state[changed].astype(np.int64) * num + new_state[changed]
+            pair_counts = np.bincount(pair, minlength=num * num)
+            for code in np.flatnonzero(pair_counts):
+                s, t = divmod(int(code), num)
+                transitions[(self.compartments[s], self.compartments[t])] = int(pair_counts[code])
+            self.counts -= np.bincount(state[changed], minlength=num)
+            self.counts += np.bincount(new_state[changed], minlength=num)
+        self.states = new_state
+
+        self.timesteps.append(current_time_step if current_time_step is not None else self.timesteps[-1] + 1)
+        for label, n in zip(self.compartments, self.counts):
+            self.history[label].append(int(n))
+        return transitions
+
+    def run(self, max_steps=100, stop_when_empty=None):
+        """
+        Runs up to max_steps steps; stops early once every compartment in
+        stop_when_empty (default: the inducers and the compartments that feed
+        them, e.g. E and I for SEIR) is empty.
+        """
+        inducers = {i for _, _, i, _ in self.induced}
+        feeders = {s for s, t, _ in self.spontaneous if t in inducers}
+        watch = stop_when_empty or [self.compartments[c] for c in sorted(inducers | feeders)]
+        watch_codes = [self.code[label] for label in watch]
+        for t in range(1, max_steps + 1):
+            self.step(t)
+            if all(self.counts[c] == 0 for c in watch_codes):
+                break
+        return self.history, self.timesteps
+
+    def get_current_states(self):
+        return dict(zip(self.nodes, (self.compartments[c] for c in self.states.tolist())))
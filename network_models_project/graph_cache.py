@@ -0,0 +1,157 @@
+'''
+On-disk cache for generated graphs and their layouts, so repeat launches
+skip the generator and (more importantly) the layout computation.
+
+Graphs are keyed by generator name, parameters, seed and the networkx
+version; layouts by a hash of the graph's nodes and edges, whether it is
+directed, the layout name, its parameters and seed, so a modified copy of a
+cached graph gets its own layout. Entries are small .npz files in
+GENERAL_CONFIG['cache_dir'] (relative paths are taken relative to this
+directory); set it to None to disable caching.
+
+A cached graph is rebuilt with the same node order and the same neighbour
+order as the generated one, so models iterate over it (and consume random
+numbers) exactly as they would over a freshly generated graph.
+'''
+import hashlib
+import json
+import os
+from collections import deque
+import numpy as np
+
+from config import GENERAL_CONFIG, LAYOUT_CONFIG
+
+
+def cache_dir():
+    path = GENERAL_CONFIG.get('cache_dir')
+    if not path:
+        return None
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def digest(payload):
+    '''Short content hash of a JSON-serialisable payload, for cache file names.'''
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:20]
+
+
+def save_npz(path, **arrays):
+    '''np.savez to path atomically (temporary file, then rename), so readers never see a partial entry.'''
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def _edge_insertion_order(graph):
+    """
+    Edges of an undirected graph in an order that, when added to an empty
+    graph, reproduces every node's neighbour order: a topological order of
+    the "comes before in some adjacency list" relation.
+    """
+    edge_ids = {}
+    edges = []
+    following = []
+    for u, nbrs in graph.adjacency():
+        previous = None
+        for v in nbrs:
+            key = (u, v) if (v, u) not in edge_ids else (v, u)
+            if key not in edge_ids:
+                edge_ids[key] = len(edges)
+                edges.append(key)
+                following.append([])
+            e = edge_ids[key]
+            if previous is not None:
+                following[previous].append(e)
+            previous = e
+    pending = [0] * len(edges)
+    for successors in following:
+        for e in successors:
+            pending[e] += 1
+    ready = deque(e for e in range(len(edges)) if pending[e] == 0)
+    order = []
+    while ready:
+        e = ready.popleft()
+        order.append(edges[e])
+        for f in following[e]:
+            pending[f] -= 1
+            if pending[f] == 0:
+                ready.append(f)
+    if len(order) < len(edges): # Edges were removed and re-added; neighbour order cannot be fully kept
+        placed = set(order)
+        order.extend(edge for edge in edges if edge not in placed)
+    return order
+
+
+def generate_graph(generator, seed=None, **params):
+    """
+    networkx.<generator>(**params, seed=seed), loaded from the cache when the
+    same call was made before.
+    """
+    import networkx as nx
+
+    key = digest({'generator': generator, 'params': params, 'seed': seed, 'networkx': nx.__version__})
+    directory = cache_dir()
+    path = os.path.join(directory, f'graph-{key}.npz') if directory else None
+    if path and os.path.exists(path):
+        data = np.load(path)
+        graph = nx.DiGraph() if bool(data['directed']) else nx.Graph()
+        graph.add_nodes_from(data['nodes'].tolist())
+        graph.add_edges_from(map(tuple, data['edges'].tolist()))
+    else:
+        graph = getattr(nx, generator)(seed=seed, **params)
+        if path:
+            directed = graph.is_directed()
+            edges = list(graph.edges()) if directed else _edge_insertion_order(graph)
+            save_npz(path, nodes=np.array(list(graph.nodes())), edges=np.array(edges, dtype=np.int64).reshape(-1, 2),
+                     directed=np.array(directed))
+    return graph
+
+
+def graph_fingerprint(graph):
+    '''Content hash of the node and edge lists; cheap next to any layout computation.'''
+    h = hashlib.sha1()
+    h.update(repr(list(graph.nodes())).encode('utf-8'))
+    h.update(repr(list(graph.edges())).encode('utf-8'))
+    return h.hexdigest()[:20]
+
+
+def resolve_layout(graph, layout):
+    """'auto' picks spring_layout for small graphs and the Barnes-Hut layout for large ones."""
+    if layout == 'auto':
+        return 'barnes_hut' if graph.number_of_nodes() >= LAYOUT_CONFIG['auto_threshold'] else 'spring'
+    return layout
+
+
+def compute_layout(graph, layout, seed=None, initial_pos=None, **params):
+    """Dispatches to the layout implementations; 'spring' is networkx's spring_layout."""
+    layout = resolve_layout(graph, layout)
+    if layout == 'spring':
+        import networkx as nx
+        return nx.spring_layout(graph, pos=initial_pos, seed=seed, **params)
+    if layout == 'barnes_hut':
+        from layout import barnes_hut_layout
+        return barnes_hut_layout(graph, pos=initial_pos, seed=seed, **params)
+    raise ValueError(f"Unknown layout {layout!r}")
+
+
+def cached_layout(graph, layout='spring', seed=None, initial_pos=None, **params):
+    """
+    Node positions {node: array([x, y])} for graph, computed once per
+    graph/layout/seed. initial_pos (e.g. the layout of the graph before it
+    changed) is only used when the layout has to be computed.
+    """
+    layout = resolve_layout(graph, layout)
+    key = digest({'graph': graph_fingerprint(graph), 'directed': graph.is_directed(), 'layout': layout, 'params': params,
+                   'seed': seed})
+    directory = cache_dir()
+    path = os.path.join(directory, f'layout-{key}.npz') if directory else None
+    if path and os.path.exists(path):
+        data = np.load(path)
+        return dict(zip(data['nodes'].tolist(), data['positions']))
+    pos = compute_layout(graph, layout, seed=seed, initial_pos=initial_pos, **params)
+    if path:
+        nodes = list(pos)
+        save_npz(path, nodes=np.array(nodes), positions=np.array([pos[node] for node in nodes], dtype=float))
+    return pos
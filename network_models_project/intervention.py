@@ -0,0 +1,260 @@
+'''
+Targeted interventions against SIR outbreaks: vaccinate (remove) the top-k
+nodes by degree, betweenness, PageRank or k-core number, or cut the contacts
+with the highest degree product, before the outbreak starts.
+
+Centralities are computed once per graph and kept in memory and in the graph
+cache (GENERAL_CONFIG['cache_dir']), keyed by the graph's content and the
+centrality's parameters. Betweenness can be estimated from a sample of
+source nodes; PageRank is a power iteration over the CSR adjacency.
+
+Interventions are masks over the adjacency (CompartmentalModel.remove), so no
+graph is copied. Every strategy is evaluated on the same Monte-Carlo
+replicates: replicate r always starts from the same infected nodes and uses
+the same random numbers, so differences between strategies are not noise
+from different outbreaks. A vaccinated initial node starts immune instead.
+'''
+import os
+import time
+import numpy as np
+
+from config import GENERAL_CONFIG, INTERVENTION_CONFIG
+from epidemic_model.compartmental import CompartmentalModel, graph_to_csr
+from graph_cache import cache_dir, generate_graph, digest, graph_fingerprint, save_npz
+
+CENTRALITIES = ('degree', 'betweenness', 'pagerank', 'kcore')
+EDGE_STRATEGIES = ('edge_degree',)
+
+_centralities = {} # cache key -> values in graph.nodes() order
+
+
+def pagerank_csr(indptr, indices, out_degree, alpha=0.85, tol=1e-10, max_iter=100):
+    """
+    PageRank by power iteration over an in-neighbour CSR (rows in node
+    order). Dangling nodes spread their rank uniformly, as in networkx.
+    """
+    n = len(indptr) - 1
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    dangling = out_degree == 0
+    inv_degree = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        share = x * inv_degree
+        new = alpha * np.bincount(rows, weights=share[indices], minlength=n)
+        new += (alpha * x[dangling].sum() + 1.0 - alpha) / n
+        if np.abs(new - x).sum() < n * tol:
+            return new
+        x = new
+    return x
+
+
+def compute_centrality(graph, name, csr=None, **params):
+    """
+    One centrality as an array in graph.nodes() order:
+        degree
+        betweenness  samples=k estimates it from k random sources (None: exact), seed
+        pagerank     alpha, tol, max_iter
+        kcore        core number
+    """
+    import networkx as nx
+
+    nodes = list(graph.nodes())
+    if name in ('degree', 'pagerank'):
+        indptr, indices = csr if csr is not None else graph_to_csr(graph, nodes)
+        in_degree = np.diff(indptr)
+        out_degree = np.bincount(indices, minlength=len(nodes)) if graph.is_directed() else in_degree
+        if name == 'degree':
+            return out_degree.astype(float)
+        return pagerank_csr(indptr, indices, out_degree, **params)
+    if name == 'betweenness':
+        samples = params.get('samples')
+        k = samples if samples is not None and samples < len(nodes) else None
+        values = nx.betweenness_centrality(graph, k=k, seed=params.get('seed'))
+    elif name == 'kcore':
+        values = nx.core_number(graph)
+    else:
+        raise ValueError(f"Unknown centrality {name!r}")
+    return np.array([values[node] for node in nodes], dtype=float)
+
+
+def cached_centrality(graph, name, csr=None, **params):
+    """compute_centrality, computed once per graph content, centrality and parameters."""
+    key = digest({'graph': graph_fingerprint(graph), 'directed': graph.is_directed(), 'centrality': name,
+                  'params': params})
+    values = _centralities.get(key)
+    if values is not None:
+        return values
+    directory = cache_dir()
+    path = os.path.join(directory, f'centrality-{key}.npz') if directory else None
+    if path and os.path.exists(path):
+        values = np.load(path)['values']
+    else:
+        values = compute_centrality(graph, name, csr=csr, **params)
+        if path:
+            save_npz(path, values=values)
+    _centralities[key] = values
+    return values
+
+
+class InterventionPlanner:
+    def __init__(self, graph, params=None, num_initial_infected=None, replicates=None, seed=None, max_steps=None):
+        cfg = INTERVENTION_CONFIG
+        self.graph = graph
+        self.nodes = list(graph.nodes())
+        self.num_nodes = len(self.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.params = dict(params or cfg['params'])
+        self.replicates = replicates or cfg['replicates']
+        self.seed = GENERAL_CONFIG['random_seed'] if seed is None else seed
+        self.max_steps = max_steps or cfg['max_simulation_steps']
+
+        self.csr = graph_to_csr(graph, self.nodes)
+        self.rows = np.repeat(np.arange(self.num_nodes), np.diff(self.csr[0]))
+        self.degree = self.centrality('degree')
+        k = num_initial_infected or cfg['num_initial_infected']
+        # Replicate r: initial infected from spawn_key (r, 1), the outbreak itself from (r, 0)
+        self.initial = [np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(r, 1)))
+                        .choice(self.num_nodes, k, replace=False) for r in range(self.replicates)]
+        self._rankings = {}
+
+    def centrality(self, name):
+        return cached_centrality(self.graph, name, csr=self.csr, **INTERVENTION_CONFIG['centrality_params'].get(name, {}))
+
+    def ranking(self, strategy):
+        """Node indices from most to least central (ties broken by degree); 'random' is a seeded shuffle."""
+        order = self._rankings.get(strategy)
+        if order is None:
+            if strategy == 'random':
+                rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(0x5EED,)))
+                order = rng.permutation(self.num_nodes)
+            else:
+                order = np.lexsort((-self.degree, -self.centrality(strategy)))
+            self._rankings[strategy] = order
+        return order
+
+    def node_mask(self, removed):
+        """False for the removed nodes (graph nodes)."""
+        mask = np.ones(self.num_nodes, dtype=bool)
+        mask[[self.index[node] for node in removed]] = False
+        return mask
+
+    def edge_mask(self, removed):
+        """False for both adjacency slots of every removed (u, v) edge."""
+        n = self.num_nodes
+        pairs = np.array([(self.index[u], self.index[v]) for u, v in removed], dtype=np.int64).reshape(-1, 2)
+        keys = pairs[:, 1] * n + pairs[:, 0] # CSR slots are (row, in-neighbour)
+        if not self.graph.is_directed():
+            keys = np.concatenate((keys, pairs[:, 0] * n + pairs[:, 1]))
+        return ~np.isin(self.rows * n + self.csr[1], keys)
+
+    def masks(self, strategy, budget):
+        """(node_mask, edge_mask) removing a budget fraction of the nodes (or, for edge strategies, edges)."""
+        if strategy in EDGE_STRATEGIES:
+            indices = self.csr[1]
+            # Each undirected edge once (row > in-neighbour), scored by the product of its end degrees
+            slots = np.flatnonzero(self.rows > indices) if not self.graph.is_directed() else np.arange(len(indices))
+            k = int(round(budget * len(slots)))
+            score = self.degree[self.rows[slots]] * self.degree[indices[slots]]
+            top = slots[np.argsort(-score, kind='stable')[:k]]
+            removed = [(self.nodes[indices[s]], self.nodes[self.rows[s]]) for s in top]
+            return None, self.edge_mask(removed)
+        k = int(round(budget * self.num_nodes))
+        mask = np.ones(self.num_nodes, dtype=bool)
+        mask[self.ranking(strategy)[:k]] = False
+        return mask, None
+
+    def run(self, node_mask=None, edge_mask=None):
+        """Final outbreak size and peak prevalence (fractions of all nodes) of every replicate."""
+        final_size = np.empty(self.replicates)
+        peak = np.empty(self.replicates)
+        for r, initial in enumerate(self.initial):
+            model = CompartmentalModel.from_table(self.graph, 'SIR', self.params, csr=self.csr,
+                                                  seed=np.random.SeedSequence(self.seed, spawn_key=(r, 0)))
+            model.remove(node_mask, edge_mask)
+            if node_mask is not None:
+                initial = initial[node_mask[initial]]
+            model.set_initial('I', [self.nodes[i] for i in initial])
+            model.run(self.max_steps)
+            final_size[r] = (model.counts[model.code['I']] + model.counts[model.code['R']]) / self.num_nodes
+            peak[r] = max(model.history['I']) / self.num_nodes
+        return {'final_size': final_size, 'peak': peak}
+
+    def evaluate(self, strategies=None, budgets=None):
+        """
+        {(strategy, budget): run()} for every combination, plus
+        ('none', 0.0) for the outbreak without intervention.
+        """
+        cfg = INTERVENTION_CONFIG
+        results = {('none', 0.0): self.run()}
+        for strategy in strategies or cfg['strategies']:
+            for budget in budgets or cfg['budgets']:
+                results[(strategy, budget)] = self.run(*self.masks(strategy, budget))
+        return results
+
+
+def benchmark(cfg=None):
+    """
+    Centrality computation vs. cached lookup, masks vs. graph copies, and a
+    comparison of the strategies on shared replicates.
+    """
+    import networkx as nx
+
+    cfg = cfg or INTERVENTION_CONFIG
+    seed = GENERAL_CONFIG['random_seed']
+    graph = generate_graph('barabasi_albert_graph', n=cfg['num_nodes'], m=cfg['barabasi_m'], seed=seed)
+    print(f"Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+
+    _centralities.clear()
+    start = time.perf_counter()
+    planner = InterventionPlanner(graph)
+    for name in CENTRALITIES:
+        planner.centrality(name)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for name in CENTRALITIES:
+        planner.centrality(name)
+    print(f"Centralities: {first:.2f}s first time (or from disk), {(time.perf_counter() - start) * 1e3:.2f} ms cached")
+
+    samples = cfg['centrality_params'].get('betweenness', {}).get('samples')
+    if samples:
+        start = time.perf_counter()
+        exact = compute_centrality(graph, 'betweenness')
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        approx = compute_centrality(graph, 'betweenness', samples=samples, seed=seed)
+        approx_time = time.perf_counter() - start
+        k = int(cfg['budgets'][-1] * len(exact))
+        overlap = len(set(np.argsort(-exact)[:k]) & set(np.argsort(-approx)[:k])) / k
+        print(f"Betweenness: exact {exact_time:.2f}s, {samples} samples {approx_time:.2f}s, "
+              f"top-{k} overlap {overlap:.0%}")
+
+    removed = [planner.nodes[i] for i in planner.ranking('degree')[:int(cfg['budgets'][-1] * planner.num_nodes)]]
+    start = time.perf_counter()
+    copy = graph.copy()
+    copy.remove_edges_from(list(graph.edges(removed)))
+    graph_to_csr(copy, list(copy.nodes()))
+    copy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    model = CompartmentalModel.from_table(graph, 'SIR', planner.params, csr=planner.csr)
+    model.remove(planner.node_mask(removed))
+    mask_time = time.perf_counter() - start
+    print(f"Removing {len(removed)} nodes: graph copy + CSR {copy_time * 1e3:.1f} ms, mask {mask_time * 1e3:.1f} ms")
+
+    start = time.perf_counter()
+    results = planner.evaluate()
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} interventions x {planner.replicates} shared replicates in {elapsed:.2f}s")
+    baseline = results[('none', 0.0)]['final_size']
+    print(f"{'strategy':<12} {'budget':>6} {'final size':>16} {'vs none':>16} {'peak':>7}")
+    for (strategy, budget), outcome in results.items():
+        size = outcome['final_size']
+        # Shared replicates: the paired difference has a much smaller standard error than either mean
+        diff = size - baseline
+        se = lambda x: x.std() / np.sqrt(len(x))
+        print(f"{strategy:<12} {budget:>6.0%} {size.mean():>8.1%} +- {se(size):>5.1%} "
+              f"{diff.mean():>+8.1%} +- {se(diff):>5.1%} {outcome['peak'].mean():>7.1%}")
+    return results
+
+
+if __name__ == '__main__':
+    benchmark()
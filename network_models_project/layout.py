@@ -0,0 +1,186 @@
+'''
+Barnes-Hut force-directed layout for large graphs.
+
+Forces are those of networkx's spring_layout (Fruchterman-Reingold):
+repulsion k^2 / d between every pair of nodes, attraction d^2 / k along
+edges, with a temperature that caps the displacement per iteration and
+cools linearly. Instead of the O(n^2) pairwise repulsion, nodes are
+bucketed into a quadtree (Morton codes, one level of cells per bit pair)
+and a cell whose size is below theta times its distance to a node acts on
+it as a single mass at its centre of mass. The tree walk is vectorised: all
+(node, cell) pairs of one level are tested at once and the open cells are
+expanded into their children for the next level.
+
+barnes_hut_layout returns {node: array([x, y])} scaled to [-1, 1] like
+spring_layout, so it can be passed to draw_network directly. Given an
+existing layout (e.g. a cached one for an earlier version of the graph) it
+starts from those positions at a low temperature and only refines them;
+new nodes start next to their placed neighbours.
+'''
+import numpy as np
+
+from config import LAYOUT_CONFIG
+
+MAX_DEPTH = 15
+
+
+def _morton(ix, iy, depth):
+    '''Interleaves the bits of the cell coordinates: x in even bits, y in odd bits.'''
+    code = np.zeros_like(ix)
+    for b in range(depth):
+        code |= ((ix >> b) & 1) << (2 * b)
+        code |= ((iy >> b) & 1) << (2 * b + 1)
+    return code
+
+
+def _expand_ranges(starts, lengths):
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+def build_quadtree(pos, depth):
+    """
+    Per level l = 0..depth: (cell codes, mass, centre of mass, cell of every
+    node, first child and number of children in level l + 1) for the
+    non-empty cells of side span / 2^l. Also returns span.
+    """
+    lo = pos.min(axis=0)
+    span = max(float((pos.max(axis=0) - lo).max()), 1e-12) * (1 + 1e-9)
+    side = 1 << depth
+    cells = np.minimum(((pos - lo) / span * side).astype(np.int64), side - 1)
+    code = _morton(cells[:, 0], cells[:, 1], depth)
+    levels = []
+    for level in range(depth + 1):
+        uniq, inverse = np.unique(code >> (2 * (depth - level)), return_inverse=True)
+        inverse = inverse.reshape(-1)
+        mass = np.bincount(inverse).astype(float)
+        com = np.stack((np.bincount(inverse, weights=pos[:, 0]),
+                        np.bincount(inverse, weights=pos[:, 1])), axis=1) / mass[:, None]
+        levels.append([uniq, mass, com, inverse, None, None])
+    for level in range(depth):
+        uniq, next_uniq = levels[level][0], levels[level + 1][0]
+        first = np.searchsorted(next_uniq, uniq << 2)
+        levels[level][4] = first
+        levels[level][5] = np.searchsorted(next_uniq, (uniq + 1) << 2) - first
+    return levels, span
+
+
+def repulsion(pos, k, theta=0.8, depth=None):
+    """Approximate sum over all other nodes of k^2 (p_i - p_j) / |p_i - p_j|^2."""
+    n = len(pos)
+    force = np.zeros((n, 2))
+    if n < 2:
+        return force
+    depth = depth or min(MAX_DEPTH, int(np.ceil(np.log(n) / np.log(4))) + 2)
+    levels, span = build_quadtree(pos, depth)
+    min_dist2 = (0.01 * k) ** 2 # Keeps nearly coincident nodes from blowing up
+
+    def accumulate(points, delta, weight):
+        dist2 = np.maximum(np.einsum('ij,ij->i', delta, delta), min_dist2)
+        f = delta * (k * k * weight / dist2)[:, None]
+        force[:, 0] += np.bincount(points, weights=f[:, 0], minlength=n)
+        force[:, 1] += np.bincount(points, weights=f[:, 1], minlength=n)
+
+    points = np.arange(n)
+    cells = np.zeros(n, dtype=np.int64)
+    for level, (uniq, mass, com, inverse, first_child, num_children) in enumerate(levels):
+        own = inverse[points] == cells
+        if level == depth:
+            # Deepest cells: everything but the node itself, as one mass
+            m = mass[cells] - own
+            c = np.where(own[:, None], (com[cells] * mass[cells][:, None] - pos[points]) / np.maximum(m, 1)[:, None],
+                         com[cells])
+            keep = m > 0
+            accumulate(points[keep], pos[points[keep]] - c[keep], m[keep])
+            break
+        delta = pos[points] - com[cells]
+        size = span / (1 << level)
+        accept = ~own & (size * size < theta * theta * np.einsum('ij,ij->i', delta, delta))
+        accumulate(points[accept], delta[accept], mass[cells[accept]])
+
+        points, cells = points[~accept], cells[~accept]
+        count = num_children[cells]
+        points = np.repeat(points, count)
+        cells = _expand_ranges(first_child[cells], count)
+    return force
+
+
+def _initial_positions(nodes, index, indptr, neighbors, pos, rng):
+    '''Known nodes keep their position; new ones start near the mean of their placed neighbours.'''
+    n = len(nodes)
+    xy = rng.random((n, 2))
+    if pos is None:
+        return xy, False
+    placed = np.zeros(n, dtype=bool)
+    for node, p in pos.items():
+        i = index.get(node)
+        if i is not None:
+            xy[i] = p
+            placed[i] = True
+    if placed.any():
+        lo = xy[placed].min(axis=0)
+        span = max(float((xy[placed].max(axis=0) - lo).max()), 1e-12)
+        xy[placed] = (xy[placed] - lo) / span # Into the unit box the forces are scaled for
+        jitter = 0.01 / np.sqrt(n)
+        for i in np.flatnonzero(~placed):
+            nbrs = neighbors[indptr[i]:indptr[i + 1]]
+            nbrs = nbrs[placed[nbrs]]
+            if len(nbrs):
+                xy[i] = xy[nbrs].mean(axis=0) + rng.normal(0.0, jitter, 2)
+    return xy, bool(placed.any())
+
+
+def barnes_hut_layout(graph, pos=None, iterations=None, seed=None, theta=None, k=None, temperature=None, scale=1.0):
+    """
+    Force-directed layout {node: array([x, y])}. pos (optional) seeds the
+    layout with known positions, which are then only refined: the starting
+    temperature drops from 0.1 to 0.01 of the layout size.
+    """
+    cfg = LAYOUT_CONFIG
+    theta = cfg['theta'] if theta is None else theta
+    rng = np.random.default_rng(seed)
+    nodes = list(graph.nodes())
+    n = len(nodes)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: np.zeros(2)}
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(index[u], index[v]) for u, v in graph.edges() if u != v], dtype=np.int64).reshape(-1, 2)
+    both = np.concatenate((edges, edges[:, ::-1]))
+    order = np.argsort(both[:, 0], kind='stable')
+    neighbors = both[order, 1]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(both[:, 0], minlength=n))))
+
+    xy, refining = _initial_positions(nodes, index, indptr, neighbors, pos, rng)
+    if iterations is None:
+        iterations = cfg['refine_iterations'] if refining else cfg['iterations']
+    k = k or 1.0 / np.sqrt(n)
+    t = temperature or (0.01 if refining else 0.1)
+    dt = t / (iterations + 1)
+    src, dst = edges[:, 0], edges[:, 1]
+
+    for _ in range(iterations):
+        force = repulsion(xy, k, theta)
+        delta = xy[src] - xy[dst]
+        dist = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        pull = delta * (dist / k)[:, None] # Magnitude d^2 / k along the edge
+        for axis in range(2):
+            force[:, axis] -= np.bincount(src, weights=pull[:, axis], minlength=n)
+            force[:, axis] += np.bincount(dst, weights=pull[:, axis], minlength=n)
+        length = np.sqrt(np.einsum('ij,ij->i', force, force))
+        step = np.minimum(length, t) / np.where(length > 0, length, 1.0)
+        xy += force * step[:, None]
+        t -= dt
+
+    xy -= xy.mean(axis=0)
+    extent = np.abs(xy).max()
+    if extent > 0:
+        xy *= scale / extent
+    return dict(zip(nodes, xy))
+
+
+def refine_layout(graph, pos, iterations=None, seed=None):
+    """A few low-temperature iterations from an existing layout, e.g. after the graph changed."""
+    return barnes_hut_layout(graph, pos=pos, iterations=iterations, seed=seed)
@@ -1,20 +1,28 @@
-import random
+import numpy as np
+
+import shared_path # Puts ../shared on sys.path
+from rng import instance_draws
+from active_set import ActiveSet
 
 class LinearThresholdModel:
-    def __init__(self, graph, thresholds=None):
+    def __init__(self, graph, thresholds=None, rng=None):
         self.graph = graph.copy() # Work on a copy
         self.nodes = list(self.graph.nodes())
         self.num_nodes = len(self.nodes)
 
         # Initialize states: 0 for inactive, 1 for active
         self.states = {node: 0 for node in self.nodes}
+        # Nodes whose influence may have reached their threshold: the first step checks every node, later
+        # ones only the inactive nodes with an in-neighbour activated since they were last checked
+        self.frontier = ActiveSet(self.nodes, self.nodes)
 
         # Initialize thresholds
         if thresholds:
             self.thresholds = thresholds
         else:
-            # Assign random thresholds between 0 and 1 if not provided
-            self.thresholds = {node: random.uniform(0.01, 0.5) for node in self.nodes}
+            # Assign random thresholds between 0 and 1 if not provided, from this model's stream (rng.py)
+            rng = rng if rng is not None else instance_draws(type(self).__name__)
+            self.thresholds = dict(zip(self.nodes, rng.uniform(0.01, 0.5, self.num_nodes).tolist()))
 
         # Initialize influence weights (typically 1/in-degree for unweighted graphs)
         # For simplicity, let's assume unweighted influence from neighbors
@@ -54,6 +62,7 @@ class LinearThresholdModel:
         for node in initial_active_nodes:
             if node in self.states:
                 self.states[node] = 1
+                self.frontier.wake_many(self.graph.successors(node))
             else:
                 print(f"Warning: Node {node} not in graph, cannot activate.")
 
@@ -63,7 +72,9 @@ class LinearThresholdModel:
         # Nodes that will be activated in this step, to avoid cascading effect within one step
         to_activate_in_this_step = []
 
-        for node in self.nodes:
+        candidates = self.frontier.members()
+        self.frontier.reset()
+        for node in candidates:
             if self.states[node] == 1:  # Already active
                 continue
 
@@ -80,6 +91,7 @@ class LinearThresholdModel:
             if self.states[node] == 0: # Ensure it wasn't activated by another path in a more complex step logic
                 self.states[node] = 1
                 newly_activated_count += 1
+                self.frontier.wake_many(self.graph.successors(node))
         
         return newly_activated_count
 
@@ -93,5 +105,25 @@ class LinearThresholdModel:
                 break
         return history
 
+    def set_thresholds(self, thresholds):
+        """Replaces the thresholds; every inactive node is checked again on the next step."""
+        self.thresholds = thresholds
+        self.frontier.wake_all()
+
     def get_active_nodes(self):
         return [node for node, state in self.states.items() if state == 1]
+
+    def get_state(self):
+        """(scalars, arrays) describing the full model state, for checkpoint.py."""
+        arrays = {
+            'states': np.fromiter((self.states[node] for node in self.nodes), dtype=np.uint8, count=self.num_nodes),
+            'thresholds': np.fromiter((self.thresholds[node] for node in self.nodes), dtype=np.float64, count=self.num_nodes),
+        }
+        return {'num_nodes': self.num_nodes}, arrays
+
+    def set_state(self, scalars, arrays):
+        if scalars['num_nodes'] != self.num_nodes:
+            raise ValueError(f"State has {scalars['num_nodes']} nodes, model has {self.num_nodes}")
+        self.states = dict(zip(self.nodes, arrays['states'].tolist()))
+        self.thresholds = dict(zip(self.nodes, arrays['thresholds'].tolist()))
+        self.frontier = ActiveSet(self.nodes, self.nodes)
@@ -0,0 +1,446 @@
+'''
+Graph-partitioned parallel propagation for the SIR and Linear Threshold models.
+
+The graph is stored once in CSR form (in-neighbours per node) in shared
+memory and split into contiguous, degree-balanced vertex ranges, one worker
+process per range. Node states live in two shared uint8 buffers: a step reads
+the current buffer and each worker writes only its own range of the next
+one, so the only cross-partition traffic is reading neighbour states across
+the cut.
+
+Random numbers come from counter-based Philox streams keyed by
+(seed, stream, step, block of nodes or edges). Every draw therefore depends
+only on what it decides, not on which worker made it, and trajectories are
+identical for any number of workers.
+
+ParallelSIRModel and ParallelLinearThresholdModel keep the step/run API of
+SIRModel and LinearThresholdModel.
+'''
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+import networkx as nx
+
+from sir_model import SIRModel
+from lt_model import LinearThresholdModel
+import shared_path # Puts ../shared on sys.path
+from rng import instance_draws, service
+from config import GENERAL_CONFIG, PARALLEL_CONFIG
+
+SUSCEPTIBLE, INFECTED, RECOVERED = 0, 1, 2
+INACTIVE, ACTIVE = 0, 1
+
+STREAM_RECOVERY = 1
+STREAM_INFECTION = 2
+DRAW_BLOCK = 1 << 16
+
+
+def _uniform_draws(key, stream, step, start, stop):
+    '''Uniform draws for items [start, stop) of a stream at a step, independent of partitioning.'''
+    if stop <= start:
+        return np.empty(0)
+    first, last = start // DRAW_BLOCK, (stop - 1) // DRAW_BLOCK
+    blocks = [np.random.Generator(np.random.Philox(key=key, counter=[0, stream, step, b])).random(DRAW_BLOCK)
+              for b in range(first, last + 1)]
+    draws = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+    offset = start - first * DRAW_BLOCK
+    return draws[offset:offset + (stop - start)]
+
+
+def build_in_csr(graph, order):
+    """
+    CSR of in-neighbours (predecessors for directed graphs, neighbours
+    otherwise) with rows in the given node order. Returns indptr, indices.
+    """
+    index = {node: i for i, node in enumerate(order)}
+    in_neighbors = graph.predecessors if graph.is_directed() else graph.neighbors
+    degrees = np.fromiter((graph.in_degree(n) if graph.is_directed() else graph.degree(n) for n in order),
+                          dtype=np.int64, count=len(order))
+    indptr = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter((index[nbr] for node in order for nbr in in_neighbors(node)),
+                          dtype=np.int64, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def node_order(graph, ordering):
+    '''Node order for the CSR rows; RCM keeps neighbours in nearby rows and so shrinks the partition cut.'''
+    if ordering == 'rcm':
+        undirected = graph.to_undirected(as_view=True) if graph.is_directed() else graph
+        return list(nx.utils.reverse_cuthill_mckee_ordering(undirected))
+    return list(graph.nodes())
+
+
+def degree_balanced_ranges(indptr, num_parts):
+    """Splits rows into contiguous ranges with roughly equal (degree + 1) work."""
+    n = len(indptr) - 1
+    work = indptr[1:] + np.arange(1, n + 1) # cumulative edges + nodes
+    targets = work[-1] * np.arange(1, num_parts) / num_parts if n else []
+    cuts = np.searchsorted(work, targets) if n else np.zeros(num_parts - 1, dtype=int)
+    bounds = np.concatenate(([0], cuts, [n]))
+    return [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def sir_step(step, lo, hi, rows, indptr, indices, cur, nxt, infection_prob, recovery_prob, key, barrier=None):
+    '''One SIR step for rows [lo, hi). Returns (newly infected, newly recovered).'''
+    own = cur[lo:hi]
+    nxt[lo:hi] = own
+    infected = np.flatnonzero(own == INFECTED)
+    recovering = infected[_uniform_draws(key, STREAM_RECOVERY, step, lo, hi)[infected] < recovery_prob] + lo
+    nxt[recovering] = RECOVERED
+    if barrier is not None:
+        barrier.wait() # Every partition's recoveries are visible before anyone infects
+
+    s_lo, s_hi = int(indptr[lo]), int(indptr[hi])
+    src = indices[s_lo:s_hi]
+    # Infected neighbours that recover this step do not infect (as in SIRModel.step)
+    spreading = (cur[src] == INFECTED) & (nxt[src] != RECOVERED)
+    newly_infected = 0
+    if spreading.any():
+        hits = spreading & (_uniform_draws(key, STREAM_INFECTION, step, s_lo, s_hi) < infection_prob)
+        targets = np.unique(rows[hits])
+        targets = targets[cur[targets] == SUSCEPTIBLE]
+        nxt[targets] = INFECTED
+        newly_infected = len(targets)
+    return newly_infected, len(recovering)
+
+
+def lt_step(lo, hi, rows, indptr, indices, weights, thresholds, cur, nxt):
+    '''One LT step for rows [lo, hi). Returns the number of newly activated nodes.'''
+    own = cur[lo:hi]
+    own_next = nxt[lo:hi]
+    own_next[:] = own
+    s_lo, s_hi = int(indptr[lo]), int(indptr[hi])
+    active_in = cur[indices[s_lo:s_hi]] == ACTIVE
+    influence = np.bincount(rows - lo, weights=weights[s_lo:s_hi] * active_in, minlength=hi - lo)
+    newly = (own == INACTIVE) & (influence >= thresholds[lo:hi])
+    own_next[newly] = ACTIVE
+    return int(np.count_nonzero(newly))
+
+
+class _Shared:
+    def __init__(self, array=None, spec=None):
+        if spec is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)
+            self.array[...] = array
+        else:
+            shape, dtype, name = spec
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        self.spec = (self.array.shape, self.array.dtype.str, self.shm.name)
+
+
+def _partition_worker(kind, lo, hi, params, specs, barrier, conn):
+    arrays = {name: _Shared(spec=spec) for name, spec in specs.items()}
+    indptr, indices, states = arrays['indptr'].array, arrays['indices'].array, arrays['states'].array
+    rows = np.repeat(np.arange(lo, hi), np.diff(indptr[lo:hi + 1]))
+    while True:
+        command, step, parity = conn.recv()
+        if command == 'stop':
+            break
+        cur, nxt = states[parity], states[1 - parity]
+        if kind == 'sir':
+            result = sir_step(step, lo, hi, rows, indptr, indices, cur, nxt,
+                              params['infection_prob'], params['recovery_prob'], params['key'], barrier)
+        else:
+            result = lt_step(lo, hi, rows, indptr, indices, arrays['weights'].array, arrays['thresholds'].array,
+                             cur, nxt)
+        conn.send(result)
+    conn.close()
+
+
+class PartitionedEngine:
+    '''Owns the shared arrays and worker processes for one model.'''
+    def __init__(self, kind, indptr, indices, initial_states, params, num_workers, weights=None, thresholds=None):
+        self.kind = kind
+        self.params = params
+        self.num_nodes = len(initial_states)
+        self.parity = 0
+        self.ranges = degree_balanced_ranges(indptr, max(1, int(num_workers)))
+
+        states = np.zeros((2, self.num_nodes), dtype=np.uint8)
+        states[0] = initial_states
+        self._shared = {'indptr': _Shared(indptr), 'indices': _Shared(indices), 'states': _Shared(states)}
+        if weights is not None:
+            self._shared['weights'] = _Shared(np.asarray(weights, dtype=np.float64))
+            self._shared['thresholds'] = _Shared(np.asarray(thresholds, dtype=np.float64))
+
+        self._conns, self._workers = [], []
+        if len(self.ranges) > 1:
+            specs = {name: s.spec for name, s in self._shared.items()}
+            barrier = mp.Barrier(len(self.ranges))
+            for lo, hi in self.ranges:
+                parent, child = mp.Pipe()
+                proc = mp.Process(target=_partition_worker, args=(kind, lo, hi, params, specs, barrier, child),
+                                  daemon=True)
+                proc.start()
+                self._conns.append(parent)
+                self._workers.append(proc)
+        else:
+            indptr = self._shared['indptr'].array
+            self._rows = np.repeat(np.arange(self.num_nodes), np.diff(indptr))
+
+    @property
+    def states(self):
+        """Current state of every node (in CSR row order)."""
+        return self._shared['states'].array[self.parity]
+
+    def step(self, step):
+        if self._conns:
+            for conn in self._conns:
+                conn.send(('step', step, self.parity))
+            results = [conn.recv() for conn in self._conns]
+        else:
+            arrays = {name: s.array for name, s in self._shared.items()}
+            cur, nxt = arrays['states'][self.parity], arrays['states'][1 - self.parity]
+            if self.kind == 'sir':
+                results = [sir_step(step, 0, self.num_nodes, self._rows, arrays['indptr'], arrays['indices'], cur, nxt,
+                                    self.params['infection_prob'], self.params['recovery_prob'], self.params['key'])]
+            else:
+                results = [lt_step(0, self.num_nodes, self._rows, arrays['indptr'], arrays['indices'],
+                                   arrays['weights'], arrays['thresholds'], cur, nxt)]
+        self.parity = 1 - self.parity
+        if self.kind == 'sir':
+            return tuple(int(sum(r[k] for r in results)) for k in range(2))
+        return int(sum(results))
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(('stop', 0, 0))
+        for proc in self._workers:
+            proc.join()
+        self._conns, self._workers = [], []
+        for s in self._shared.values():
+            s.shm.close()
+            s.shm.unlink()
+        self._shared = {}
+
+
+class ParallelSIRModel(SIRModel):
+    """
+    SIRModel whose step runs on a partitioned CSR graph across num_workers
+    processes. The graph is not copied; states are kept as a uint8 array and
+    exposed as the usual node -> state dict on demand.
+    """
+    def __init__(self, graph, infection_prob, recovery_prob, susceptible_state, infected_state, recovered_state,
+                 num_workers=None, seed=None, ordering=None):
+        self.graph = graph
+        self.nodes = node_order(graph, ordering or PARALLEL_CONFIG['ordering'])
+        self.num_nodes = len(self.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.infection_prob = infection_prob
+        self.recovery_prob = recovery_prob
+        self.SUSCEPTIBLE = susceptible_state
+        self.INFECTED = infected_state
+        self.RECOVERED = recovered_state
+        self._labels = np.array([susceptible_state, infected_state, recovered_state], dtype=object)
+        self.num_workers = num_workers or PARALLEL_CONFIG['num_workers']
+        self.seed = seed if seed is not None else service().seed # GENERAL_CONFIG['random_seed'] unless reseeded
+        self._indptr, self._indices = build_in_csr(graph, self.nodes)
+        self._initial = np.full(self.num_nodes, SUSCEPTIBLE, dtype=np.uint8)
+        self.engine = None
+
+        self.s_counts = [self.num_nodes]
+        self.i_counts = [0]
+        self.r_counts = [0]
+        self.timesteps = [0]
+
+    def _start_engine(self):
+        if self.engine is None:
+            params = {'infection_prob': self.infection_prob, 'recovery_prob': self.recovery_prob, 'key': self.seed}
+            self.engine = PartitionedEngine('sir', self._indptr, self._indices, self._initial, params,
+                                            self.num_workers)
+
+    @property
+    def state_array(self):
+        return self.engine.states if self.engine is not None else self._initial
+
+    @property
+    def states(self):
+        labels = self._labels[self.state_array]
+        return dict(zip(self.nodes, labels))
+
+    def set_initial_infected_nodes(self, initial_infected_nodes):
+        """Sets the initial set of infected nodes (before the first step)."""
+        for node in initial_infected_nodes:
+            i = self.index.get(node)
+            if i is not None and self._initial[i] == SUSCEPTIBLE:
+                self._initial[i] = INFECTED
+            else:
+                print(f"Warning: Node {node} not in graph or not susceptible, cannot infect initially.")
+        self._update_counts(0)
+
+    def _update_counts(self, current_time_step):
+        s, i, r = np.bincount(self.state_array, minlength=3)[:3].tolist()
+        if self.timesteps[-1] == current_time_step:
+            self.s_counts[-1], self.i_counts[-1], self.r_counts[-1] = s, i, r
+        else:
+            self.s_counts.append(s)
+            self.i_counts.append(i)
+            self.r_counts.append(r)
+            self.timesteps.append(current_time_step)
+
+    def step(self, current_time_step):
+        """Performs a single step of the epidemic spread on all partitions."""
+        self._start_engine()
+        newly_infected, newly_recovered = self.engine.step(current_time_step)
+        # Counts follow incrementally from the transitions
+        self.s_counts.append(self.s_counts[-1] - newly_infected)
+        self.i_counts.append(self.i_counts[-1] + newly_infected - newly_recovered)
+        self.r_counts.append(self.r_counts[-1] + newly_recovered)
+        self.timesteps.append(current_time_step)
+        return newly_infected, newly_recovered
+
+    def get_current_states(self):
+        return self.states
+
+    def get_state(self):
+        scalars, arrays = super().get_state()
+        scalars['seed'] = str(self.seed) # Philox key; may exceed 64 bits
+        return scalars, arrays
+
+    def set_state(self, scalars, arrays):
+        if scalars['num_nodes'] != self.num_nodes:
+            raise ValueError(f"State has {scalars['num_nodes']} nodes, model has {self.num_nodes}")
+        self._load_states(arrays['states'])
+        self.s_counts = arrays['s_counts'].tolist()
+        self.i_counts = arrays['i_counts'].tolist()
+        self.r_counts = arrays['r_counts'].tolist()
+        self.timesteps = arrays['timesteps'].tolist()
+        self.infection_prob = scalars['infection_prob']
+        self.recovery_prob = scalars['recovery_prob']
+        self.seed = int(scalars['seed'])
+        if self.engine is not None: # Restart so workers pick up the restored parameters
+            self.close()
+
+    def _load_states(self, codes):
+        if self.engine is not None:
+            self.engine.states[:] = codes
+        else:
+            self._initial = np.array(codes, dtype=np.uint8)
+
+    def close(self):
+        if self.engine is not None:
+            self._initial = self.engine.states.copy()
+            self.engine.close()
+            self.engine = None
+
+
+class ParallelLinearThresholdModel(LinearThresholdModel):
+    """LinearThresholdModel whose step runs on a partitioned CSR graph across num_workers processes."""
+    def __init__(self, graph, thresholds=None, num_workers=None, ordering=None, rng=None):
+        self.graph = graph
+        self.nodes = node_order(graph, ordering or PARALLEL_CONFIG['ordering'])
+        self.num_nodes = len(self.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.num_workers = num_workers or PARALLEL_CONFIG['num_workers']
+        if thresholds:
+            self.thresholds = thresholds
+        else:
+            rng = rng if rng is not None else instance_draws(type(self).__name__)
+            self.thresholds = dict(zip(self.nodes, rng.uniform(0.01, 0.5, self.num_nodes).tolist()))
+        self._indptr, self._indices = build_in_csr(graph, self.nodes)
+
+        # Edge weights in CSR slot order: the 'weight' attribute, else 1/in_degree
+        in_degree = np.diff(self._indptr)
+        weights = np.repeat(1.0 / np.maximum(in_degree, 1), in_degree)
+        in_neighbors = graph.predecessors if graph.is_directed() else graph.neighbors
+        slot = 0
+        for node in self.nodes:
+            for nbr in in_neighbors(node):
+                attr = graph[nbr][node].get('weight') if graph.has_edge(nbr, node) else None
+                if attr is not None:
+                    weights[slot] = attr
+                slot += 1
+        self._weights = weights
+        self._initial = np.zeros(self.num_nodes, dtype=np.uint8)
+        self.engine = None
+
+    @property
+    def weights(self):
+        """node -> {in-neighbour: weight}, as in LinearThresholdModel (built on demand)."""
+        result = {}
+        for i, node in enumerate(self.nodes):
+            lo, hi = self._indptr[i], self._indptr[i + 1]
+            result[node] = {self.nodes[j]: float(w) for j, w in zip(self._indices[lo:hi], self._weights[lo:hi])}
+        return result
+
+    @property
+    def state_array(self):
+        return self.engine.states if self.engine is not None else self._initial
+
+    @property
+    def states(self):
+        return dict(zip(self.nodes, self.state_array.tolist()))
+
+    def set_initial_active_nodes(self, initial_active_nodes):
+        """Sets the initial set of active nodes (before the first step)."""
+        for node in initial_active_nodes:
+            i = self.index.get(node)
+            if i is not None:
+                self._initial[i] = ACTIVE
+            else:
+                print(f"Warning: Node {node} not in graph, cannot activate.")
+
+    def step(self):
+        """Performs a single step of the influence propagation on all partitions."""
+        if self.engine is None:
+            thresholds = np.array([self.thresholds[node] for node in self.nodes], dtype=np.float64)
+            self.engine = PartitionedEngine('lt', self._indptr, self._indices, self._initial, {}, self.num_workers,
+                                            weights=self._weights, thresholds=thresholds)
+        return self.engine.step(0)
+
+    def get_active_nodes(self):
+        return [self.nodes[i] for i in np.flatnonzero(self.state_array == ACTIVE)]
+
+    def set_state(self, scalars, arrays):
+        if scalars['num_nodes'] != self.num_nodes:
+            raise ValueError(f"State has {scalars['num_nodes']} nodes, model has {self.num_nodes}")
+        self.close() # Thresholds are baked into the workers' shared arrays
+        self._initial = np.array(arrays['states'], dtype=np.uint8)
+        self.thresholds = dict(zip(self.nodes, arrays['thresholds'].tolist()))
+
+    def close(self):
+        if self.engine is not None:
+            self._initial = self.engine.states.copy()
+            self.engine.close()
+            self.engine = None
+
+
+def benchmark(num_nodes=None, barabasi_m=None, worker_counts=None, num_steps=None):
+    """Times ParallelSIRModel across worker counts and checks the trajectories agree."""
+    num_nodes = num_nodes or PARALLEL_CONFIG['benchmark_nodes']
+    barabasi_m = barabasi_m or PARALLEL_CONFIG['benchmark_m']
+    worker_counts = worker_counts or PARALLEL_CONFIG['benchmark_workers']
+    num_steps = num_steps or PARALLEL_CONFIG['benchmark_steps']
+    seed = GENERAL_CONFIG['random_seed']
+
+    graph = nx.barabasi_albert_graph(num_nodes, barabasi_m, seed=seed)
+    initial = list(range(0, num_nodes, max(1, num_nodes // 100)))
+    print(f"Graph: {num_nodes} nodes, {graph.number_of_edges()} edges")
+
+    reference = None
+    baseline = None
+    for workers in worker_counts:
+        model = ParallelSIRModel(graph, 0.05, 0.1, 'S', 'I', 'R', num_workers=workers, seed=seed)
+        model.set_initial_infected_nodes(initial)
+        model._start_engine() # Exclude process start-up from the timing
+        start = time.perf_counter()
+        for t in range(1, num_steps + 1):
+            model.step(t)
+        elapsed = time.perf_counter() - start
+        trajectory = (model.s_counts, model.i_counts, model.r_counts)
+        final = model.state_array.copy()
+        model.close()
+
+        if reference is None:
+            reference, baseline = (trajectory, final), elapsed
+        same = trajectory == reference[0] and np.array_equal(final, reference[1])
+        edges_per_s = 2 * graph.number_of_edges() * num_steps / elapsed
+        print(f"{workers} worker(s): {elapsed:.3f}s, {edges_per_s:,.0f} edge-visits/s, "
+              f"speedup {baseline / elapsed:.2f}x, identical trajectory: {same}")
+
+if __name__ == '__main__':
+    benchmark()
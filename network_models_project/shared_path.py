@@ -0,0 +1,11 @@
+'''
+Puts ../shared on the import path. Modules used by both projects (rng.py,
+active_set.py, checkpoint_io.py, density.py, plotting.py) live there once;
+import this before importing any of them.
+'''
+import os
+import sys
+
+SHARED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared')
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
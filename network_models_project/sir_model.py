@@ -1,8 +1,14 @@
-import random
+from itertools import compress
+import numpy as np
+
+import shared_path # Puts ../shared on sys.path
+from rng import instance_draws
+from active_set import ActiveSet
 
 class SIRModel:
-    def __init__(self, graph, infection_prob, recovery_prob, susceptible_state, infected_state, recovered_state):
-        self.graph = graph.copy()
+    def __init__(self, graph, infection_prob, recovery_prob, susceptible_state, infected_state, recovered_state,
+                 rng=None):
+        self.graph = self._copy_graph(graph)
         self.nodes = list(self.graph.nodes())
         self.num_nodes = len(self.nodes)
 
@@ -14,8 +20,14 @@ class SIRModel:
         self.INFECTED = infected_state
         self.RECOVERED = recovered_state
 
+        # Uniform draws come in blocks from this model's own stream (rng.py); pass
+        # rng=draws(name, run) to key it explicitly, e.g. by the run of an ensemble
+        self.rng = rng if rng is not None else instance_draws(type(self).__name__)
+
         # Initialize all nodes to susceptible
         self.states = {node: self.SUSCEPTIBLE for node in self.nodes}
+        # Only infected nodes can cause a change (recover, infect a neighbour), so a step visits only them
+        self.active = ActiveSet(self.nodes)
         
         # Keep track of S, I, R counts over time
         self.s_counts = [self.num_nodes]
@@ -23,6 +35,10 @@ class SIRModel:
         self.r_counts = [0]
         self.timesteps = [0]
 
+    def _copy_graph(self, graph):
+        """The graph the model runs on; subclasses that build their own graph return it as is."""
+        return graph.copy()
+
     def set_initial_infected_nodes(self, initial_infected_nodes):
         """Sets the initial set of infected nodes."""
         for node in initial_infected_nodes:
@@ -30,13 +46,16 @@ class SIRModel:
                 self.states[node] = self.INFECTED
             else:
                 print(f"Warning: Node {node} not in graph or not susceptible, cannot infect initially.")
+        self.active.reset(node for node in self.nodes if self.states[node] == self.INFECTED)
         self._update_counts(0) # Update counts after initial infection
 
     def _update_counts(self, current_time_step):
         s = sum(1 for node in self.nodes if self.states[node] == self.SUSCEPTIBLE)
         i = sum(1 for node in self.nodes if self.states[node] == self.INFECTED)
         r = sum(1 for node in self.nodes if self.states[node] == self.RECOVERED)
-        
+        self._record_counts(current_time_step, s, i, r)
+
+    def _record_counts(self, current_time_step, s, i, r):
         if self.timesteps[-1] == current_time_step:
             self.s_counts[-1] = s
             self.i_counts[-1] = i
@@ -49,22 +68,17 @@ class SIRModel:
 
     def step(self, current_time_step):
         """Performs a single step of the epidemic spread."""
-        newly_infected_this_step = []
-        newly_recovered_this_step = []
-
-        for node in self.nodes:
-            if self.states[node] == self.INFECTED:
-                # Attempt to recover
-                if random.random() < self.recovery_prob:
-                    newly_recovered_this_step.append(node)
-                else:
-                    # Attempt to infect neighbors
-                    for neighbor in self.graph.neighbors(node):
-                        if self.states[neighbor] == self.SUSCEPTIBLE:
-                            if random.random() < self.infection_prob:
-                                # Check if already set to be infected in this step to avoid double processing
-                                if neighbor not in newly_infected_this_step: 
-                                    newly_infected_this_step.append(neighbor)
+        # One block of recovery draws for the infected nodes, then one block
+        # with a draw per edge from a node that stays infected to a
+        # susceptible neighbour
+        infected = self.active.members() # In node order, as a full scan would find them
+        recovers = (self.rng.take(len(infected)) < self.recovery_prob).tolist()
+        newly_recovered_this_step = list(compress(infected, recovers))
+        exposed = [neighbor for node, recovered in zip(infected, recovers) if not recovered
+                   for neighbor in self.graph.neighbors(node) if self.states[neighbor] == self.SUSCEPTIBLE]
+        hits = (self.rng.take(len(exposed)) < self.infection_prob).tolist()
+        # A node reached over several edges is infected once
+        newly_infected_this_step = list(dict.fromkeys(compress(exposed, hits)))
         
         # Apply changes for this step
         for node in newly_infected_this_step:
@@ -72,8 +86,13 @@ class SIRModel:
         
         for node in newly_recovered_this_step:
             self.states[node] = self.RECOVERED
+        self.active.wake_many(newly_infected_this_step)
+        self.active.sleep_many(newly_recovered_this_step)
         
-        self._update_counts(current_time_step)
+        # Newly infected nodes were susceptible and newly recovered ones infected, so the counts follow directly
+        infections, recoveries = len(newly_infected_this_step), len(newly_recovered_this_step)
+        self._record_counts(current_time_step, self.s_counts[-1] - infections,
+                            self.i_counts[-1] + infections - recoveries, self.r_counts[-1] + recoveries)
         return len(newly_infected_this_step), len(newly_recovered_this_step)
 
     def run(self, max_steps=100):
@@ -86,3 +105,31 @@ class SIRModel:
 
     def get_current_states(self):
         return self.states.copy()
+
+    def get_state(self):
+        """(scalars, arrays) describing the full model state, for checkpoint.py."""
+        labels = [self.SUSCEPTIBLE, self.INFECTED, self.RECOVERED]
+        codes = {label: code for code, label in enumerate(labels)}
+        arrays = {
+            'states': np.fromiter((codes[self.states[node]] for node in self.nodes), dtype=np.uint8, count=self.num_nodes),
+            's_counts': np.array(self.s_counts, dtype=np.int64),
+            'i_counts': np.array(self.i_counts, dtype=np.int64),
+            'r_counts': np.array(self.r_counts, dtype=np.int64),
+            'timesteps': np.array(self.timesteps, dtype=np.int64),
+        }
+        scalars = {'num_nodes': self.num_nodes, 'infection_prob': self.infection_prob,
+                   'recovery_prob': self.recovery_prob}
+        return scalars, arrays
+
+    def set_state(self, scalars, arrays):
+        if scalars['num_nodes'] != self.num_nodes:
+            raise ValueError(f"State has {scalars['num_nodes']} nodes, model has {self.num_nodes}")
+        labels = [self.SUSCEPTIBLE, self.INFECTED, self.RECOVERED]
+        self.states = {node: labels[code] for node, code in zip(self.nodes, arrays['states'].tolist())}
+        self.active.reset(node for node in self.nodes if self.states[node] == self.INFECTED)
+        self.s_counts = arrays['s_counts'].tolist()
+        self.i_counts = arrays['i_counts'].tolist()
+        self.r_counts = arrays['r_counts'].tolist()
+        self.timesteps = arrays['timesteps'].tolist()
+        self.infection_prob = scalars['infection_prob']
+        self.recovery_prob = scalars['recovery_prob']
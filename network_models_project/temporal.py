@@ -0,0 +1,444 @@
+'''
+Temporal networks: SIR and Linear Threshold propagation over a graph whose
+edges appear and vanish over time.
+
+Edges are streamed from an event file instead of being fixed up front. Each
+line is
+    time,source,target,op[,weight]
+with op 'add' / 'remove' (or '+' / '-'); blank lines and lines starting
+with '#' are skipped and events must be sorted by time. Before step t the
+model applies every event with time <= t, so propagation at step t runs on
+the snapshot valid at t. Events at time 0 form the initial graph.
+
+DynamicGraph keeps the adjacency as per-node lists of integer neighbour
+indices with an arc -> slot map, so adding and removing an edge are O(1)
+(removal swaps the last entry into the freed slot). It exposes the subset
+of the networkx interface the models use (neighbors, predecessors,
+in_degree, has_edge), so TemporalSIRModel reuses SIRModel.step unchanged.
+
+TemporalLinearThresholdModel keeps, per node, the in-degree and the
+incoming influence from active neighbours. Edge events and activations
+update these incrementally; the default 1/in_degree weight is applied as a
+single division at threshold time instead of being recomputed per edge.
+'''
+import csv
+import random
+import time
+import numpy as np
+import networkx as nx
+
+from sir_model import SIRModel
+from lt_model import LinearThresholdModel
+import shared_path # Puts ../shared on sys.path
+from rng import instance_draws
+from config import GENERAL_CONFIG, TEMPORAL_CONFIG
+
+ADD_OPS = {'add', '+'}
+REMOVE_OPS = {'remove', '-'}
+
+
+def _parse_node(token):
+    token = token.strip()
+    try:
+        return int(token)
+    except ValueError:
+        return token
+
+
+def read_edge_events(path):
+    """Yields (time, source, target, op, weight) tuples from an event file, lazily."""
+    with open(path, newline='') as f:
+        last_time = None
+        for line_no, row in enumerate(csv.reader(f), start=1):
+            if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                continue
+            if len(row) < 4:
+                raise ValueError(f"{path}:{line_no}: expected time,source,target,op[,weight]")
+            event_time = int(row[0])
+            if last_time is not None and event_time < last_time:
+                raise ValueError(f"{path}:{line_no}: events are not sorted by time")
+            last_time = event_time
+            op = row[3].strip().lower()
+            if op not in ADD_OPS and op not in REMOVE_OPS:
+                raise ValueError(f"{path}:{line_no}: unknown op {row[3]!r}")
+            weight = float(row[4]) if len(row) > 4 and row[4].strip() else None
+            yield event_time, _parse_node(row[1]), _parse_node(row[2]), op in ADD_OPS, weight
+
+
+def write_edge_events(path, events):
+    """Writes (time, source, target, is_add, weight) tuples in the event file format."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['# time', 'source', 'target', 'op', 'weight'])
+        for t, u, v, is_add, weight in events:
+            writer.writerow([t, u, v, 'add' if is_add else 'remove', '' if weight is None else weight])
+
+
+class EdgeEventStream:
+    """Hands out the events of an iterable (or event file) up to a given time, one lookahead at a time."""
+    def __init__(self, events):
+        self._events = iter(read_edge_events(events) if isinstance(events, str) else events)
+        self._next = next(self._events, None)
+        self.time = None
+
+    def until(self, time):
+        """Yields every remaining event with event time <= time."""
+        self.time = time
+        while self._next is not None and self._next[0] <= time:
+            event, self._next = self._next, next(self._events, None)
+            yield event
+
+    def exhausted(self):
+        return self._next is None
+
+
+def generate_contact_events(num_nodes, num_steps, contacts_per_step, mean_duration, initial_edges=0, seed=None):
+    """
+    Synthetic contact stream: every step contacts_per_step random pairs come
+    into contact, and each contact lasts a geometric number of steps with
+    the given mean. Returns a list of events sorted by time.
+    """
+    rng = random.Random(seed)
+    end_prob = 1.0 / max(mean_duration, 1.0)
+    active = set()
+    events = []
+
+    def start_contacts(t, count):
+        for _ in range(count):
+            u, v = rng.sample(range(num_nodes), 2)
+            edge = (min(u, v), max(u, v))
+            if edge not in active:
+                active.add(edge)
+                events.append((t, edge[0], edge[1], True, None))
+
+    start_contacts(0, initial_edges)
+    for t in range(1, num_steps + 1):
+        ended = [edge for edge in sorted(active) if rng.random() < end_prob]
+        for edge in ended:
+            active.remove(edge)
+            events.append((t, edge[0], edge[1], False, None))
+        start_contacts(t, contacts_per_step)
+    return events
+
+
+class DynamicGraph:
+    """Adjacency over a fixed node set with O(1) edge insertion and removal."""
+    def __init__(self, nodes, directed=False):
+        self._nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self._nodes)}
+        self.directed = directed
+        n = len(self._nodes)
+        self._succ = [[] for _ in range(n)]
+        self._pred = [[] for _ in range(n)] if directed else self._succ
+        self._succ_slot = {} # (i, j) -> position of j in _succ[i]
+        self._pred_slot = {} if directed else self._succ_slot # (i, j) -> position of i in _pred[j]
+        self.weight = {} # (i, j) -> explicit weight or None
+        self.in_degree_array = np.zeros(n, dtype=np.int64)
+
+    def _node_index(self, node):
+        try:
+            return self.index[node]
+        except KeyError:
+            raise KeyError(f"Node {node!r} is not in the temporal graph") from None
+
+    @staticmethod
+    def _remove_slot(lists, slots, owner, key, other):
+        """Swap-removes `other` from lists[owner]; key(owner, moved) addresses the slot map."""
+        lst = lists[owner]
+        pos = slots.pop(key(owner, other))
+        last = lst.pop()
+        if pos < len(lst):
+            lst[pos] = last
+            slots[key(owner, last)] = pos
+
+    def _add_arc(self, i, j, weight):
+        self._succ_slot[(i, j)] = len(self._succ[i])
+        self._succ[i].append(j)
+        if self.directed:
+            self._pred_slot[(i, j)] = len(self._pred[j])
+            self._pred[j].append(i)
+        self.weight[(i, j)] = weight
+        self.in_degree_array[j] += 1
+
+    def _remove_arc(self, i, j):
+        self._remove_slot(self._succ, self._succ_slot, i, lambda a, b: (a, b), j)
+        if self.directed:
+            self._remove_slot(self._pred, self._pred_slot, j, lambda a, b: (b, a), i)
+        self.in_degree_array[j] -= 1
+        return self.weight.pop((i, j))
+
+    def arcs(self, u, v):
+        """The arcs (by index) that make up edge u-v: one if directed, both directions otherwise."""
+        i, j = self._node_index(u), self._node_index(v)
+        return [(i, j)] if self.directed or i == j else [(i, j), (j, i)]
+
+    def add_edge(self, u, v, weight=None):
+        """Adds (or re-weights) an edge; returns the arcs that were newly added."""
+        added = []
+        for i, j in self.arcs(u, v):
+            if (i, j) in self.weight:
+                self.weight[(i, j)] = weight
+            else:
+                self._add_arc(i, j, weight)
+                added.append((i, j))
+        return added
+
+    def remove_edge(self, u, v):
+        """Removes an edge if present; returns the removed arcs with their weights."""
+        return [(i, j, self._remove_arc(i, j)) for i, j in self.arcs(u, v) if (i, j) in self.weight]
+
+    # networkx-style read access used by the models and the plotting helpers
+    def nodes(self):
+        return list(self._nodes)
+
+    def is_directed(self):
+        return self.directed
+
+    def has_edge(self, u, v):
+        return (self.index.get(u), self.index.get(v)) in self.weight
+
+    def neighbors(self, node):
+        nodes = self._nodes
+        return [nodes[j] for j in self._succ[self._node_index(node)]]
+
+    successors = neighbors
+
+    def predecessors(self, node):
+        nodes = self._nodes
+        return [nodes[i] for i in self._pred[self._node_index(node)]]
+
+    def in_degree(self, node):
+        return int(self.in_degree_array[self._node_index(node)])
+
+    def number_of_edges(self):
+        return len(self.weight) if self.directed else (len(self.weight) + sum(1 for i, j in self.weight if i == j)) // 2
+
+    def edges(self):
+        nodes = self._nodes
+        return [(nodes[i], nodes[j]) for i, j in self.weight if self.directed or i <= j]
+
+    def to_networkx(self):
+        """The current snapshot as a networkx graph (for drawing)."""
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.add_nodes_from(self._nodes)
+        graph.add_edges_from(self.edges())
+        return graph
+
+
+class TemporalSIRModel(SIRModel):
+    """SIRModel over a DynamicGraph that is updated from an edge event stream before every step."""
+    def __init__(self, nodes, events, infection_prob, recovery_prob, susceptible_state, infected_state,
+                 recovered_state, directed=False, rng=None):
+        super().__init__(DynamicGraph(nodes, directed), infection_prob, recovery_prob, susceptible_state,
+                         infected_state, recovered_state, rng=rng)
+        self.events = events if isinstance(events, EdgeEventStream) else EdgeEventStream(events)
+        self.edge_events_applied = 0
+        self.advance_graph(0)
+
+    def _copy_graph(self, graph):
+        return graph # Built by __init__ and updated in place from the event stream
+
+    def advance_graph(self, time):
+        """Applies every pending edge event with time <= time."""
+        for _, u, v, is_add, weight in self.events.until(time):
+            if is_add:
+                self.graph.add_edge(u, v, weight)
+            else:
+                self.graph.remove_edge(u, v)
+            self.edge_events_applied += 1
+
+    def step(self, current_time_step):
+        self.advance_graph(current_time_step)
+        return super().step(current_time_step)
+
+
+class TemporalLinearThresholdModel(LinearThresholdModel):
+    """
+    LinearThresholdModel over a DynamicGraph. An inactive node activates
+    once explicit_influence + active_unweighted / in_degree reaches its
+    threshold, which is the static model's rule with its default
+    1/in_degree weights for edges that carry no explicit weight.
+    """
+    def __init__(self, nodes, events, thresholds=None, directed=True, rng=None):
+        self.graph = DynamicGraph(nodes, directed)
+        self.nodes = self.graph.nodes()
+        self.num_nodes = len(self.nodes)
+
+        self.states = {node: 0 for node in self.nodes}
+        if thresholds:
+            self.thresholds = thresholds
+        else:
+            rng = rng if rng is not None else instance_draws(type(self).__name__)
+            self.thresholds = dict(zip(self.nodes, rng.uniform(0.01, 0.5, self.num_nodes).tolist()))
+        self.threshold_array = np.fromiter((self.thresholds[node] for node in self.nodes), dtype=np.float64,
+                                           count=self.num_nodes)
+
+        self.active = np.zeros(self.num_nodes, dtype=bool)
+        self.active_unweighted = np.zeros(self.num_nodes, dtype=np.int64) # Active in-neighbours over unweighted arcs
+        self.explicit_influence = np.zeros(self.num_nodes, dtype=np.float64) # Sum of explicit weights from active in-neighbours
+
+        self.events = events if isinstance(events, EdgeEventStream) else EdgeEventStream(events)
+        self.edge_events_applied = 0
+        self.time = 0
+        self.advance_graph(0)
+
+    @property
+    def weights(self):
+        """Current in-weights {node: {neighbour: weight}}, as LinearThresholdModel.weights."""
+        graph, nodes = self.graph, self.nodes
+        weights = {node: {} for node in nodes}
+        for (i, j), w in graph.weight.items():
+            weights[nodes[j]][nodes[i]] = w if w is not None else 1.0 / graph.in_degree_array[j]
+        return weights
+
+    def _arc_influence(self, i, j, weight, sign):
+        if self.active[i]:
+            if weight is None:
+                self.active_unweighted[j] += sign
+            else:
+                self.explicit_influence[j] += sign * weight
+
+    def advance_graph(self, time):
+        """Applies every pending edge event with time <= time, updating the influence sums."""
+        graph = self.graph
+        for _, u, v, is_add, weight in self.events.until(time):
+            if is_add:
+                for i, j in graph.arcs(u, v):
+                    if (i, j) in graph.weight: # Re-weighting an existing arc
+                        self._arc_influence(i, j, graph.weight[(i, j)], -1)
+                        self._arc_influence(i, j, weight, +1)
+                for i, j in graph.add_edge(u, v, weight):
+                    self._arc_influence(i, j, weight, +1)
+            else:
+                for i, j, old_weight in graph.remove_edge(u, v):
+                    self._arc_influence(i, j, old_weight, -1)
+            self.edge_events_applied += 1
+        self.time = time
+
+    def _activate(self, indices):
+        graph = self.graph
+        for i in indices:
+            self.active[i] = True
+            self.states[self.nodes[i]] = 1
+            for j in graph._succ[i]:
+                weight = graph.weight[(i, j)]
+                if weight is None:
+                    self.active_unweighted[j] += 1
+                else:
+                    self.explicit_influence[j] += weight
+
+    def influence(self):
+        """Total influence on every node from its currently active in-neighbours."""
+        degree = self.graph.in_degree_array
+        return self.explicit_influence + self.active_unweighted / np.maximum(degree, 1)
+
+    def set_initial_active_nodes(self, initial_active_nodes):
+        indices = []
+        for node in initial_active_nodes:
+            i = self.graph.index.get(node)
+            if i is None:
+                print(f"Warning: Node {node} not in graph, cannot activate.")
+            elif not self.active[i]:
+                indices.append(i)
+        self._activate(indices)
+
+    def step(self):
+        """Advances the graph by one time step, then activates every node whose threshold is met."""
+        self.advance_graph(self.time + 1)
+        newly_active = np.flatnonzero(~self.active & (self.influence() >= self.threshold_array))
+        self._activate(newly_active.tolist())
+        return len(newly_active)
+
+    def run(self, max_steps=100, stop_when_stable=False):
+        """
+        Runs max_steps steps. Unlike the static model, a step without
+        activations is not final (new edges may still arrive) unless
+        stop_when_stable is set or the event stream is exhausted.
+        """
+        history = [self.states.copy()]
+        for _ in range(max_steps):
+            activated_in_step = self.step()
+            history.append(self.states.copy())
+            if activated_in_step == 0 and (stop_when_stable or self.events.exhausted()):
+                break
+        return history
+
+    def set_thresholds(self, thresholds):
+        """Replaces the thresholds; every step compares all nodes, so there is no frontier to wake."""
+        self.thresholds = thresholds
+        self.threshold_array = np.fromiter((thresholds[node] for node in self.nodes), dtype=np.float64,
+                                           count=self.num_nodes)
+
+    def set_state(self, scalars, arrays):
+        super().set_state(scalars, arrays)
+        self.threshold_array = np.array(arrays['thresholds'], dtype=np.float64)
+        self.active[:] = False
+        self.active_unweighted[:] = 0
+        self.explicit_influence[:] = 0.0
+        self._activate(np.flatnonzero(np.asarray(arrays['states'], dtype=bool)).tolist())
+
+
+def load_events(cfg=None):
+    """The configured event stream: the events file if set, otherwise a synthetic contact stream."""
+    cfg = cfg or TEMPORAL_CONFIG
+    if cfg['events_file']:
+        return list(read_edge_events(cfg['events_file']))
+    return generate_contact_events(cfg['num_nodes'], cfg['num_steps'], cfg['contacts_per_step'],
+                                   cfg['mean_contact_duration'], cfg['initial_edges'], GENERAL_CONFIG['random_seed'])
+
+
+def benchmark(cfg=None):
+    """
+    Times the temporal LT model against rebuilding a LinearThresholdModel
+    from a networkx snapshot every step, and checks both activate the same
+    nodes; then runs a temporal SIR over the same stream.
+    """
+    cfg = cfg or TEMPORAL_CONFIG
+    events = load_events(cfg)
+    nodes = list(range(cfg['num_nodes']))
+    rng = random.Random(GENERAL_CONFIG['random_seed'])
+    seeds = rng.sample(nodes, cfg['num_initial_active'])
+    thresholds = {node: cfg['lt_threshold'] for node in nodes}
+    print(f"{len(nodes)} nodes, {len(events)} edge events over {cfg['num_steps']} steps")
+
+    start = time.perf_counter()
+    model = TemporalLinearThresholdModel(nodes, events, thresholds=thresholds, directed=cfg['directed'])
+    model.set_initial_active_nodes(seeds)
+    for _ in range(cfg['num_steps']):
+        model.step()
+    incremental_time = time.perf_counter() - start
+    incremental_active = set(model.get_active_nodes())
+
+    start = time.perf_counter()
+    stream = EdgeEventStream(events)
+    snapshot = nx.DiGraph() if cfg['directed'] else nx.Graph()
+    snapshot.add_nodes_from(nodes)
+    active = set(seeds)
+    for t in range(0, cfg['num_steps'] + 1):
+        for _, u, v, is_add, weight in stream.until(t):
+            if is_add:
+                snapshot.add_edge(u, v)
+            elif snapshot.has_edge(u, v):
+                snapshot.remove_edge(u, v)
+        if t == 0:
+            continue
+        rebuilt = LinearThresholdModel(snapshot if cfg['directed'] else snapshot.to_directed(), thresholds)
+        rebuilt.set_initial_active_nodes(active)
+        rebuilt.step()
+        active = set(rebuilt.get_active_nodes())
+    rebuild_time = time.perf_counter() - start
+
+    print(f"LT: incremental {incremental_time:.2f}s, rebuild per step {rebuild_time:.2f}s "
+          f"({rebuild_time / incremental_time:.1f}x), {len(incremental_active)} active, "
+          f"same activations: {incremental_active == active}")
+
+    start = time.perf_counter()
+    sir = TemporalSIRModel(nodes, events, cfg['infection_prob'], cfg['recovery_prob'], 'S', 'I', 'R',
+                           directed=cfg['directed'])
+    sir.set_initial_infected_nodes(rng.sample(nodes, cfg['num_initial_infected']))
+    sir.run(cfg['num_steps'])
+    print(f"SIR: {time.perf_counter() - start:.2f}s, final S/I/R {sir.s_counts[-1]}/{sir.i_counts[-1]}/"
+          f"{sir.r_counts[-1]} after {sir.timesteps[-1]} steps, {sir.graph.number_of_edges()} edges in the last snapshot")
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules use flat sibling imports; run these tests from network_models_project
+# (agent_simulations has modules of the same names, e.g. config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
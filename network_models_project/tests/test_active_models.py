@@ -0,0 +1,65 @@
+import networkx as nx
+import numpy as np
+
+import shared_path # Puts ../shared on sys.path
+from rng import RNGService
+from lt_model import LinearThresholdModel
+from sir_model import SIRModel
+
+
+def full_scan_sir_step(graph, states, rng, beta, gamma):
+    '''SIRModel.step as a scan over every node, with the same draws.'''
+    infected = [node for node in graph.nodes() if states[node] == 'I']
+    recovers = (rng.take(len(infected)) < gamma).tolist()
+    exposed = [nb for node, rec in zip(infected, recovers) if not rec
+               for nb in graph.neighbors(node) if states[nb] == 'S']
+    hits = (rng.take(len(exposed)) < beta).tolist()
+    for node in (n for n, hit in zip(exposed, hits) if hit):
+        states[node] = 'I'
+    for node in (n for n, rec in zip(infected, recovers) if rec):
+        states[node] = 'R'
+
+
+def full_scan_lt_step(graph, states, thresholds):
+    influence = {node: sum(1.0 / graph.in_degree(node) for nb in graph.predecessors(node) if states[nb])
+                 for node in graph.nodes() if not states[node]}
+    for node, value in influence.items():
+        if value >= thresholds[node]:
+            states[node] = 1
+
+
+def test_sir_with_an_active_set_matches_a_full_scan():
+    graph = nx.barabasi_albert_graph(500, 2, seed=1)
+    model = SIRModel(graph, 0.2, 0.1, 'S', 'I', 'R', rng=RNGService(7).draws('SIRModel'))
+    model.set_initial_infected_nodes([3, 250, 499])
+    reference_rng = RNGService(7).draws('SIRModel')
+    states = {node: 'I' if node in (3, 250, 499) else 'S' for node in graph.nodes()}
+    for t in range(1, 60):
+        model.step(t)
+        full_scan_sir_step(model.graph, states, reference_rng, 0.2, 0.1) # The model's copy may order neighbours differently
+        assert model.states == states
+        assert set(model.active.members()) == {node for node, s in states.items() if s == 'I'}
+    assert model.active.visits < 59 * 500 # Only infected nodes were visited
+
+
+def test_lt_frontier_matches_a_full_scan():
+    graph = nx.DiGraph(nx.barabasi_albert_graph(400, 2, seed=2))
+    thresholds = dict(zip(graph.nodes(), np.random.default_rng(2).uniform(0.05, 0.5, 400).tolist()))
+    model = LinearThresholdModel(graph, thresholds)
+    model.set_initial_active_nodes(range(0, 400, 25))
+    states = {node: int(node % 25 == 0) for node in graph.nodes()}
+    for _ in range(30):
+        model.step()
+        full_scan_lt_step(graph, states, thresholds)
+        assert model.states == states
+
+
+def test_lowering_thresholds_wakes_every_node():
+    graph = nx.DiGraph(nx.path_graph(5))
+    model = LinearThresholdModel(graph, {node: 0.9 for node in graph.nodes()})
+    model.set_initial_active_nodes([0])
+    model.run(10)
+    assert model.get_active_nodes() == [0] # Inner nodes have two in-neighbours, so 0.5 influence at most
+    model.set_thresholds({node: 0.5 for node in graph.nodes()})
+    model.run(10)
+    assert model.get_active_nodes() == [0, 1, 2, 3, 4]
@@ -0,0 +1,77 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from analytic import (_poisson_binomial, _remove_trial, critical_infection_prob, epidemic_threshold,
+                      lt_dynamic_message_passing, sir_final_size_degree, sir_message_passing, transmissibility)
+from lt_model import LinearThresholdModel
+
+
+@pytest.mark.parametrize('beta,gamma', [(0.05, 0.1), (0.3, 0.02), (0.5, 0.5), (0.9, 0.7)])
+def test_transmissibility_sums_the_per_step_chances(beta, gamma):
+    # Step t infects with probability ((1 - gamma)(1 - beta))^t (1 - gamma) beta
+    steps = np.arange(2000)
+    expected = np.sum(((1 - gamma) * (1 - beta)) ** steps * (1 - gamma) * beta)
+    assert transmissibility(beta, gamma) == pytest.approx(expected)
+    assert transmissibility(beta, gamma) == pytest.approx(beta * (1 - gamma) / (gamma + beta * (1 - gamma)))
+
+
+def test_transmissibility_limits():
+    assert transmissibility(0.0, 0.3) == 0.0
+    assert transmissibility(0.4, 1.0) == 0.0
+    assert transmissibility(1.0, 0.0) == 1.0
+    assert transmissibility(0.0, 0.0) == 0.0
+
+
+def test_threshold_of_a_regular_graph():
+    assert epidemic_threshold([4] * 100) == pytest.approx(1 / 3)
+    assert epidemic_threshold([1] * 10) == np.inf
+    gamma = 0.2
+    beta = critical_infection_prob([4] * 100, gamma)
+    assert transmissibility(beta, gamma) == pytest.approx(1 / 3)
+
+
+def test_degree_final_size():
+    degrees = [4] * 1000
+    assert sir_final_size_degree(degrees, 0.0, 0.1, initial_fraction=0.01)[0] == pytest.approx(0.01)
+    below = critical_infection_prob(degrees, 0.1) * 0.5
+    size, r0 = sir_final_size_degree(degrees, below, 0.1)
+    assert size == pytest.approx(0.0, abs=1e-6) and r0 < 1
+    size, r0 = sir_final_size_degree(degrees, 0.9, 0.01)
+    assert r0 > 2 and 0.5 < size <= 1.0
+
+
+def test_message_passing_is_exact_on_a_path():
+    graph = nx.path_graph(4)
+    T = transmissibility(0.2, 0.1)
+    prob, total = sir_message_passing(graph, 0.2, 0.1, initial_infected=[0])
+    np.testing.assert_allclose(prob, [1, T, T ** 2, T ** 3])
+    assert total == pytest.approx(prob.sum())
+
+
+def test_poisson_binomial_and_removed_trials():
+    q = np.array([[0.1, 0.7, 0.5, 0.95], [0.0, 1.0, 0.3, 0.6]])
+    dist = _poisson_binomial(q)
+    for row, probs in zip(dist, q):
+        expected = np.zeros(len(probs) + 1)
+        for outcome in itertools.product((0, 1), repeat=len(probs)):
+            expected[sum(outcome)] += np.prod([p if o else 1 - p for p, o in zip(probs, outcome)])
+        np.testing.assert_allclose(row, expected, atol=1e-12)
+    removed = _remove_trial(dist, q)
+    for s in range(q.shape[1]):
+        np.testing.assert_allclose(removed[:, s], _poisson_binomial(np.delete(q, s, axis=1)), atol=1e-9)
+
+
+def test_lt_message_passing_is_exact_on_a_tree_with_fixed_thresholds():
+    tree = nx.random_labeled_tree(60, seed=3) if hasattr(nx, 'random_labeled_tree') else nx.random_tree(60, seed=3)
+    graph = tree.to_directed()
+    thresholds = dict(zip(graph.nodes(), np.random.default_rng(3).uniform(0.01, 0.6, 60).tolist()))
+    initial = [0, 17, 42]
+    model = LinearThresholdModel(graph, thresholds)
+    model.set_initial_active_nodes(initial)
+    model.run(100)
+    prob, expected = lt_dynamic_message_passing(graph, thresholds=thresholds, initial_active=initial)
+    np.testing.assert_allclose(prob, [model.states[node] for node in graph.nodes()], atol=1e-9)
+    assert expected[0] == len(initial) and expected[-1] == pytest.approx(sum(model.states.values()))
@@ -0,0 +1,47 @@
+import networkx as nx
+import numpy as np
+
+from calibration import ResultCache, SIRCalibrator, grid_points, latin_hypercube
+
+TRUE = {'infection_prob': 0.2, 'recovery_prob': 0.1}
+
+
+def make_calibrator(cache, observed=None, num_workers=1):
+    graph = nx.barabasi_albert_graph(200, 2, seed=1)
+    return SIRCalibrator(graph, np.zeros(31) if observed is None else observed, [0, 1, 2], seed=5, replicates=3,
+                         num_workers=num_workers, max_steps=30, cache=cache)
+
+
+def test_grid_points_and_latin_hypercube():
+    assert len(grid_points({'infection_prob': [0.1, 0.2], 'recovery_prob': [0.05, 0.1, 0.2]})) == 6
+    points = latin_hypercube({'infection_prob': (0.0, 1.0), 'recovery_prob': (0.2, 0.4)}, 10, seed=1)
+    beta = np.array([p['infection_prob'] for p in points])
+    gamma = np.array([p['recovery_prob'] for p in points])
+    assert sorted(np.floor(beta * 10).astype(int).tolist()) == list(range(10)) # One point per stratum
+    assert sorted(np.floor((gamma - 0.2) / 0.02).astype(int).tolist()) == list(range(10))
+
+
+def test_cached_replicates_are_not_simulated_again(tmp_path):
+    calibrator = make_calibrator(ResultCache(str(tmp_path)))
+    first = calibrator.curves([TRUE])
+    assert calibrator.simulated == 3
+    again = make_calibrator(ResultCache(str(tmp_path))) # A fresh process sees the files
+    np.testing.assert_array_equal(again.curves([TRUE]), first)
+    assert again.simulated == 0 and again.cache.hit_rate == 1.0
+    assert (first.sum(axis=2) == 200).all()
+
+
+def test_results_do_not_depend_on_the_number_of_workers():
+    points = grid_points({'infection_prob': [0.1, 0.3], 'recovery_prob': [0.1]})
+    serial = make_calibrator(ResultCache()).curves(points)
+    pooled = make_calibrator(ResultCache(), num_workers=2).curves(points)
+    np.testing.assert_array_equal(serial, pooled)
+
+
+def test_sweep_finds_the_parameters_of_the_observed_curve():
+    observed = make_calibrator(ResultCache()).curves([TRUE])[0, :, 1].mean(axis=0)
+    calibrator = make_calibrator(ResultCache(), observed=observed)
+    points = grid_points({'infection_prob': [0.05, 0.2, 0.4], 'recovery_prob': [0.05, 0.1, 0.3]})
+    result = calibrator.sweep(points)
+    assert result['best'] == TRUE
+    assert result['distances'].min() == 0.0
@@ -0,0 +1,68 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from epidemic_model.compartmental import CompartmentalModel, graph_to_csr
+
+
+def test_csr_rows_hold_the_neighbours():
+    graph = nx.barabasi_albert_graph(100, 2, seed=1)
+    nodes = list(graph.nodes())
+    indptr, indices = graph_to_csr(graph, nodes)
+    for k, node in enumerate(nodes):
+        assert sorted(nodes[i] for i in indices[indptr[k]:indptr[k + 1]]) == sorted(graph.neighbors(node))
+
+
+def test_certain_infection_moves_one_hop_per_step():
+    model = CompartmentalModel.from_table(nx.path_graph(6), 'SI', {'infection_prob': 1.0}, seed=0)
+    model.set_initial('I', [0])
+    model.run(7) # SI never runs out of infected nodes, so every step runs
+    assert model.history['I'] == [1, 2, 3, 4, 5, 6, 6, 6]
+    assert model.timesteps == list(range(8))
+
+
+def test_nodes_leaving_the_inducer_do_not_transmit():
+    model = CompartmentalModel.from_table(nx.path_graph(3), 'SIR', {'infection_prob': 1.0, 'recovery_prob': 1.0})
+    model.set_initial('I', [1])
+    assert model.step() == {('I', 'R'): 1}
+    assert model.get_current_states() == {0: 'S', 1: 'R', 2: 'S'}
+
+
+def test_conversion_probability_with_k_transmitting_neighbours():
+    # 3000 stars: a susceptible centre with three infected leaves
+    stars = nx.disjoint_union_all([nx.star_graph(3)] * 3000)
+    model = CompartmentalModel.from_table(stars, 'SI', {'infection_prob': 0.3}, seed=1)
+    model.set_initial('I', [node for node in stars.nodes() if node % 4])
+    model.step()
+    assert model.counts[0] / 3000 == pytest.approx(0.7 ** 3, abs=0.03)
+
+
+def test_counts_follow_the_states():
+    graph = nx.barabasi_albert_graph(500, 3, seed=2)
+    params = {'infection_prob': 0.3, 'latency_prob': 0.3, 'recovery_prob': 0.2, 'waning_prob': 0.1}
+    model = CompartmentalModel.from_table(graph, 'SEIRS', params, seed=3)
+    model.set_initial('I', range(10))
+    for t in range(1, 40):
+        before = model.counts.copy()
+        transitions = model.step(t)
+        np.testing.assert_array_equal(model.counts, np.bincount(model.states, minlength=4))
+        for (source, target), n in transitions.items():
+            before[model.code[source]] -= n
+            before[model.code[target]] += n
+        np.testing.assert_array_equal(before, model.counts)
+        assert set(transitions) <= {('S', 'E'), ('E', 'I'), ('I', 'R'), ('R', 'S')}
+    assert [model.history[label][-1] for label in model.compartments] == model.counts.tolist()
+
+
+def test_seir_runs_until_exposed_and_infected_are_gone():
+    model = CompartmentalModel.from_table(nx.barabasi_albert_graph(200, 2, seed=4), 'SEIR',
+                                          {'infection_prob': 0.2, 'latency_prob': 0.5, 'recovery_prob': 0.3}, seed=5)
+    model.set_initial('I', [0])
+    model.run(1000)
+    assert model.counts[model.code['E']] == model.counts[model.code['I']] == 0
+    assert model.history['E'][-2] + model.history['I'][-2] > 0 # Stopped at the first empty step
+
+
+def test_missing_parameters_are_reported():
+    with pytest.raises(KeyError, match='recovery_prob'):
+        CompartmentalModel.from_table(nx.path_graph(3), 'SIR', {'infection_prob': 0.1})
@@ -0,0 +1,47 @@
+import networkx as nx
+import numpy as np
+import pytest
+from matplotlib.figure import Figure
+
+from config import RENDER_CONFIG, SIR_MODEL_CONFIG
+from utils import _edge_samples, draw_network
+
+
+@pytest.fixture
+def lod(monkeypatch):
+    monkeypatch.setitem(RENDER_CONFIG, 'lod_node_threshold', 100)
+    monkeypatch.setitem(RENDER_CONFIG, 'lod_max_edges', 50)
+    monkeypatch.setitem(RENDER_CONFIG, 'lod_bins', (20, 20))
+
+
+def draw(graph, pos):
+    ax = Figure().add_subplot()
+    states = {node: SIR_MODEL_CONFIG['states']['infected' if node % 3 else 'susceptible'] for node in graph.nodes()}
+    draw_network(graph, states, pos, ax, SIR_MODEL_CONFIG)
+    return ax
+
+
+def test_large_graph_is_drawn_as_density_and_an_edge_sample(lod):
+    graph = nx.barabasi_albert_graph(400, 2, seed=1)
+    pos = nx.circular_layout(graph)
+    ax = draw(graph, pos)
+    assert len(ax.images) == 1 and ax.images[0].get_array().shape == (20, 20, 4)
+    (edges,) = ax.collections
+    assert len(edges.get_segments()) == 50
+    assert len(draw(nx.path_graph(10), nx.circular_layout(nx.path_graph(10))).images) == 0
+
+
+def test_edge_sample_is_kept_until_the_graph_changes(lod):
+    graph = nx.barabasi_albert_graph(400, 2, seed=2)
+    pos = nx.circular_layout(graph)
+    draw(graph, pos)
+    sample = _edge_samples[graph][2]
+    moved = {node: xy + 1.0 for node, xy in pos.items()}
+    segments = draw(graph, moved).collections[0].get_segments()
+    assert _edge_samples[graph][2] is sample # Same edges, drawn at the new positions
+    np.testing.assert_allclose(segments[0], [moved[sample[0][0]], moved[sample[0][1]]])
+
+    graph.remove_edge(*sample[0])
+    graph.add_edge(*next((u, v) for u in graph for v in graph if u < v and not graph.has_edge(u, v)))
+    draw(graph, pos)
+    assert all(graph.has_edge(u, v) for u, v in _edge_samples[graph][2])
@@ -0,0 +1,67 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from config import GENERAL_CONFIG
+from graph_cache import _edge_insertion_order, cached_layout, generate_graph, graph_fingerprint
+
+
+def adjacency_order(graph):
+    return [(u, list(nbrs)) for u, nbrs in graph.adjacency()]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(GENERAL_CONFIG, 'cache_dir', str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize('graph', [nx.barabasi_albert_graph(300, 3, seed=1), nx.watts_strogatz_graph(200, 6, 0.3, seed=2),
+                                   nx.erdos_renyi_graph(150, 0.05, seed=3), nx.path_graph(5)])
+def test_insertion_order_reproduces_neighbour_order(graph):
+    rebuilt = nx.Graph()
+    rebuilt.add_nodes_from(graph.nodes())
+    rebuilt.add_edges_from(_edge_insertion_order(graph))
+    assert adjacency_order(rebuilt) == adjacency_order(graph)
+
+
+def test_insertion_order_keeps_every_edge_after_edits():
+    graph = nx.cycle_graph(6)
+    graph.remove_edge(0, 1)
+    graph.add_edge(1, 0) # Conflicting neighbour orders: every edge is still emitted once
+    order = _edge_insertion_order(graph)
+    assert sorted(tuple(sorted(e)) for e in order) == sorted(tuple(sorted(e)) for e in graph.edges())
+
+
+@pytest.mark.parametrize('generator,params', [('barabasi_albert_graph', {'n': 400, 'm': 3}),
+                                              ('watts_strogatz_graph', {'n': 200, 'k': 4, 'p': 0.2}),
+                                              ('gnp_random_graph', {'n': 100, 'p': 0.05, 'directed': True})])
+def test_cached_graph_equals_the_generated_one(cache, generator, params):
+    fresh = generate_graph(generator, seed=4, **params)
+    assert len(os.listdir(cache)) == 1
+    cached = generate_graph(generator, seed=4, **params)
+    assert cached.is_directed() == fresh.is_directed()
+    assert list(cached.nodes()) == list(fresh.nodes())
+    assert adjacency_order(cached) == adjacency_order(fresh)
+
+
+def test_layout_is_cached_per_graph(cache):
+    graph = nx.barabasi_albert_graph(60, 2, seed=5)
+    pos = cached_layout(graph, 'spring', seed=5)
+    again = cached_layout(graph, 'spring', seed=5)
+    assert pos.keys() == again.keys()
+    assert all(np.array_equal(pos[node], again[node]) for node in pos)
+    changed = graph.copy()
+    changed.add_edge(0, 59)
+    assert graph_fingerprint(changed) != graph_fingerprint(graph)
+    cached_layout(changed, 'spring', seed=5)
+    assert len([name for name in os.listdir(cache) if name.startswith('layout-')]) == 2
+
+
+def test_no_cache_dir_disables_caching(tmp_path, monkeypatch):
+    monkeypatch.setitem(GENERAL_CONFIG, 'cache_dir', None)
+    monkeypatch.chdir(tmp_path)
+    generate_graph('barabasi_albert_graph', seed=1, n=20, m=2)
+    assert os.listdir(tmp_path) == []
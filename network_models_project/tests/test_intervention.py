@@ -0,0 +1,71 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from config import GENERAL_CONFIG
+from intervention import InterventionPlanner, cached_centrality, compute_centrality
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(GENERAL_CONFIG, 'cache_dir', str(tmp_path))
+    return tmp_path
+
+
+def planner(graph=None):
+    graph = graph if graph is not None else nx.barabasi_albert_graph(300, 2, seed=1)
+    return InterventionPlanner(graph, {'infection_prob': 0.3, 'recovery_prob': 0.1}, num_initial_infected=3,
+                               replicates=4, seed=2, max_steps=100)
+
+
+@pytest.mark.parametrize('graph', [nx.barabasi_albert_graph(200, 3, seed=1),
+                                   nx.gnp_random_graph(100, 0.03, seed=2, directed=True)]) # Has dangling nodes
+def test_pagerank_matches_the_dense_google_matrix(graph):
+    adjacency = nx.to_numpy_array(graph)
+    out_degree = adjacency.sum(axis=1)
+    n = len(adjacency)
+    # Row-stochastic transitions; dangling nodes jump anywhere, as in networkx
+    transition = np.where(out_degree[:, None] > 0, adjacency / np.maximum(out_degree, 1)[:, None], 1.0 / n)
+    google = 0.85 * transition + 0.15 / n
+    values, vectors = np.linalg.eig(google.T)
+    expected = np.real(vectors[:, np.argmax(np.real(values))])
+    np.testing.assert_allclose(compute_centrality(graph, 'pagerank'), expected / expected.sum(), atol=1e-8)
+
+
+def test_degree_and_kcore():
+    graph = nx.barabasi_albert_graph(100, 2, seed=3)
+    np.testing.assert_array_equal(compute_centrality(graph, 'degree'), [d for _, d in graph.degree()])
+    core = nx.core_number(graph)
+    np.testing.assert_array_equal(compute_centrality(graph, 'kcore'), [core[node] for node in graph.nodes()])
+    with pytest.raises(ValueError):
+        compute_centrality(graph, 'closeness')
+
+
+def test_centrality_is_cached_on_disk(cache):
+    graph = nx.barabasi_albert_graph(120, 2, seed=4)
+    values = cached_centrality(graph, 'betweenness', samples=None)
+    assert len([name for name in os.listdir(cache) if name.startswith('centrality-')]) == 1
+    expected = nx.betweenness_centrality(graph)
+    np.testing.assert_allclose(values, [expected[node] for node in graph.nodes()])
+
+
+def test_masks_remove_the_top_nodes_and_edges(cache):
+    plan = planner()
+    node_mask, edge_mask = plan.masks('degree', 0.1)
+    assert edge_mask is None and np.count_nonzero(~node_mask) == 30
+    assert plan.degree[~node_mask].min() >= plan.degree[node_mask].max()
+    _, edge_mask = plan.masks('edge_degree', 0.1)
+    removed = int(round(0.1 * plan.graph.number_of_edges()))
+    assert np.count_nonzero(~edge_mask) == 2 * removed # Both directions of every removed edge
+
+
+def test_masked_runs_share_their_random_numbers(cache):
+    plan = planner()
+    base = plan.run()
+    same = plan.run(node_mask=np.ones(plan.num_nodes, dtype=bool))
+    np.testing.assert_array_equal(base['final_size'], same['final_size'])
+    vaccinated = plan.run(*plan.masks('degree', 0.2))
+    assert vaccinated['final_size'].mean() < base['final_size'].mean()
+    assert plan.run(node_mask=np.zeros(plan.num_nodes, dtype=bool))['final_size'].max() == 0.0
@@ -0,0 +1,52 @@
+import networkx as nx
+import numpy as np
+
+from layout import barnes_hut_layout, build_quadtree, refine_layout, repulsion
+
+
+def exact_repulsion(pos, k):
+    delta = pos[:, None, :] - pos[None, :, :]
+    dist2 = np.maximum((delta ** 2).sum(axis=2), (0.01 * k) ** 2)
+    np.fill_diagonal(dist2, np.inf)
+    return (delta * (k * k / dist2)[:, :, None]).sum(axis=1)
+
+
+def test_quadtree_masses():
+    pos = np.random.default_rng(0).random((300, 2))
+    levels, _ = build_quadtree(pos, 5)
+    for _, mass, com, inverse, _, _ in levels:
+        np.testing.assert_array_equal(mass, np.bincount(inverse))
+        np.testing.assert_allclose((com * mass[:, None]).sum(axis=0) / 300, pos.mean(axis=0))
+
+
+def test_repulsion_without_approximation_is_exact():
+    pos = np.random.default_rng(1).random((200, 2))
+    np.testing.assert_allclose(repulsion(pos, 0.1, theta=0.0, depth=12), exact_repulsion(pos, 0.1), rtol=1e-9)
+
+
+def test_repulsion_approximation_error_is_small():
+    pos = np.random.default_rng(2).normal(size=(1000, 2))
+    exact = exact_repulsion(pos, 0.05)
+    error = np.linalg.norm(repulsion(pos, 0.05, theta=0.5) - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    assert np.median(error) < 0.02
+
+
+def test_layout_is_scaled_and_reproducible():
+    graph = nx.barabasi_albert_graph(300, 2, seed=3)
+    pos = barnes_hut_layout(graph, seed=3, iterations=30)
+    assert list(pos) == list(graph.nodes())
+    xy = np.array(list(pos.values()))
+    assert np.isclose(np.abs(xy).max(), 1.0) and np.allclose(xy.mean(axis=0), 0.0)
+    again = barnes_hut_layout(graph, seed=3, iterations=30)
+    assert all(np.array_equal(pos[node], again[node]) for node in pos)
+
+
+def test_refining_a_grown_graph_keeps_the_old_layout():
+    graph = nx.barabasi_albert_graph(300, 2, seed=4)
+    pos = barnes_hut_layout(graph, seed=4, iterations=50)
+    grown = graph.copy()
+    grown.add_edges_from([(300, 0), (301, 300)])
+    refined = refine_layout(grown, pos, iterations=5, seed=4)
+    assert set(refined) == set(grown.nodes())
+    moved = np.array([np.linalg.norm(refined[node] - pos[node]) for node in graph.nodes()])
+    assert np.median(moved) < 0.05
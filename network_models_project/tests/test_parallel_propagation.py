@@ -0,0 +1,52 @@
+import networkx as nx
+import numpy as np
+
+from lt_model import LinearThresholdModel
+from parallel_propagation import ParallelLinearThresholdModel, ParallelSIRModel, build_in_csr, degree_balanced_ranges
+
+
+def test_csr_lists_every_in_neighbour():
+    graph = nx.gnp_random_graph(60, 0.08, seed=1, directed=True)
+    order = list(graph.nodes())
+    indptr, indices = build_in_csr(graph, order)
+    for k, node in enumerate(order):
+        assert sorted(order[i] for i in indices[indptr[k]:indptr[k + 1]]) == sorted(graph.predecessors(node))
+
+
+def test_ranges_cover_the_nodes():
+    indptr, _ = build_in_csr(nx.barabasi_albert_graph(500, 3, seed=2), list(range(500)))
+    ranges = degree_balanced_ranges(indptr, 4)
+    assert len(ranges) == 4 and ranges[0][0] == 0 and ranges[-1][1] == 500
+    assert all(lo <= hi for lo, hi in ranges)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_sir_trajectory_does_not_depend_on_the_worker_count():
+    graph = nx.barabasi_albert_graph(2000, 3, seed=3)
+    runs = []
+    for workers in (1, 3):
+        model = ParallelSIRModel(graph, 0.08, 0.1, 'S', 'I', 'R', num_workers=workers, seed=7)
+        model.set_initial_infected_nodes(range(0, 2000, 100))
+        for t in range(1, 16):
+            model.step(t)
+        runs.append((model.i_counts, model.r_counts, model.state_array.copy()))
+        model.close()
+    assert runs[0][:2] == runs[1][:2]
+    assert np.array_equal(runs[0][2], runs[1][2])
+
+
+def test_parallel_lt_matches_the_sequential_model():
+    graph = nx.DiGraph(nx.barabasi_albert_graph(800, 2, seed=4))
+    rng = np.random.default_rng(4)
+    thresholds = dict(zip(graph.nodes(), rng.uniform(0.05, 0.4, 800).tolist()))
+    initial = list(range(0, 800, 40))
+    sequential = LinearThresholdModel(graph, thresholds)
+    sequential.set_initial_active_nodes(initial)
+    sequential.run(50)
+    parallel = ParallelLinearThresholdModel(graph, thresholds, num_workers=2)
+    parallel.set_initial_active_nodes(initial)
+    try:
+        parallel.run(50)
+        assert parallel.states == sequential.states
+    finally:
+        parallel.close()
@@ -0,0 +1,96 @@
+import threading
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import shared_path # Puts ../shared on sys.path
+import rng
+from checkpoint import load_checkpoint, run_with_checkpoints, save_checkpoint
+from checkpoint_io import CheckpointWriter, read_file, write_file
+from config import SIR_MODEL_CONFIG
+from lt_model import LinearThresholdModel
+from sir_model import SIRModel
+
+STATES = SIR_MODEL_CONFIG['states']
+
+
+def build_sir():
+    model = SIRModel(nx.barabasi_albert_graph(1500, 3, seed=1), 0.06, 0.05, STATES['susceptible'],
+                     STATES['infected'], STATES['recovered'])
+    model.set_initial_infected_nodes(range(5))
+    return model
+
+
+def test_file_round_trip(tmp_path):
+    path = str(tmp_path / 'data.ckpt')
+    arrays = {'ints': np.arange(7, dtype=np.int32), 'grid': np.random.default_rng(0).random((3, 5)),
+              'empty': np.zeros((0, 2)), 'flags': np.array([True, False, True])}
+    scalars = {'step': 4, 'name': 'x', 'nested': {'a': [1, 2]}}
+    write_file(path, scalars, dict(arrays))
+    read_scalars, read_arrays = read_file(path)
+    assert read_scalars == scalars
+    assert read_arrays.keys() == arrays.keys()
+    for name, arr in arrays.items():
+        assert read_arrays[name].dtype == arr.dtype
+        np.testing.assert_array_equal(read_arrays[name], arr)
+
+
+def test_writer_keeps_the_latest_snapshot(tmp_path):
+    path = str(tmp_path / 'latest.ckpt')
+    writer = CheckpointWriter(lambda step: ({'step': step}, {'values': np.full(4, step)}))
+    for step in range(20):
+        writer.save(path, step)
+    writer.close()
+    scalars, arrays = read_file(path)
+    assert scalars['step'] == 19 and (arrays['values'] == 19).all()
+
+
+def test_writer_converts_numpy_scalars_and_reports_errors(tmp_path):
+    path = str(tmp_path / 'scalars.ckpt')
+    writer = CheckpointWriter(lambda value: ({'x': value}, {}))
+    writer.save(path, np.int64(3))
+    writer.flush()
+    assert read_file(path)[0] == {'x': 3}
+
+    writer.save(path, object()) # Not JSON: the error must reach close() instead of stopping the thread
+    closing = threading.Thread(target=lambda: pytest.raises(TypeError, writer.close))
+    closing.start()
+    closing.join(timeout=10)
+    assert not closing.is_alive()
+    assert isinstance(writer.error, TypeError)
+
+
+def test_rejects_a_foreign_file(tmp_path):
+    path = tmp_path / 'other.ckpt'
+    path.write_bytes(b'not a checkpoint')
+    with pytest.raises(ValueError):
+        read_file(str(path))
+
+
+def test_sir_resume_matches_an_uninterrupted_run(tmp_path):
+    rng.seed_all(3)
+    full = run_with_checkpoints(build_sir(), 60, str(tmp_path / 'full.ckpt'), resume=False)
+    path = str(tmp_path / 'resume.ckpt')
+    rng.seed_all(3)
+    run_with_checkpoints(build_sir(), 30, path, every=10)
+    rng.seed_all(99) # Overwritten by the checkpoint
+    resumed = run_with_checkpoints(build_sir(), 60, path, every=10)
+    assert resumed.i_counts == full.i_counts
+    assert resumed.r_counts == full.r_counts
+    assert resumed.states == full.states
+
+
+def test_lt_state_round_trip(tmp_path):
+    graph = nx.DiGraph(nx.barabasi_albert_graph(300, 2, seed=2))
+    thresholds = dict(zip(graph.nodes(), np.random.default_rng(2).uniform(0.1, 0.5, 300).tolist()))
+    model = LinearThresholdModel(graph, thresholds)
+    model.set_initial_active_nodes(range(0, 300, 15))
+    model.step()
+    path = str(tmp_path / 'lt.ckpt')
+    save_checkpoint(path, model, step=1)
+    restored = LinearThresholdModel(graph, thresholds)
+    assert load_checkpoint(path, restored) == 1
+    assert restored.states == model.states
+    with pytest.raises(ValueError):
+        load_checkpoint(path, build_sir())
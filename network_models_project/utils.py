@@ -1,36 +1,89 @@
-\
-import matplotlib
-matplotlib.use('TkAgg')  # Set backend to avoid Qt issues
-import matplotlib.pyplot as plt
-import networkx as nx
+import weakref
+
+import shared_path # Puts ../shared on sys.path
+from plotting import pyplot, matplotlib_module
 
 def setup_plot(title, figsize=(8, 6)):
+    from config import RENDER_CONFIG
+    plt = pyplot(RENDER_CONFIG['backend'])
     fig, ax = plt.subplots(figsize=figsize)
     ax.set_title(title)
     ax.set_xticks([])
     ax.set_yticks([])
     return fig, ax
 
-def draw_network(graph, states, pos, ax, config, node_size=300, with_labels=False):
-    ax.clear()
-    
-    # Define colors based on the model type implicitly through config
+def _state_categories(graph, states, config):
+    '''Palette and per-node index into it, based on the model type implied by config.'''
     if 'threshold' in config: # Linear Threshold Model
-        colors = [config['colors']['active'] if states[node] == 1 else config['colors']['inactive'] for node in graph.nodes()]
+        palette = [config['colors']['inactive'], config['colors']['active']]
+        categories = [1 if states[node] == 1 else 0 for node in graph.nodes()]
     elif 'infection_prob' in config: # Epidemic Model (SIR)
-        color_map = {
-            config['states']['susceptible']: config['colors']['susceptible'],
-            config['states']['infected']: config['colors']['infected'],
-            config['states']['recovered']: config['colors']['recovered']
-        }
-        colors = [color_map[states[node]] for node in graph.nodes()]
+        names = ['susceptible', 'infected', 'recovered']
+        palette = [config['colors'][name] for name in names]
+        index = {config['states'][name]: i for i, name in enumerate(names)}
+        categories = [index[states[node]] for node in graph.nodes()]
     else:
-        colors = ['skyblue'] * len(graph.nodes())
+        palette = ['skyblue']
+        categories = [0] * len(graph.nodes())
+    return palette, categories
+
+# graph -> (edge count, sample size, sampled edges); an entry goes away with its graph
+_edge_samples = weakref.WeakKeyDictionary()
+
+def draw_network_density(graph, categories, palette, pos, ax):
+    """
+    Level-of-detail drawing for large graphs: a fixed-size state-density
+    image plus a bounded random sample of edges, so the cost per frame does
+    not grow with the number of nodes drawn.
+    """
+    import numpy as np
+    from density import density_image
+    from config import GENERAL_CONFIG, RENDER_CONFIG
+
+    nodes = list(graph.nodes())
+    xy = np.array([pos[node] for node in nodes], dtype=float).reshape(-1, 2)
+    lo, hi = xy.min(axis=0), xy.max(axis=0)
+    pad = 0.02 * max(float((hi - lo).max()), 1e-12)
+    extent = (lo[0] - pad, hi[0] + pad, lo[1] - pad, hi[1] + pad)
 
+    max_edges = RENDER_CONFIG['lod_max_edges']
+    num_edges = graph.number_of_edges()
+    if max_edges and num_edges:
+        # Same edges every frame (so the edge layer does not flicker), sampled again once the graph changes
+        size = min(max_edges, num_edges)
+        sample = _edge_samples.get(graph)
+        if (sample is None or sample[:2] != (num_edges, size) or
+                not all(graph.has_edge(u, v) for u, v in sample[2])):
+            rng = np.random.default_rng(GENERAL_CONFIG['random_seed'])
+            chosen = set(rng.choice(num_edges, size=size, replace=False).tolist())
+            sample = (num_edges, size, [edge for i, edge in enumerate(graph.edges()) if i in chosen])
+            _edge_samples[graph] = sample
+        segments = [(pos[u], pos[v]) for u, v in sample[2]]
+        LineCollection = matplotlib_module('collections').LineCollection
+        ax.add_collection(LineCollection(segments, colors='gray', linewidths=0.3, alpha=0.3, zorder=0))
+    image = density_image(xy, extent, RENDER_CONFIG['lod_bins'], categories, palette)
+    ax.imshow(image, extent=extent, origin='lower', interpolation='nearest', aspect='auto', zorder=1)
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+def draw_network(graph, states, pos, ax, config, node_size=300, with_labels=False):
+    from config import RENDER_CONFIG
+    title = ax.get_title()
+    ax.clear()
+    
+    # Define colors based on the model type implicitly through config
+    palette, categories = _state_categories(graph, states, config)
 
-    nx.draw(graph, pos, ax=ax, node_color=colors, node_size=node_size, 
-            with_labels=with_labels, width=0.5, alpha=0.8)
-    ax.set_title(ax.get_title()) # Keep original title after clear
+    if graph.number_of_nodes() >= RENDER_CONFIG['lod_node_threshold']:
+        draw_network_density(graph, categories, palette, pos, ax)
+    else:
+        import networkx as nx
+        colors = [palette[c] for c in categories]
+        nx.draw(graph, pos, ax=ax, node_color=colors, node_size=node_size, 
+                with_labels=with_labels, width=0.5, alpha=0.8)
+    ax.set_title(title) # Keep original title after clear
 
 def plot_sir_counts(timesteps, s_counts, i_counts, r_counts, ax_counts, title="SIR Model Dynamics"):
     ax_counts.clear()
@@ -0,0 +1,148 @@
+'''
+Checkpoint file format and background writer, used by the checkpoint.py of
+both projects (which decide what goes into a checkpoint).
+
+A checkpoint is one binary file:
+    magic (8 bytes) | header length (uint64) | JSON header | padding | arrays
+The JSON header holds scalars and, for every array, its dtype, shape and
+byte offset. Arrays are 8-byte aligned and restored as views into a single
+bulk read of the file.
+'''
+import json
+import os
+import random
+import struct
+import threading
+import numpy as np
+
+MAGIC = b'MASCKPT1'
+ALIGN = 8
+
+
+def capture_global_rng_state():
+    """The global `random` and `np.random` states as (scalars, arrays)."""
+    version, py_keys, gauss_next = random.getstate()
+    np_name, np_keys, np_pos, np_has_gauss, np_cached = np.random.get_state()
+    scalars = {'py_version': version, 'py_gauss_next': gauss_next, 'np_name': np_name, 'np_pos': int(np_pos),
+               'np_has_gauss': int(np_has_gauss), 'np_cached_gaussian': float(np_cached)}
+    arrays = {'py_rng': np.array(py_keys, dtype=np.uint32), 'np_rng': np.asarray(np_keys, dtype=np.uint32)}
+    return scalars, arrays
+
+
+def restore_global_rng_state(scalars, arrays):
+    random.setstate((scalars['py_version'], tuple(int(k) for k in arrays['py_rng']), scalars['py_gauss_next']))
+    np.random.set_state((scalars['np_name'], np.array(arrays['np_rng'], dtype=np.uint32), scalars['np_pos'],
+                         scalars['np_has_gauss'], scalars['np_cached_gaussian']))
+
+
+def _json_default(value):
+    """numpy scalars (e.g. np.int64 from an agent field) as the Python values json can write."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def write_file(path, scalars, arrays):
+    """Writes scalars and arrays atomically (temporary file, then rename)."""
+    descriptors = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        descriptors[name] = {'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': offset}
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+    header = json.dumps({'scalars': scalars, 'arrays': descriptors}, default=_json_default).encode('utf-8')
+    prefix = len(MAGIC) + 8 + len(header)
+    padding = -prefix % ALIGN
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(b'\0' * padding)
+        for arr in arrays.values():
+            f.write(arr.tobytes())
+            f.write(b'\0' * (-arr.nbytes % ALIGN))
+    os.replace(tmp_path, path)
+
+
+def read_file(path):
+    """Reads a checkpoint with a single bulk read; arrays are read-only views into it."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a checkpoint file")
+    (header_len,) = struct.unpack_from('<Q', data, len(MAGIC))
+    start = len(MAGIC) + 8
+    header = json.loads(data[start:start + header_len].decode('utf-8'))
+    base = start + header_len
+    base += -base % ALIGN
+    arrays = {}
+    for name, desc in header['arrays'].items():
+        dtype = np.dtype(desc['dtype'])
+        count = int(np.prod(desc['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=base + desc['offset']).reshape(desc['shape'])
+    return header['scalars'], arrays
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints on a background thread. save(path, *args) only calls
+    snapshot(*args), which copies the state as (scalars, arrays); if a write
+    is still running, the pending snapshot is replaced by the newer one
+    instead of queueing up behind it.
+    """
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._pending = None
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self.written = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, path, *args):
+        item = (path,) + self.snapshot(*args)
+        with self._cond:
+            self._pending = item
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                path, scalars, arrays = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                write_file(path, scalars, arrays)
+                self.written += 1
+            except Exception as e: # Kept for flush() to raise; the thread keeps serving saves
+                self.error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def flush(self):
+        """Blocks until every requested checkpoint is on disk."""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
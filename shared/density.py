@@ -0,0 +1,40 @@
+'''
+State-density images for level-of-detail rendering of large populations
+(agents in agent_simulations/render_lod.py, graph nodes in
+network_models_project/utils.py): a fixed-size 2D histogram of the points
+shown as one image, so the cost per frame does not grow with their number.
+'''
+import numpy as np
+
+from plotting import matplotlib_module
+
+
+def density_image(xy, extent, bins, categories=None, colors=None, cmap='inferno'):
+    """
+    RGBA image (rows, cols, 4), origin at the bottom left, of the points
+    binned on a bins = (cols, rows) grid over extent = (x0, x1, y0, y1).
+    Without categories the counts go through cmap; with categories (ints
+    indexing colors) each bin is the count-weighted mix of the category
+    colours. Opacity grows with the log of the count.
+    """
+    cols, rows = bins
+    x0, x1, y0, y1 = extent
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    cx = np.clip(((xy[:, 0] - x0) * (cols / max(x1 - x0, 1e-12))).astype(np.int64), 0, cols - 1)
+    cy = np.clip(((xy[:, 1] - y0) * (rows / max(y1 - y0, 1e-12))).astype(np.int64), 0, rows - 1)
+    cell = cy * cols + cx
+    image = np.zeros((rows * cols, 4))
+    if categories is None:
+        counts = np.bincount(cell, minlength=rows * cols).astype(float)
+        level = np.log1p(counts) / max(np.log1p(counts.max()), 1e-12)
+        image[:] = matplotlib_module().colormaps[cmap](level)
+    else:
+        rgba = matplotlib_module('colors').to_rgba_array(colors)
+        num = len(rgba)
+        per_category = np.bincount(np.asarray(categories, dtype=np.int64) * (rows * cols) + cell,
+                                   minlength=num * rows * cols).reshape(num, rows * cols).astype(float)
+        counts = per_category.sum(axis=0)
+        image[:, :3] = per_category.T @ rgba[:, :3] / np.maximum(counts, 1.0)[:, None]
+        level = np.log1p(counts) / max(np.log1p(counts.max()), 1e-12)
+    image[:, 3] = np.where(counts > 0, 0.25 + 0.75 * level, 0.0)
+    return image.reshape(rows, cols, 4)
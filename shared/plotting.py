@@ -0,0 +1,21 @@
+'''
+matplotlib for both projects, imported on first use only, so headless model
+runs and benchmarks never load it. Drawing code gets pyplot and any other
+matplotlib module it needs through here instead of importing them itself.
+'''
+import importlib
+import os
+
+
+def pyplot(backend=None):
+    """matplotlib.pyplot; backend (e.g. 'TkAgg') is selected first unless MPLBACKEND already picks one."""
+    import matplotlib
+    if backend and 'MPLBACKEND' not in os.environ:
+        matplotlib.use(backend)
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def matplotlib_module(name=None):
+    """matplotlib, or matplotlib.<name> (animation, patches, colors, ...)."""
+    return importlib.import_module('matplotlib' if name is None else 'matplotlib.' + name)
@@ -0,0 +1,207 @@
+'''
+Named random number streams for the models of both projects.
+
+Models draw from a named stream of an RNGService instead of the global
+`random` / `np.random` state. A stream is a numpy Generator (PCG64) seeded
+from SeedSequence(seed, spawn_key=(crc32(name), worker)), so its values
+depend only on the service seed, the stream name and the worker key - not
+on the order streams are created in, nor on which thread or process uses
+them. Parallel code keys its streams by a logical unit of work (a run of an
+ensemble, a partition of the nodes) rather than by an OS thread or process,
+and the trajectory is then the same for any number of threads or processes.
+
+A DrawBlock hands out uniform [0, 1) draws from a buffer refilled
+block_size values at a time, so hot loops take a slice of an array instead
+of calling the generator per draw. Consecutive Generator.random calls form
+one sequence, so the values drawn do not depend on the block size.
+
+The module-level service is seeded from GENERAL_CONFIG['random_seed'] on
+first use; seed_all() replaces it, use_service() swaps in another one (e.g.
+one per simulation). Models fetch their stream when they are built, so
+these only affect models built afterwards, while agents look their streams
+up on every draw. A model built without an explicit stream takes
+instance_draws(class name): a DrawBlock of its own on the next worker key
+of that name, counted per name, so two models never share a stream and a
+run that builds its models in the same order draws the same values. The
+service does not keep these blocks - the model does, and a model that is
+collected frees its buffer - so they are not part of the service state.
+'''
+import zlib
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 4096
+
+
+class DrawBlock:
+    """Uniform [0, 1) draws from one generator, generated block_size at a time. Not thread-safe."""
+    def __init__(self, generator, block_size=DEFAULT_BLOCK_SIZE):
+        self.generator = generator
+        self.block_size = block_size
+        self.buffer = np.empty(0)
+        self.pos = 0
+
+    def _refill(self, needed):
+        rest = self.buffer[self.pos:]
+        count = max(self.block_size, needed - len(rest))
+        # A new array each time, so slices handed out earlier stay valid
+        self.buffer = np.concatenate((rest, self.generator.random(count))) if len(rest) else self.generator.random(count)
+        self.pos = 0
+
+    def take(self, n):
+        """The next n draws as a float array (a read-only view; copy it to modify)."""
+        if self.pos + n > len(self.buffer):
+            self._refill(n)
+        out = self.buffer[self.pos:self.pos + n]
+        self.pos += n
+        out.flags.writeable = False
+        return out
+
+    def random(self):
+        if self.pos >= len(self.buffer):
+            self._refill(1)
+        value = self.buffer.item(self.pos)
+        self.pos += 1
+        return value
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        if size is None:
+            return low + (high - low) * self.random()
+        return low + (high - low) * self.take(size)
+
+    def get_state(self):
+        """(scalars, arrays): the generator state and the draws not yet handed out."""
+        return ({'bit_generator': self.generator.bit_generator.state, 'block_size': self.block_size},
+                {'buffer': self.buffer[self.pos:].copy()})
+
+    def set_state(self, scalars, arrays):
+        self.generator.bit_generator.state = scalars['bit_generator']
+        self.block_size = scalars['block_size']
+        self.buffer = np.array(arrays['buffer'], dtype=float)
+        self.pos = 0
+
+
+class RNGService:
+    def __init__(self, seed=None, block_size=DEFAULT_BLOCK_SIZE):
+        self.seed = int(seed) if seed is not None else int(np.random.SeedSequence().entropy)
+        self.block_size = block_size
+        self._blocks = {} # (name, worker) -> DrawBlock
+        self._instances = {} # name -> worker keys handed out by instance_draws
+
+    def generator(self, name, worker=0):
+        """A fresh Generator for stream (name, worker); the same values every time it is asked for."""
+        seq = np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(name.encode('utf-8')), int(worker)))
+        return np.random.Generator(np.random.PCG64(seq))
+
+    def draws(self, name, worker=0):
+        """The DrawBlock of stream (name, worker), shared by everyone who asks this service for it."""
+        key = (name, int(worker))
+        block = self._blocks.get(key)
+        if block is None:
+            block = self._blocks[key] = DrawBlock(self.generator(name, worker), self.block_size)
+        return block
+
+    def instance_draws(self, name):
+        """A new DrawBlock on the next worker key of name, for one model's sole use; the service does not keep it."""
+        worker = self._instances.get(name, 0)
+        while (name, worker) in self._blocks: # Keys already shared through draws()
+            worker += 1
+        self._instances[name] = worker + 1
+        return DrawBlock(self.generator(name, worker), self.block_size)
+
+    def get_state(self):
+        """(scalars, arrays) of every stream handed out so far, for checkpoint.py."""
+        streams, arrays = [], {}
+        for i, ((name, worker), block) in enumerate(self._blocks.items()):
+            block_scalars, block_arrays = block.get_state()
+            streams.append({'name': name, 'worker': worker, **block_scalars})
+            arrays[f'buffer{i}'] = block_arrays['buffer']
+        return {'seed': self.seed, 'streams': streams, 'instances': dict(self._instances)}, arrays
+
+    def set_state(self, scalars, arrays):
+        """Restores the streams in place, so models holding a DrawBlock see the restored state."""
+        self.seed = scalars['seed']
+        self._instances.update(scalars.get('instances', {}))
+        for i, stream in enumerate(scalars['streams']):
+            self.draws(stream['name'], stream['worker']).set_state(stream, {'buffer': arrays[f'buffer{i}']})
+
+
+_service = None
+
+
+def service():
+    global _service
+    if _service is None:
+        from config import GENERAL_CONFIG
+        _service = RNGService(GENERAL_CONFIG.get('random_seed'))
+    return _service
+
+
+def seed_all(seed=None):
+    """Replaces the module-level service; seed defaults to GENERAL_CONFIG['random_seed']."""
+    global _service
+    if seed is None:
+        from config import GENERAL_CONFIG
+        seed = GENERAL_CONFIG.get('random_seed')
+    _service = RNGService(seed)
+    return _service
+
+
+def use_service(new_service):
+    """Makes new_service the module-level service; returns the previous one (which may be None)."""
+    global _service
+    previous, _service = _service, new_service
+    return previous
+
+
+def draws(name, worker=0):
+    return service().draws(name, worker)
+
+
+def instance_draws(name):
+    return service().instance_draws(name)
+
+
+def generator(name, worker=0):
+    return service().generator(name, worker)
+
+
+def _unit_of_work(streams, unit, draws_per_unit):
+    '''Stand-in for a worker's share of a step: consumes its own stream in uneven pieces.'''
+    block = streams.draws('benchmark', unit)
+    total, taken = 0.0, 0
+    while taken < draws_per_unit:
+        n = min(1 + taken % 97, draws_per_unit - taken)
+        total += float(block.take(n).sum())
+        taken += n
+    return total
+
+
+def benchmark(num_draws=1_000_000, num_units=64):
+    """Draw throughput of scalar calls vs. blocks, and results for 1 vs. several threads."""
+    import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def timed(label, fn, count):
+        start = time.perf_counter()
+        fn(count)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<28} {elapsed * 1e9 / count:6.1f} ns/draw")
+
+    block = RNGService(0).draws('benchmark')
+    timed('random.random()', lambda count: [random.random() for _ in range(count)], num_draws)
+    timed('np.random.rand()', lambda count: [np.random.rand() for _ in range(count)], num_draws // 10)
+    timed('DrawBlock.random()', lambda count: [block.random() for _ in range(count)], num_draws)
+    timed('DrawBlock.take(1000)', lambda count: [block.take(1000) for _ in range(count // 1000)], num_draws)
+
+    per_unit = num_draws // num_units
+    results = {}
+    for threads in (1, 4):
+        streams = RNGService(0)
+        with ThreadPoolExecutor(threads) as pool:
+            results[threads] = list(pool.map(lambda unit: _unit_of_work(streams, unit, per_unit), range(num_units)))
+    print(f"{num_units} units of work, 1 vs 4 threads: {'identical' if results[1] == results[4] else 'DIFFERENT'}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The shared modules are imported by name, as the projects do through their shared_path.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
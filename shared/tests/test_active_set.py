@@ -0,0 +1,23 @@
+from active_set import ActiveSet
+
+
+def test_members_come_in_entity_order():
+    entities = ['d', 'a', 'c', 'b', 'e']
+    active = ActiveSet(entities, ['e', 'a'])
+    active.wake('b')
+    active.wake_many(['d', 'a'])
+    assert active.members() == ['d', 'a', 'b', 'e']
+    assert len(active) == 4 and 'b' in active and 'c' not in active
+
+
+def test_sleep_reset_and_visits():
+    active = ActiveSet(range(10))
+    active.wake_all()
+    active.sleep(3)
+    active.sleep_many([0, 9])
+    assert active.members() == [1, 2, 4, 5, 6, 7, 8]
+    active.reset([7, 2])
+    members = active.members()
+    active.wake(0) # Changing the set does not change a list already handed out
+    assert members == [2, 7] and active.members() == [0, 2, 7]
+    assert active.visits == 7 + 2 + 3
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from rng import DrawBlock, RNGService, _unit_of_work
+
+
+def test_draws_do_not_depend_on_the_block_size():
+    values = []
+    for block_size in (1, 7, 4096):
+        block = RNGService(5, block_size=block_size).draws('model')
+        values.append(np.concatenate([block.take(n).copy() for n in (3, 1, 20, 9)] + [[block.random()]]))
+    assert np.array_equal(values[0], values[1]) and np.array_equal(values[0], values[2])
+
+
+def test_streams_depend_on_seed_name_and_worker_only():
+    a, b = RNGService(1), RNGService(1)
+    b.draws('other') # Creation order does not matter
+    assert np.array_equal(a.draws('model', 3).take(5), b.draws('model', 3).take(5))
+    assert not np.array_equal(a.generator('model', 0).random(5), a.generator('model', 1).random(5))
+    assert not np.array_equal(RNGService(2).generator('model').random(5), a.generator('model').random(5))
+
+
+def test_instance_draws_are_distinct_and_in_build_order():
+    service = RNGService(3)
+    first, second = service.instance_draws('SIRModel'), service.instance_draws('SIRModel')
+    assert first is not second
+    assert np.array_equal(first.take(5), service.generator('SIRModel', 0).random(5))
+    assert np.array_equal(second.take(5), service.generator('SIRModel', 1).random(5))
+    shared = service.draws('SIRModel', 2) # Keys shared through draws() are skipped
+    assert np.array_equal(service.instance_draws('SIRModel').take(5), service.generator('SIRModel', 3).random(5))
+    assert shared is service.draws('SIRModel', 2)
+
+
+def test_instance_draws_are_not_kept_by_the_service():
+    import gc
+    import weakref
+    service = RNGService(3)
+    block = weakref.ref(service.instance_draws('SIRModel'))
+    gc.collect()
+    assert block() is None
+    assert service.get_state()[0]['streams'] == []
+
+
+def test_results_do_not_depend_on_the_number_of_threads():
+    def run(threads):
+        service = RNGService(9, block_size=64)
+        with ThreadPoolExecutor(threads) as pool:
+            return list(pool.map(lambda unit: _unit_of_work(service, unit, 1000), range(16)))
+    assert run(1) == run(4)
+
+
+def test_state_round_trip_includes_the_buffered_draws():
+    service = RNGService(4, block_size=16)
+    block = service.draws('model')
+    block.take(5)
+    scalars, arrays = service.get_state()
+    expected = block.take(40).copy()
+    restored = RNGService(0)
+    held = restored.draws('model') # A model holding the block sees the restored state
+    restored.set_state(scalars, arrays)
+    assert restored.seed == 4 and np.array_equal(held.take(40), expected)
+
+
+def test_take_returns_read_only_views():
+    block = DrawBlock(np.random.default_rng(0), block_size=8)
+    out = block.take(4)
+    assert not out.flags.writeable
+    assert np.all((out >= 0) & (out < 1))
@@ -0,0 +1,112 @@
+'''
+Local test client for the simulation server. Subscribes to every hosted
+simulation, mirrors their state from keyframes and deltas, exercises
+pause/resume and a runtime parameter change, and prints a summary.
+'''
+import asyncio
+import json
+import time
+import numpy as np
+
+from protocol import (MSG_COMMAND, MSG_REPLY, MSG_KEYFRAME, MSG_DELTA, encode_json, decode_json,
+                      decode_frame, read_message)
+from config import SERVER_CONFIG, CLIENT_CONFIG
+
+
+class SimulationClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.states = {}       # sim id -> mirrored state array
+        self.steps = {}        # sim id -> last step received
+        self.frames = {}       # sim id -> frames received
+        self.bytes_received = 0
+        self._replies = asyncio.Queue()
+        self._frame_event = asyncio.Event()
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    @classmethod
+    async def connect(cls, host=None, port=None):
+        reader, writer = await asyncio.open_connection(host or SERVER_CONFIG['host'], port or SERVER_CONFIG['port'])
+        return cls(reader, writer)
+
+    async def command(self, cmd, **kwargs):
+        kwargs['cmd'] = cmd
+        self.writer.write(encode_json(MSG_COMMAND, kwargs))
+        await self.writer.drain()
+        return await self._replies.get()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                body = await read_message(self.reader)
+                self.bytes_received += len(body) + 4
+                if body[0] == MSG_REPLY:
+                    self._replies.put_nowait(decode_json(body))
+                elif body[0] in (MSG_KEYFRAME, MSG_DELTA):
+                    self._apply_frame(body)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def _apply_frame(self, body):
+        msg_type, sim_id, step, kind, indices, values = decode_frame(body)
+        if msg_type == MSG_KEYFRAME:
+            self.states[sim_id] = values.copy()
+        elif sim_id in self.states:
+            self.states[sim_id][indices] = values
+        else:
+            return # Delta before our keyframe; the server will send a keyframe
+        self.steps[sim_id] = step
+        self.frames[sim_id] = self.frames.get(sim_id, 0) + 1
+        self._frame_event.set()
+
+    async def wait_frames(self, total):
+        while sum(self.frames.values()) < total:
+            self._frame_event.clear()
+            await self._frame_event.wait()
+
+    async def close(self):
+        self._reader_task.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_test_client(num_frames=None, pause_after=None):
+    num_frames = num_frames or CLIENT_CONFIG['num_frames']
+    pause_after = pause_after or CLIENT_CONFIG['pause_after_frames']
+    client = await SimulationClient.connect()
+    start = time.perf_counter()
+
+    sims = (await client.command('list'))['simulations']
+    if not sims:
+        sims = [(await client.command('create', model='boids', seed=1))['simulation']]
+    for sim in sims:
+        await client.command('subscribe', sim=sim['id'])
+        print(f"Subscribed to {sim['id']}: {sim['model']} {json.dumps(sim['params'])}")
+
+    await client.wait_frames(pause_after)
+    target = sims[0]
+    await client.command('pause', sim=target['id'])
+    paused_step = client.steps.get(target['id'])
+    if target['params']:
+        name, value = next(iter(target['params'].items()))
+        reply = await client.command('set_param', sim=target['id'], name=name, value=value * 1.5)
+        print(f"set_param {name} on {target['id']}: {reply['ok']}")
+    await asyncio.sleep(0.5)
+    print(f"Sim {target['id']} paused at step {paused_step}, still at {client.steps.get(target['id'])}")
+    await client.command('resume', sim=target['id'])
+
+    await client.wait_frames(num_frames)
+    elapsed = time.perf_counter() - start
+    for sim in (await client.command('list'))['simulations']:
+        state = client.states.get(sim['id'])
+        summary = ''
+        if state is not None and state.ndim == 1:
+            summary = f"state counts {np.bincount(state).tolist()}"
+        print(f"Sim {sim['id']} ({sim['model']}): {client.frames.get(sim['id'], 0)} frames, "
+              f"server step {sim['step']}, mirrored step {client.steps.get(sim['id'])} {summary}")
+    print(f"Received {client.bytes_received} bytes in {elapsed:.2f}s")
+    await client.close()
+
+if __name__ == '__main__':
+    asyncio.run(run_test_client())
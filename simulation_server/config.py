@@ -0,0 +1,27 @@
+'''
+Configuration settings for the multi-simulation server.
+Model parameters default to the values in agent_simulations/config.py and
+network_models_project/config.py; anything given here or at creation time
+overrides them.
+'''
+
+SERVER_CONFIG = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'num_workers': 2,           # Process pool size for CPU-heavy steps
+    'subscriber_queue_size': 32, # Frames buffered per client before deltas are dropped
+    'default_interval': 0.05,   # Seconds between published frames of one simulation
+    'default_steps_per_tick': 1,
+    'initial_simulations': [    # Created when the server starts
+        {'model': 'boids', 'seed': 1},
+        {'model': 'pedestrians', 'seed': 2},
+        {'model': 'pursuit_evasion', 'seed': 3},
+        {'model': 'sir', 'seed': 4, 'interval': 0.2},
+        {'model': 'lt', 'seed': 5, 'interval': 0.5},
+    ],
+}
+
+CLIENT_CONFIG = {
+    'num_frames': 200,          # Frames to receive before the test client disconnects
+    'pause_after_frames': 50,   # Exercise pause/resume and a runtime parameter change
+}
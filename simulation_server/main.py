@@ -0,0 +1,26 @@
+import asyncio
+
+from server import SimulationServer
+from config import SERVER_CONFIG
+
+async def run_server():
+    server = SimulationServer()
+    await server.start()
+    for spec in SERVER_CONFIG['initial_simulations']:
+        spec = dict(spec)
+        slot = server.add_simulation(spec.pop('model'), **spec)
+        print(f"Simulation {slot.sim_id}: {slot.sim.name}")
+    print(f"Serving on {server.host}:{server.port} (Ctrl+C to stop)")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+def main():
+    try:
+        asyncio.run(run_server())
+    except KeyboardInterrupt:
+        print("\nExiting.")
+
+if __name__ == '__main__':
+    main()
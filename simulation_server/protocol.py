@@ -0,0 +1,80 @@
+'''
+Wire format shared by the simulation server and its clients.
+
+Every message is a 4-byte big-endian length followed by the body. The first
+byte of the body is the message type:
+    COMMAND   client -> server, UTF-8 JSON  {"cmd": ..., ...}
+    REPLY     server -> client, UTF-8 JSON  {"ok": bool, ...}
+    KEYFRAME  server -> client, full state of one simulation
+    DELTA     server -> client, only the entries that changed since the last frame
+
+State frames carry a fixed header (see FRAME_HEADER) followed by
+`count` uint32 indices (DELTA only) and `count` values: float32 (x, y)
+pairs for agent simulations, uint8 states for network simulations.
+'''
+import json
+import struct
+import numpy as np
+
+MSG_COMMAND = 0x01
+MSG_REPLY = 0x02
+MSG_KEYFRAME = 0x10
+MSG_DELTA = 0x11
+
+KIND_POSITIONS = 0 # float32 (x, y) per agent
+KIND_STATES = 1    # uint8 state per node
+
+FRAME_HEADER = struct.Struct('<BIIBI') # msg type, sim id, step, kind, count
+LENGTH_PREFIX = struct.Struct('>I')
+
+
+def pack(body):
+    return LENGTH_PREFIX.pack(len(body)) + body
+
+
+async def read_message(reader):
+    """Reads one length-prefixed message body; raises asyncio.IncompleteReadError on EOF."""
+    header = await reader.readexactly(LENGTH_PREFIX.size)
+    (length,) = LENGTH_PREFIX.unpack(header)
+    return await reader.readexactly(length)
+
+
+def encode_json(msg_type, payload):
+    return pack(bytes([msg_type]) + json.dumps(payload).encode('utf-8'))
+
+
+def decode_json(body):
+    return json.loads(body[1:].decode('utf-8'))
+
+
+def encode_keyframe(sim_id, step, kind, values):
+    values = _as_wire_values(kind, values)
+    header = FRAME_HEADER.pack(MSG_KEYFRAME, sim_id, step, kind, len(values))
+    return pack(header + values.tobytes())
+
+
+def encode_delta(sim_id, step, kind, indices, values):
+    values = _as_wire_values(kind, values)
+    header = FRAME_HEADER.pack(MSG_DELTA, sim_id, step, kind, len(values))
+    return pack(header + np.asarray(indices, dtype='<u4').tobytes() + values.tobytes())
+
+
+def decode_frame(body):
+    """Returns (msg_type, sim_id, step, kind, indices or None, values)."""
+    msg_type, sim_id, step, kind, count = FRAME_HEADER.unpack_from(body)
+    offset = FRAME_HEADER.size
+    indices = None
+    if msg_type == MSG_DELTA:
+        indices = np.frombuffer(body, dtype='<u4', count=count, offset=offset)
+        offset += 4 * count
+    if kind == KIND_POSITIONS:
+        values = np.frombuffer(body, dtype='<f4', count=2 * count, offset=offset).reshape(count, 2)
+    else:
+        values = np.frombuffer(body, dtype='u1', count=count, offset=offset)
+    return msg_type, sim_id, step, kind, indices, values
+
+
+def _as_wire_values(kind, values):
+    if kind == KIND_POSITIONS:
+        return np.ascontiguousarray(values, dtype='<f4').reshape(-1, 2)
+    return np.ascontiguousarray(values, dtype='u1')
@@ -0,0 +1,245 @@
+'''
+Asyncio server hosting several simulations at once.
+
+Every simulation runs in its own task: it advances the model (in the process
+pool when the model is CPU-heavy), diffs the new state against the last
+published one and broadcasts a compact binary delta to its subscribers.
+Each subscriber has a bounded frame queue; when a client cannot keep up its
+deltas are dropped and it is resynchronised with a keyframe once the queue
+has room again, so a slow client never stalls the simulations.
+'''
+import asyncio
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from protocol import (MSG_COMMAND, MSG_REPLY, KIND_POSITIONS, read_message, encode_json, decode_json,
+                      encode_keyframe, encode_delta)
+from simulations import create_simulation, advance_simulation
+from config import SERVER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.sims = set()
+        self.needs_keyframe = set() # Sim ids whose deltas were dropped (or that were just subscribed)
+        self.dropped_frames = 0
+        self.sender = asyncio.create_task(self._send_loop())
+
+    def offer(self, slot, delta_frame):
+        """Queues the sim's next frame for this client without ever blocking the simulation."""
+        if self.queue.full():
+            self.dropped_frames += 1
+            self.needs_keyframe.add(slot.sim_id)
+            return
+        if slot.sim_id in self.needs_keyframe:
+            self.needs_keyframe.discard(slot.sim_id)
+            self.queue.put_nowait(slot.keyframe())
+        elif delta_frame is not None:
+            self.queue.put_nowait(delta_frame)
+
+    async def send_now(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def _send_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                self.writer.write(frame)
+                await self.writer.drain() # Backpressure: waits while the socket buffer is full
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def close(self):
+        self.sender.cancel()
+        self.writer.close()
+
+
+class SimulationSlot:
+    '''A hosted simulation plus its scheduling state.'''
+    def __init__(self, sim_id, sim, interval, steps_per_tick):
+        self.sim_id = sim_id
+        self.sim = sim
+        self.interval = float(interval)
+        self.steps_per_tick = int(steps_per_tick)
+        self.running = asyncio.Event()
+        self.running.set()
+        self.subscribers = set()
+        self.pending_params = [] # Changes requested while a step is in flight
+        self.in_flight = False
+        self.last_state = None
+        self.last_error = None # Of the most recent tick that failed
+        self.task = None
+
+    def keyframe(self):
+        return encode_keyframe(self.sim_id, self.sim.step_count, self.sim.kind, self.last_state)
+
+    def info(self):
+        info = self.sim.info()
+        info.update({'id': self.sim_id, 'paused': not self.running.is_set(), 'interval': self.interval,
+                     'steps_per_tick': self.steps_per_tick, 'subscribers': len(self.subscribers),
+                     'error': self.last_error})
+        return info
+
+
+class SimulationServer:
+    def __init__(self, host=None, port=None, num_workers=None, queue_size=None):
+        self.host = host or SERVER_CONFIG['host']
+        self.port = port or SERVER_CONFIG['port']
+        self.queue_size = queue_size or SERVER_CONFIG['subscriber_queue_size']
+        self.pool = ProcessPoolExecutor(max_workers=num_workers or SERVER_CONFIG['num_workers'])
+        self.slots = {}
+        self._ids = itertools.count(1)
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        return self._server
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        for slot in list(self.slots.values()):
+            self.remove_simulation(slot.sim_id)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.pool.shutdown(cancel_futures=True)
+
+    # -- Simulation management -------------------------------------------------
+
+    def add_simulation(self, model, params=None, seed=None, interval=None, steps_per_tick=None, offload=None):
+        sim = create_simulation(model, params, seed)
+        if offload is not None:
+            sim.offload = bool(offload)
+        slot = SimulationSlot(next(self._ids), sim,
+                              interval if interval is not None else SERVER_CONFIG['default_interval'],
+                              steps_per_tick or SERVER_CONFIG['default_steps_per_tick'])
+        slot.last_state = sim.state_array()
+        self.slots[slot.sim_id] = slot
+        slot.task = asyncio.create_task(self._run_slot(slot))
+        return slot
+
+    def remove_simulation(self, sim_id):
+        slot = self.slots.pop(sim_id)
+        slot.task.cancel()
+        for sub in slot.subscribers:
+            sub.sims.discard(sim_id)
+
+    async def _run_slot(self, slot):
+        loop = asyncio.get_running_loop()
+        while not slot.sim.finished:
+            await slot.running.wait()
+            # A failing tick is logged and skipped; the simulation keeps its last good state and goes on
+            try:
+                slot.in_flight = True
+                try:
+                    if slot.sim.offload:
+                        slot.sim = await loop.run_in_executor(self.pool, advance_simulation, slot.sim,
+                                                              slot.steps_per_tick)
+                    else:
+                        slot.sim.advance(slot.steps_per_tick)
+                finally:
+                    slot.in_flight = False
+                pending, slot.pending_params = slot.pending_params, []
+                for name, value in pending:
+                    slot.sim.set_param(name, value)
+                self._publish(slot)
+            except Exception as e:
+                slot.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Simulation %d (%s): tick failed", slot.sim_id, slot.sim.name)
+            await asyncio.sleep(slot.interval)
+
+    def _publish(self, slot):
+        state = slot.sim.state_array()
+        if slot.sim.kind == KIND_POSITIONS:
+            changed = np.flatnonzero(np.any(state != slot.last_state, axis=1))
+        else:
+            changed = np.flatnonzero(state != slot.last_state)
+        slot.last_state = state
+        delta = None
+        if len(changed) > 0:
+            delta = encode_delta(slot.sim_id, slot.sim.step_count, slot.sim.kind, changed, state[changed])
+        for sub in list(slot.subscribers):
+            sub.offer(slot, delta)
+
+    # -- Client protocol -------------------------------------------------------
+
+    async def _handle_client(self, reader, writer):
+        sub = Subscriber(writer, self.queue_size)
+        try:
+            while True:
+                body = await read_message(reader)
+                if not body or body[0] != MSG_COMMAND:
+                    await sub.send_now(encode_json(MSG_REPLY, {'ok': False, 'error': 'expected a command'}))
+                    continue
+                command = {}
+                try:
+                    command = decode_json(body)
+                    if not isinstance(command, dict):
+                        command = {}
+                        raise TypeError("a command must be a JSON object")
+                    reply = self._execute(sub, command)
+                    reply['ok'] = True
+                except (KeyError, ValueError, TypeError) as e: # json.JSONDecodeError is a ValueError
+                    reply = {'ok': False, 'error': str(e)}
+                reply['cmd'] = command.get('cmd')
+                await sub.send_now(encode_json(MSG_REPLY, reply))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for sim_id in sub.sims:
+                if sim_id in self.slots:
+                    self.slots[sim_id].subscribers.discard(sub)
+            sub.close()
+
+    def _execute(self, sub, command):
+        cmd = command.get('cmd')
+        if cmd == 'list':
+            return {'simulations': [slot.info() for slot in self.slots.values()]}
+        if cmd == 'create':
+            slot = self.add_simulation(command['model'], command.get('params'), command.get('seed'),
+                                       command.get('interval'), command.get('steps_per_tick'),
+                                       command.get('offload'))
+            return {'simulation': slot.info()}
+        if cmd == 'stop':
+            self.remove_simulation(command['sim'])
+            return {}
+
+        slot = self.slots[command['sim']]
+        if cmd == 'subscribe':
+            slot.subscribers.add(sub)
+            sub.sims.add(slot.sim_id)
+            sub.needs_keyframe.add(slot.sim_id)
+            sub.offer(slot, None) # Send the current state right away
+        elif cmd == 'unsubscribe':
+            slot.subscribers.discard(sub)
+            sub.sims.discard(slot.sim_id)
+        elif cmd == 'pause':
+            slot.running.clear()
+        elif cmd == 'resume':
+            slot.running.set()
+        elif cmd == 'set_param':
+            name, value = command['name'], command['value']
+            if name == 'interval':
+                slot.interval = float(value)
+            elif name == 'steps_per_tick':
+                slot.steps_per_tick = max(1, int(value))
+            elif slot.in_flight:
+                # Checked now, so a change applied when the step returns cannot fail
+                slot.pending_params.append((name, slot.sim.validate_param(name, value)))
+            else:
+                slot.sim.set_param(name, value)
+        else:
+            raise ValueError(f"Unknown command '{cmd}'")
+        return {'simulation': slot.info()}
@@ -0,0 +1,339 @@
+'''
+Adapters that wrap the existing models behind one interface the server can
+drive: advance(n) steps, state_array() for streaming and set_param() for
+runtime changes. Adapters are plain picklable objects so that a step can be
+shipped to a worker process and the advanced adapter shipped back.
+'''
+import importlib.util
+import math
+import os
+import random
+import sys
+import numpy as np
+
+import networkx as nx
+
+from protocol import KIND_POSITIONS, KIND_STATES
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT_DIR = os.path.join(ROOT_DIR, 'agent_simulations')
+NETWORK_DIR = os.path.join(ROOT_DIR, 'network_models_project')
+SHARED_DIR = os.path.join(ROOT_DIR, 'shared')
+
+# The model modules use flat sibling imports. Only agent_simulations ships a
+# utils.py that models import, so it goes first; both come after this directory.
+# Modules common to both projects (rng.py, ...) live once in shared/.
+for _path in (SHARED_DIR, NETWORK_DIR, AGENT_DIR):
+    if _path not in sys.path:
+        sys.path.insert(1, _path)
+
+from boid import Boid
+from pedestrian import Pedestrian
+from actors import Evader, Pursuer
+from obstacles import ObstacleBVH
+from navigation import NavigationGrid
+from sir_model import SIRModel
+from lt_model import LinearThresholdModel
+import population
+import rng
+
+
+def _load_config(directory, alias):
+    '''Loads a project's config.py under an alias; both projects call it "config".'''
+    spec = importlib.util.spec_from_file_location(alias, os.path.join(directory, 'config.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+agent_config = _load_config(AGENT_DIR, 'agent_config')
+network_config = _load_config(NETWORK_DIR, 'network_config')
+
+
+class Simulation:
+    '''Base adapter. Subclasses build the model in _build and advance it in _step.'''
+    kind = KIND_POSITIONS
+    defaults = {}
+    tunable = ()  # Parameters that may be changed while running
+    bounds = {}  # Allowed (low, high) of a tunable parameter; unlisted ones must be positive
+    offload = True  # Step in the process pool; tiny models are cheaper to step inline
+
+    def __init__(self, params=None, seed=None):
+        self.params = dict(self.defaults)
+        self.params.update(params or {})
+        self.seed = seed
+        self.step_count = 0
+        self.finished = False
+        # Each simulation owns its RNG streams (global ones and an rng.py
+        # service) so results do not depend on which worker process happens
+        # to run a step. Its agents live in its own population, so pickling
+        # it does not carry the agents of other simulations along.
+        self.streams = rng.RNGService(seed)
+        self.population = population.Population()
+        outer = (random.getstate(), np.random.get_state(), rng.use_service(self.streams),
+                 population.use_population(self.population))
+        random.seed(seed)
+        np.random.seed(seed)
+        self._build()
+        self._rng_states = (random.getstate(), np.random.get_state())
+        random.setstate(outer[0])
+        np.random.set_state(outer[1])
+        rng.use_service(outer[2])
+        population.use_population(outer[3])
+
+    def advance(self, num_steps):
+        outer = (random.getstate(), np.random.get_state(), rng.use_service(self.streams),
+                 population.use_population(self.population))
+        random.setstate(self._rng_states[0])
+        np.random.set_state(self._rng_states[1])
+        for _ in range(num_steps):
+            if self.finished:
+                break
+            self._step()
+            self.step_count += 1
+        self._rng_states = (random.getstate(), np.random.get_state())
+        random.setstate(outer[0])
+        np.random.set_state(outer[1])
+        rng.use_service(outer[2])
+        population.use_population(outer[3])
+        return self
+
+    def validate_param(self, name, value):
+        """The value set_param would store, as a float; raises KeyError/ValueError/TypeError if it is not allowed."""
+        if name not in self.tunable:
+            raise KeyError(f"Parameter '{name}' cannot be changed at runtime (tunable: {', '.join(self.tunable)})")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"Parameter '{name}' must be a number, got {value!r}")
+        value = float(value)
+        low, high = self.bounds.get(name, (0.0, math.inf))
+        if not math.isfinite(value) or not low <= value <= high or (name not in self.bounds and value == 0):
+            raise ValueError(f"Parameter '{name}' out of range: {value}")
+        return value
+
+    def set_param(self, name, value):
+        value = self.validate_param(name, value)
+        self.params[name] = value
+        self._apply_param(name, value)
+
+    def info(self):
+        return {'model': self.name, 'step': self.step_count, 'finished': self.finished,
+                'params': {k: self.params[k] for k in self.tunable}}
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _step(self):
+        raise NotImplementedError
+
+    def _apply_param(self, name, value):
+        pass
+
+    def state_array(self):
+        raise NotImplementedError
+
+
+class BoidsSimulation(Simulation):
+    name = 'boids'
+    defaults = dict(agent_config.BOIDS_CONFIG, width=agent_config.GENERAL_CONFIG['width'],
+                    height=agent_config.GENERAL_CONFIG['height'])
+    tunable = ('separation_factor', 'alignment_factor', 'cohesion_factor', 'perception_radius', 'max_speed')
+
+    def _build(self):
+        p = self.params
+        self.boids = [Boid(random.uniform(0, p['width']), random.uniform(0, p['height']),
+                           max_speed=p['max_speed'], max_force=p['max_force'],
+                           perception_radius=p['perception_radius'],
+                           sep_factor=p['separation_factor'], ali_factor=p['alignment_factor'],
+                           coh_factor=p['cohesion_factor'])
+                      for _ in range(p['num_agents'])]
+
+    def _step(self):
+        for boid in self.boids:
+            boid.flock(self.boids)
+            boid.update()
+            boid.edges(self.params['width'], self.params['height'])
+
+    def _apply_param(self, name, value):
+        for boid in self.boids:
+            setattr(boid, name, float(value))
+
+    def state_array(self):
+        return np.array([b.position for b in self.boids])
+
+
+class PedestrianSimulation(Simulation):
+    name = 'pedestrians'
+    defaults = dict(agent_config.PEDESTRIAN_CONFIG, width=agent_config.GENERAL_CONFIG['width'],
+                    height=agent_config.GENERAL_CONFIG['height'])
+    tunable = ('max_speed', 'max_force')
+
+    def _build(self):
+        p = self.params
+        width, height = p['width'], p['height']
+        obs_cfg = p['obstacle_settings']
+        circles = []
+        for _ in range(obs_cfg['num_static_obstacles']):
+            pos = np.random.rand(2) * [width * 0.8, height * 0.8] + [width * 0.1, height * 0.1]
+            circles.append({'position': pos, 'radius': random.uniform(obs_cfg['min_radius'], obs_cfg['max_radius'])})
+        self.obstacles = ObstacleBVH(circles)
+
+        nav_cfg = p.get('navigation', {})
+        navigator = None
+        if nav_cfg.get('enabled'):
+            navigator = NavigationGrid(width, height, self.obstacles, cell_size=nav_cfg['cell_size'],
+                                       clearance=nav_cfg['clearance'], cache_size=nav_cfg['cache_size'])
+
+        self.pedestrians = []
+        for _ in range(p['num_agents']):
+            start = np.random.rand(2) * [width, height]
+            self.pedestrians.append(Pedestrian(start[0], start[1], max_speed=p['max_speed'], max_force=p['max_force'],
+                                               destination=self._random_destination(start),
+                                               fov_degrees=p['fov_degrees'],
+                                               d_max_collision_dist=p['d_max_collision_dist'],
+                                               num_fov_samples=p['num_fov_samples'],
+                                               arrival_threshold=p['arrival_threshold'],
+                                               size=random.uniform(6, 9), navigator=navigator))
+
+    def _random_destination(self, current_pos):
+        width, height = self.params['width'], self.params['height']
+        if self.params.get('destinations'):
+            return np.array(random.choice(self.params['destinations']), dtype=float)
+        while True:
+            dest = np.random.rand(2) * [width, height]
+            if np.linalg.norm(dest - current_pos) > width / 4:
+                return dest
+
+    def _step(self):
+        width, height = self.params['width'], self.params['height']
+        for i, ped in enumerate(self.pedestrians):
+            others = self.pedestrians[:i] + self.pedestrians[i + 1:]
+            ped.update_behavior(self.obstacles, others, width, height)
+            ped.update()
+            ped.edges(width, height)
+            if ped.is_arrived:
+                ped.set_destination(self._random_destination(ped.position))
+
+    def _apply_param(self, name, value):
+        for ped in self.pedestrians:
+            setattr(ped, name, float(value))
+
+    def state_array(self):
+        return np.array([p.position for p in self.pedestrians])
+
+
+class PursuitEvasionSimulation(Simulation):
+    name = 'pursuit_evasion'
+    defaults = dict(agent_config.PURSUIT_EVASION_CONFIG, width=agent_config.GENERAL_CONFIG['width'],
+                    height=agent_config.GENERAL_CONFIG['height'],
+                    flee_radius=agent_config.PURSUIT_EVASION_CONFIG['evader']['flee_radius'],
+                    evader_max_speed=agent_config.PURSUIT_EVASION_CONFIG['evader']['max_speed'],
+                    pursuer_max_speed=agent_config.PURSUIT_EVASION_CONFIG['pursuer']['max_speed'])
+    tunable = ('flee_radius', 'pursuer_max_speed', 'evader_max_speed')
+    offload = False
+
+    def _build(self):
+        p = self.params
+        width, height = p['width'], p['height']
+        e_cfg, p_cfg = p['evader'], p['pursuer']
+        self.evader = Evader(random.uniform(0, width), random.uniform(0, height), max_speed=e_cfg['max_speed'],
+                             max_force=e_cfg['max_force'], flee_radius=e_cfg['flee_radius'])
+        self.pursuers = [Pursuer(random.uniform(0, width), random.uniform(0, height),
+                                 max_speed=p_cfg['max_speed'], max_force=p_cfg['max_force'])
+                         for _ in range(p_cfg['num_agents'])]
+        for name in self.tunable:
+            self._apply_param(name, p[name])
+
+    def _step(self):
+        width, height = self.params['width'], self.params['height']
+        self.evader.update_behavior(self.pursuers)
+        self.evader.update()
+        self.evader.edges(width, height)
+        for p in self.pursuers:
+            p.update_behavior(self.evader)
+            p.update()
+            p.edges(width, height)
+
+    def _apply_param(self, name, value):
+        if name == 'flee_radius':
+            self.evader.flee_radius = float(value)
+        elif name == 'evader_max_speed':
+            self.evader.max_speed = float(value)
+        elif name == 'pursuer_max_speed':
+            for p in self.pursuers:
+                p.max_speed = float(value)
+
+    def state_array(self):
+        return np.array([self.evader.position] + [p.position for p in self.pursuers])
+
+
+class SIRSimulation(Simulation):
+    name = 'sir'
+    kind = KIND_STATES
+    # SIR_MODEL_CONFIG repeats 'infection_prob' as a True marker for utils.draw_network, which replaces its
+    # rate in the dict, so the rates are given here
+    defaults = dict(network_config.SIR_MODEL_CONFIG, infection_prob=0.15, recovery_prob=0.05)
+    tunable = ('infection_prob', 'recovery_prob')
+    bounds = {'infection_prob': (0.0, 1.0), 'recovery_prob': (0.0, 1.0)}
+
+    def _build(self):
+        p = self.params
+        graph = nx.barabasi_albert_graph(n=p['num_nodes'], m=p['barabasi_m'], seed=self.seed)
+        states = p['states']
+        self.model = SIRModel(graph, infection_prob=p['infection_prob'], recovery_prob=p['recovery_prob'],
+                              susceptible_state=states['susceptible'], infected_state=states['infected'],
+                              recovered_state=states['recovered'])
+        self.state_codes = {states['susceptible']: 0, states['infected']: 1, states['recovered']: 2}
+        k = min(p['num_initial_infected'], self.model.num_nodes)
+        self.model.set_initial_infected_nodes(random.sample(self.model.nodes, k=k))
+
+    def _step(self):
+        self.model.step(self.step_count + 1)
+        if self.model.i_counts[-1] == 0 or self.step_count + 1 >= self.params['max_simulation_steps']:
+            self.finished = True
+
+    def _apply_param(self, name, value):
+        setattr(self.model, name, float(value))
+
+    def state_array(self):
+        return np.array([self.state_codes[self.model.states[n]] for n in self.model.nodes], dtype=np.uint8)
+
+
+class LTSimulation(Simulation):
+    name = 'lt'
+    kind = KIND_STATES
+    defaults = dict(network_config.LT_MODEL_CONFIG)
+    tunable = ('default_threshold',)
+    bounds = {'default_threshold': (0.0, 1.0)}
+    offload = False
+
+    def _build(self):
+        p = self.params
+        graph = nx.DiGraph(nx.barabasi_albert_graph(n=p['num_nodes'], m=p['barabasi_m'], seed=self.seed))
+        self.model = LinearThresholdModel(graph, thresholds={node: p['default_threshold'] for node in graph.nodes()})
+        k = min(p['num_initial_active'], self.model.num_nodes)
+        self.model.set_initial_active_nodes(random.sample(self.model.nodes, k=k))
+
+    def _step(self):
+        activated = self.model.step()
+        if activated == 0 or self.step_count + 1 >= self.params['max_simulation_steps']:
+            self.finished = True
+
+    def _apply_param(self, name, value):
+        self.model.set_thresholds({node: float(value) for node in self.model.nodes})
+
+    def state_array(self):
+        return np.array([self.model.states[n] for n in self.model.nodes], dtype=np.uint8)
+
+
+SIMULATION_TYPES = {cls.name: cls for cls in
+                    (BoidsSimulation, PedestrianSimulation, PursuitEvasionSimulation, SIRSimulation, LTSimulation)}
+
+
+def create_simulation(model, params=None, seed=None):
+    if model not in SIMULATION_TYPES:
+        raise KeyError(f"Unknown model '{model}' (available: {', '.join(SIMULATION_TYPES)})")
+    return SIMULATION_TYPES[model](params, seed)
+
+
+def advance_simulation(sim, num_steps):
+    """Process-pool entry point: advances a pickled simulation and sends it back."""
+    return sim.advance(num_steps)
@@ -0,0 +1,236 @@
+import asyncio
+import math
+import socket
+
+import numpy as np
+import pytest
+
+from client import SimulationClient
+from protocol import (MSG_COMMAND, MSG_DELTA, MSG_KEYFRAME, KIND_POSITIONS, KIND_STATES, pack, decode_frame,
+                      encode_delta, encode_keyframe)
+from server import SimulationServer
+from simulations import SIRSimulation, create_simulation
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def _wait_for(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def _pause_and_sync(client, slot):
+    """Pauses the slot and waits until the client has every frame it published."""
+    assert (await client.command('pause', sim=slot.sim_id))['ok']
+    await _wait_for(lambda: not slot.in_flight and client.steps.get(slot.sim_id) == slot.sim.step_count)
+
+
+def _mirrors(client, slot):
+    expected = slot.sim.state_array()
+    if slot.sim.kind == KIND_POSITIONS:
+        expected = expected.astype(np.float32) # The wire carries float32 positions
+    return np.array_equal(client.states[slot.sim_id], expected)
+
+
+@pytest.mark.parametrize('kind, values', [
+    (KIND_POSITIONS, np.arange(12, dtype=float).reshape(6, 2) / 3),
+    (KIND_STATES, np.array([0, 1, 2, 1, 0], dtype=np.uint8)),
+])
+def test_keyframe_and_delta_round_trip(kind, values):
+    body = encode_keyframe(7, 11, kind, values)[4:]
+    msg_type, sim_id, step, got_kind, indices, decoded = decode_frame(body)
+    assert (msg_type, sim_id, step, got_kind, indices) == (MSG_KEYFRAME, 7, 11, kind, None)
+    np.testing.assert_array_equal(decoded, np.asarray(values, dtype=decoded.dtype))
+
+    changed = np.array([0, 3])
+    body = encode_delta(7, 12, kind, changed, values[changed])[4:]
+    msg_type, _, step, _, indices, decoded = decode_frame(body)
+    assert (msg_type, step) == (MSG_DELTA, 12)
+    np.testing.assert_array_equal(indices, changed)
+    np.testing.assert_array_equal(decoded, np.asarray(values[changed], dtype=decoded.dtype))
+
+
+@pytest.mark.parametrize('model, params', [('boids', {'num_agents': 30}), ('sir', {'num_nodes': 300})])
+def test_client_rebuilds_the_state_from_frames(model, params):
+    async def scenario():
+        port = _free_port()
+        server = SimulationServer(host='127.0.0.1', port=port, num_workers=1)
+        await server.start()
+        slot = server.add_simulation(model, params=params, seed=2, interval=0.005, offload=False)
+        client = await SimulationClient.connect(host='127.0.0.1', port=port)
+        await client.command('subscribe', sim=slot.sim_id)
+        await client.wait_frames(10)
+        await _pause_and_sync(client, slot)
+        mirrored = _mirrors(client, slot)
+        await client.close()
+        await server.close()
+        return mirrored
+
+    assert asyncio.run(scenario())
+
+
+def test_slow_client_drops_deltas_then_gets_a_keyframe():
+    async def scenario():
+        port = _free_port()
+        server = SimulationServer(host='127.0.0.1', port=port, num_workers=1, queue_size=2)
+        await server.start()
+        slot = server.add_simulation('boids', params={'num_agents': 20}, seed=3, interval=0.005, offload=False)
+        client = await SimulationClient.connect(host='127.0.0.1', port=port)
+        received = []
+        apply_frame = client._apply_frame
+        client._apply_frame = lambda body: (received.append(body[0]), apply_frame(body))
+        await client.command('subscribe', sim=slot.sim_id)
+        await client.wait_frames(1)
+        # Stall the server's sender for this client, as a client that stops reading would
+        (sub,) = slot.subscribers
+        sub.sender.cancel()
+        await _wait_for(lambda: sub.dropped_frames >= 5)
+        stalled_at = len(received)
+        sub.sender = asyncio.create_task(sub._send_loop())
+        await _wait_for(lambda: MSG_KEYFRAME in received[stalled_at:])
+        await _pause_and_sync(client, slot)
+        mirrored = _mirrors(client, slot)
+        await client.close()
+        await server.close()
+        return received, mirrored
+
+    received, mirrored = asyncio.run(scenario())
+    assert received[0] == MSG_KEYFRAME and received.count(MSG_KEYFRAME) >= 2
+    assert mirrored
+
+
+def test_pause_and_resume_over_the_socket():
+    async def scenario():
+        port = _free_port()
+        server = SimulationServer(host='127.0.0.1', port=port, num_workers=1)
+        await server.start()
+        slot = server.add_simulation('boids', params={'num_agents': 20}, seed=4, interval=0.005, offload=False)
+        client = await SimulationClient.connect(host='127.0.0.1', port=port)
+        await client.command('subscribe', sim=slot.sim_id)
+        await client.wait_frames(3)
+        await _pause_and_sync(client, slot)
+        paused = (await client.command('list'))['simulations'][0]
+        frames, step = client.frames[slot.sim_id], slot.sim.step_count
+        await asyncio.sleep(0.1) # Twenty intervals
+        still = (client.frames[slot.sim_id], slot.sim.step_count) == (frames, step)
+        resumed = await client.command('resume', sim=slot.sim_id)
+        await client.wait_frames(frames + 3)
+        await _pause_and_sync(client, slot)
+        mirrored = _mirrors(client, slot)
+        await client.close()
+        await server.close()
+        return paused, still, resumed, slot.sim.step_count > step, mirrored
+
+    paused, still, resumed, advanced, mirrored = asyncio.run(scenario())
+    assert paused['paused'] and still
+    assert resumed['ok'] and not resumed['simulation']['paused']
+    assert advanced and mirrored
+
+
+def test_offloaded_steps_run_in_the_process_pool():
+    async def scenario():
+        port = _free_port()
+        server = SimulationServer(host='127.0.0.1', port=port, num_workers=1)
+        await server.start()
+        reference = create_simulation('boids', {'num_agents': 20}, seed=5)
+        slot = server.add_simulation('boids', params={'num_agents': 20}, seed=5, interval=0.005, offload=True)
+        local_sim = slot.sim
+        client = await SimulationClient.connect(host='127.0.0.1', port=port)
+        await client.command('subscribe', sim=slot.sim_id)
+        await client.wait_frames(4)
+        await _pause_and_sync(client, slot)
+        mirrored = _mirrors(client, slot)
+        steps = slot.sim.step_count
+        await client.close()
+        await server.close()
+        return slot.sim is not local_sim, mirrored, reference.advance(steps).state_array(), slot.sim.state_array()
+
+    shipped_back, mirrored, expected, actual = asyncio.run(scenario())
+    assert shipped_back # The adapter advanced in a worker replaces the local one
+    assert mirrored
+    np.testing.assert_array_equal(actual, expected) # Same trajectory as stepping inline
+
+
+def test_sir_defaults_are_numeric():
+    for name in SIRSimulation.tunable:
+        value = SIRSimulation.defaults[name]
+        assert isinstance(value, float) and 0 <= value <= 1
+
+
+@pytest.mark.parametrize('value', ['x', None, True, math.nan, math.inf, -0.1, 1.5])
+def test_validate_param_rejects(value):
+    sim = create_simulation('sir', {'num_nodes': 50}, seed=1)
+    with pytest.raises((TypeError, ValueError)):
+        sim.validate_param('infection_prob', value)
+
+
+def test_validate_param_accepts_and_converts():
+    sim = create_simulation('lt', {'num_nodes': 50}, seed=1)
+    assert sim.validate_param('default_threshold', 1) == 1.0
+    with pytest.raises(KeyError):
+        sim.validate_param('num_nodes', 10)
+    sim.set_param('default_threshold', 0.25)
+    assert set(sim.model.thresholds.values()) == {0.25}
+
+
+def test_same_seed_same_trajectory():
+    a = create_simulation('sir', {'num_nodes': 200}, seed=3).advance(10)
+    b = create_simulation('sir', {'num_nodes': 200}, seed=3).advance(10)
+    assert (a.state_array() == b.state_array()).all()
+
+
+def test_bad_commands_get_error_replies():
+    async def scenario():
+        port = _free_port()
+        server = SimulationServer(host='127.0.0.1', port=port, num_workers=1)
+        await server.start()
+        slot = server.add_simulation('sir', params={'num_nodes': 50}, seed=1, interval=0.01, offload=False)
+        client = await SimulationClient.connect(host='127.0.0.1', port=port)
+        replies = []
+        for payload in (b'{not json', b'[1, 2]', b'\xff'):
+            client.writer.write(pack(bytes([MSG_COMMAND]) + payload))
+            replies.append(await client._replies.get())
+        replies.append(await client.command('set_param', sim=slot.sim_id, name='infection_prob', value=2.0))
+        slot.in_flight = True # Queued changes are checked when they arrive, not when the step returns
+        replies.append(await client.command('set_param', sim=slot.sim_id, name='infection_prob', value='x'))
+        slot.in_flight = False
+        ok = await client.command('set_param', sim=slot.sim_id, name='infection_prob', value=0.3)
+        await client.close()
+        await server.close()
+        return replies, ok
+
+    replies, ok = asyncio.run(scenario())
+    assert all(reply['ok'] is False and reply['error'] for reply in replies)
+    assert ok['ok'] and ok['simulation']['params']['infection_prob'] == 0.3
+
+
+def test_failing_tick_is_logged_and_survived(caplog):
+    async def scenario():
+        server = SimulationServer(host='127.0.0.1', port=_free_port(), num_workers=1)
+        slot = server.add_simulation('lt', params={'num_nodes': 50}, seed=1, interval=0.001, offload=False)
+        calls = []
+        original = slot.sim.advance
+
+        def advance(num_steps):
+            calls.append(num_steps)
+            if len(calls) == 1:
+                raise RuntimeError('boom')
+            return original(num_steps)
+
+        slot.sim.advance = advance
+        while len(calls) < 3 and not slot.sim.finished:
+            await asyncio.sleep(0.01)
+        alive = not slot.task.done()
+        await server.close()
+        return alive, slot.last_error
+
+    alive, last_error = asyncio.run(scenario())
+    assert alive
+    assert 'boom' in last_error
+    assert 'tick failed' in caplog.text